@@ -1,3 +1,3 @@
 """Forex Scalper Application Package."""
 
-__all__ = ["main", "gui", "strategies", "trading", "settings"]
+__all__ = ["main", "gui", "strategies", "trading", "settings", "indicators", "backtest", "sweep", "fix_codec", "fix_session", "fix_acceptor", "market_data", "position_book", "latency", "event_bridge", "engine", "scheduler", "tick_store", "bars", "risk", "pnl", "strategy_registry", "shared_quotes", "supervisor", "benchmarks", "journal", "sim_exchange", "order_book", "snapshot"]
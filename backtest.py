@@ -0,0 +1,216 @@
+"""Vectorized backtesting of the SMA crossover strategies.
+
+Signals for a whole price array are computed from cumulative-sum windows and
+trades are simulated with the same parameters ``Trader.open_trade`` takes
+(direction, volume, stop-loss, take-profit), without a Python-level loop over
+bars. Requires NumPy.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+import time
+
+import numpy as np
+
+from strategies import BUY, HOLD, SELL, SIGNAL_EPSILON
+
+# Units per standard lot, used to turn price moves into account currency.
+CONTRACT_SIZE = 100_000
+
+
+def _windows(strategy: Any) -> tuple:
+    """Accept a strategy instance/class or a (short, long) tuple."""
+    if isinstance(strategy, tuple):
+        return strategy
+    return strategy.short_window, strategy.long_window
+
+
+def trailing_means(prices: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the last ``window`` prices at every bar.
+
+    Bars before the window has filled average over everything seen so far,
+    as ``SMACrossoverStrategy.decide`` does. Prices are shifted by the first value before
+    summing so the cumulative sum stays small and precise on long series.
+    """
+    n = prices.shape[0]
+    base = prices[0] if n else 0.0
+    csum = np.empty(n + 1, dtype=np.float64)
+    csum[0] = 0.0
+    np.cumsum(prices - base, out=csum[1:])
+    idx = np.arange(1, n + 1)
+    counts = np.minimum(idx, window)
+    return (csum[idx] - csum[idx - counts]) / counts + base
+
+
+def crossover_signals(prices: Any, strategy: Any) -> np.ndarray:
+    """Per-bar signal (+1 buy, -1 sell, 0 hold) of an SMA crossover strategy.
+
+    Element ``i`` equals ``strategy.decide({'prices': prices[:i + 1]})``.
+    """
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    short_window, long_window = _windows(strategy)
+    short = trailing_means(prices, short_window)
+    long = trailing_means(prices, long_window)
+    diff = short - long
+    tol = SIGNAL_EPSILON * np.abs(long)
+    signals = np.where(diff > tol, BUY, np.where(diff < -tol, SELL, HOLD)).astype(np.int8)
+    signals[:1] = HOLD  # decide() holds with fewer than two prices
+    return signals
+
+
+@dataclass
+class BacktestResult:
+    """Outcome of a backtest; all per-bar arrays have one entry per price."""
+
+    signals: np.ndarray
+    positions: np.ndarray
+    equity: np.ndarray
+    # Per-trade columns.
+    entry_index: np.ndarray
+    exit_index: np.ndarray
+    direction: np.ndarray
+    entry_price: np.ndarray
+    exit_price: np.ndarray
+    pnl: np.ndarray
+    closed: np.ndarray
+    initial_balance: float = 0.0
+    elapsed: float = field(default=0.0, repr=False)
+
+    @property
+    def trade_count(self) -> int:
+        return int(self.direction.shape[0])
+
+    def summary(self) -> dict:
+        pnl = self.pnl
+        peak = np.maximum.accumulate(self.equity) if self.equity.size else self.equity
+        drawdown = float((peak - self.equity).max()) if self.equity.size else 0.0
+        return {
+            'bars': int(self.equity.shape[0]),
+            'trades': self.trade_count,
+            'net_pnl': float(pnl.sum()),
+            'win_rate': float((pnl > 0).mean()) if pnl.size else 0.0,
+            'max_drawdown': drawdown,
+            'final_equity': float(self.equity[-1]) if self.equity.size else self.initial_balance,
+            'bars_per_sec': self.equity.shape[0] / self.elapsed if self.elapsed else 0.0,
+        }
+
+
+def run_backtest(
+    prices: Any,
+    strategy: Any,
+    volume: float = 1.0,
+    stop_loss: Optional[float] = None,
+    take_profit: Optional[float] = None,
+    spread: float = 0.0,
+    initial_balance: float = 10000.0,
+    contract_size: Union[int, float] = CONTRACT_SIZE,
+) -> BacktestResult:
+    """Simulate a strategy over a price array.
+
+    A position of ``volume`` lots is opened at the bar price whenever the
+    signal turns to buy or sell, and closed at the bar price when the signal
+    reverses or when price reaches ``stop_loss``/``take_profit``. Unlike the
+    absolute prices ``Trader.open_trade`` takes, these are distances from the
+    entry price. After a stop or target the strategy stays flat until the
+    next reversal. ``spread`` (in price units) is charged once per trade.
+    """
+    if not isinstance(volume, (int, float)) or volume <= 0:
+        raise ValueError("Volume must be a positive number.")
+    if stop_loss is not None and (not isinstance(stop_loss, (int, float)) or stop_loss <= 0):
+        raise ValueError("Stop-Loss must be a positive distance or None.")
+    if take_profit is not None and (not isinstance(take_profit, (int, float)) or take_profit <= 0):
+        raise ValueError("Take-Profit must be a positive distance or None.")
+
+    started = time.perf_counter()
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    n = prices.shape[0]
+    if n == 0:
+        empty = np.empty(0, dtype=np.float64)
+        no_bars = np.empty(0, dtype=np.int8)
+        no_trades = np.empty(0, dtype=np.intp)
+        return BacktestResult(
+            signals=no_bars, positions=no_bars.copy(), equity=empty, entry_index=no_trades,
+            exit_index=no_trades.copy(), direction=no_bars.copy(), entry_price=empty.copy(),
+            exit_price=empty.copy(), pnl=empty.copy(), closed=np.empty(0, dtype=bool),
+            initial_balance=initial_balance, elapsed=time.perf_counter() - started,
+        )
+    signals = crossover_signals(prices, strategy)
+    bar = np.arange(n)
+
+    # Forward-fill 'hold' so a tie keeps the previous direction.
+    last_set = np.where(signals != HOLD, bar, 0)
+    np.maximum.accumulate(last_set, out=last_set)
+    wanted = signals[last_set]
+
+    # Each run of constant wanted direction is one candidate trade.
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    np.not_equal(wanted[1:], wanted[:-1], out=change[1:])
+    run_start = np.flatnonzero(change)
+    run_end = np.append(run_start[1:], n)
+    run_dir = wanted[run_start]
+    run_len = run_end - run_start
+
+    # Exit at the first stop/target touch after entry, else at the reversal.
+    exit_at = run_end.copy()
+    if stop_loss is not None or take_profit is not None:
+        entry_per_bar = np.repeat(prices[run_start], run_len)
+        move = (prices - entry_per_bar) * np.repeat(run_dir, run_len)
+        hit = np.zeros(n, dtype=bool)
+        if stop_loss is not None:
+            hit |= move <= -stop_loss
+        if take_profit is not None:
+            hit |= move >= take_profit
+        hit[run_start] = False
+        first_hit = np.minimum.reduceat(np.where(hit, bar, n), run_start)
+        np.minimum(exit_at, first_hit, out=exit_at)
+
+    trading = run_dir != HOLD
+    entry_index = run_start[trading]
+    exit_index = exit_at[trading]
+    direction = run_dir[trading]
+    closed = exit_index < n
+    exit_index = np.minimum(exit_index, n - 1)  # still open: mark at last bar
+    entry_price = prices[entry_index]
+    exit_price = prices[exit_index]
+    scale = volume * contract_size
+    pnl = (direction * (exit_price - entry_price) - spread) * scale
+
+    # Per-bar position held from bar i to bar i + 1.
+    positions = np.where(bar < np.repeat(exit_at, run_len), np.repeat(run_dir, run_len), 0).astype(np.int8)
+    bar_pnl = np.zeros(n, dtype=np.float64)
+    if n > 1:
+        bar_pnl[1:] = positions[:-1] * np.diff(prices) * scale
+    bar_pnl[entry_index] -= spread * scale
+    equity = initial_balance + np.cumsum(bar_pnl)
+
+    return BacktestResult(
+        signals=signals,
+        positions=positions,
+        equity=equity,
+        entry_index=entry_index,
+        exit_index=exit_index,
+        direction=direction,
+        entry_price=entry_price,
+        exit_price=exit_price,
+        pnl=pnl,
+        closed=closed,
+        initial_balance=initial_balance,
+        elapsed=time.perf_counter() - started,
+    )
+
+
+def random_walk(n: int, start: float = 1.1, step: float = 0.0001, seed: Optional[int] = None) -> np.ndarray:
+    """Synthetic price series for benchmarks and experiments."""
+    rng = np.random.default_rng(seed)
+    return start + np.cumsum(rng.normal(0.0, step, n))
+
+
+if __name__ == "__main__":
+    from strategies import SafeStrategy, ModerateStrategy, AggressiveStrategy
+
+    series = random_walk(5_000_000, seed=42)
+    for strategy_class in (SafeStrategy, ModerateStrategy, AggressiveStrategy):
+        result = run_backtest(series, strategy_class, stop_loss=0.0010, take_profit=0.0015, spread=0.00002)
+        stats = result.summary()
+        print(f"{strategy_class.__name__}: {stats['trades']} trades, net {stats['net_pnl']:.2f}, "
+              f"{stats['bars_per_sec'] / 1e6:.1f}M bars/sec")
@@ -0,0 +1,176 @@
+"""Streaming OHLC bars built from ticks.
+
+``BarAggregator`` turns (timestamp, price) updates into bars for any of
+``TIMEFRAMES``, keeping the last ``capacity`` closed bars of each symbol and
+timeframe in ring buffers. Bars are aligned to UTC multiples of their
+length; a period with no ticks produces no bar, and a bar closes when the
+first tick of a later period arrives. Volume is the tick count, since FX
+quotes carry no traded volume.
+"""
+from array import array
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+TIMEFRAMES = {'1s': 1, '1m': 60, '5m': 300, '1h': 3600}
+DEFAULT_BAR_CAPACITY = 2000
+
+
+class Bar(NamedTuple):
+    start: float
+    open: float
+    high: float
+    low: float
+    close: float
+    ticks: int
+
+
+# A bar listener receives (symbol, timeframe, bar) when a bar closes.
+BarCallback = Callable[[str, str, Bar], None]
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    try:
+        return TIMEFRAMES[timeframe]
+    except KeyError:
+        raise ValueError(f"Unknown timeframe '{timeframe}'; expected one of {', '.join(TIMEFRAMES)}.") from None
+
+
+class BarSeries:
+    """Closed bars of one symbol and timeframe plus the bar being formed."""
+
+    __slots__ = ('symbol', 'timeframe', 'seconds', 'capacity', 'starts', 'opens', 'highs', 'lows', 'closes',
+                 'tick_counts', 'head', 'count', 'start', 'end', 'open', 'high', 'low', 'close', 'ticks')
+
+    def __init__(self, symbol: str, timeframe: str, capacity: int = DEFAULT_BAR_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive.")
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.seconds = timeframe_seconds(timeframe)
+        self.capacity = capacity
+        zeros = bytes(8 * capacity)
+        self.starts = array('d', zeros)
+        self.opens = array('d', zeros)
+        self.highs = array('d', zeros)
+        self.lows = array('d', zeros)
+        self.closes = array('d', zeros)
+        self.tick_counts = array('q', zeros)
+        self.head = 0
+        self.count = 0
+        # Forming bar; ``end`` is -inf until the first tick so any tick opens one.
+        self.start = 0.0
+        self.end = float('-inf')
+        self.open = self.high = self.low = self.close = 0.0
+        self.ticks = 0
+
+    def update(self, timestamp: float, price: float) -> Optional[Bar]:
+        """Add a tick; returns the bar it closed, if any."""
+        if timestamp < self.end:
+            if price > self.high:
+                self.high = price
+            elif price < self.low:
+                self.low = price
+            self.close = price
+            self.ticks += 1
+            return None
+        closed = self._close_bar() if self.ticks else None
+        seconds = self.seconds
+        self.start = timestamp - timestamp % seconds
+        self.end = self.start + seconds
+        self.open = self.high = self.low = self.close = price
+        self.ticks = 1
+        return closed
+
+    def _close_bar(self) -> Bar:
+        i = self.head
+        self.starts[i] = self.start
+        self.opens[i] = self.open
+        self.highs[i] = self.high
+        self.lows[i] = self.low
+        self.closes[i] = self.close
+        self.tick_counts[i] = self.ticks
+        i += 1
+        self.head = 0 if i == self.capacity else i
+        if self.count < self.capacity:
+            self.count += 1
+        return Bar(self.start, self.open, self.high, self.low, self.close, self.ticks)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def forming(self) -> Optional[Bar]:
+        """The bar still open, as of the last tick."""
+        if not self.ticks:
+            return None
+        return Bar(self.start, self.open, self.high, self.low, self.close, self.ticks)
+
+    def _tail(self, column: array, n: Optional[int]) -> list:
+        n = self.count if n is None else min(n, self.count)
+        start = self.head - n
+        if start >= 0:
+            return column[start:self.head].tolist()
+        return column[start:].tolist() + column[:self.head].tolist()
+
+    def latest_closes(self, n: Optional[int] = None) -> List[float]:
+        """Up to ``n`` most recent closed-bar closes, oldest first."""
+        return self._tail(self.closes, n)
+
+    def latest(self, n: Optional[int] = None) -> List[Bar]:
+        """Up to ``n`` most recent closed bars, oldest first."""
+        return [Bar(*fields) for fields in zip(self._tail(self.starts, n), self._tail(self.opens, n),
+                                               self._tail(self.highs, n), self._tail(self.lows, n),
+                                               self._tail(self.closes, n), self._tail(self.tick_counts, n))]
+
+
+class BarAggregator:
+    """Bar series per (symbol, timeframe), updated from ticks.
+
+    Only pairs requested through ``series`` are built, so symbols nobody
+    needs bars for cost one dict lookup per tick.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_BAR_CAPACITY):
+        self.capacity = capacity
+        self._series: Dict[str, List[BarSeries]] = {}
+        self._listeners: Dict[tuple, List[BarCallback]] = {}
+
+    def series(self, symbol: str, timeframe: str) -> BarSeries:
+        """The series for ``symbol``/``timeframe``, created empty if new."""
+        existing = self._series.setdefault(symbol, [])
+        for series in existing:
+            if series.timeframe == timeframe:
+                return series
+        series = BarSeries(symbol, timeframe, self.capacity)
+        existing.append(series)
+        return series
+
+    def has_series(self, symbol: str, timeframe: str) -> bool:
+        return any(series.timeframe == timeframe for series in self._series.get(symbol, ()))
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._series
+
+    def on_bar(self, symbol: str, timeframe: str, callback: BarCallback) -> BarSeries:
+        """Call ``callback`` whenever a ``timeframe`` bar of ``symbol`` closes."""
+        self._listeners.setdefault((symbol, timeframe), []).append(callback)
+        return self.series(symbol, timeframe)
+
+    def remove_listener(self, symbol: str, timeframe: str, callback: BarCallback) -> None:
+        listeners = self._listeners.get((symbol, timeframe))
+        if listeners and callback in listeners:
+            listeners.remove(callback)
+
+    def update(self, symbol: str, timestamp: float, price: float) -> None:
+        all_series = self._series.get(symbol)
+        if not all_series:
+            return
+        for series in all_series:
+            bar = series.update(timestamp, price)
+            if bar is not None:
+                listeners = self._listeners.get((symbol, series.timeframe))
+                if listeners:
+                    for callback in listeners:
+                        callback(symbol, series.timeframe, bar)
+
+    def on_quote(self, symbol: str, timestamp: float, bid: float, ask: float) -> None:
+        """Feed subscriber: bars are built from the mid price."""
+        self.update(symbol, timestamp, (bid + ask) * 0.5)
@@ -0,0 +1,410 @@
+"""Benchmark suite for the strategy, order path and settings hot paths.
+
+A standalone runner, so it needs nothing beyond the application itself::
+
+    python benchmarks.py                              # run everything, print a table
+    python benchmarks.py -k decide -k settings        # only matching benchmarks
+    python benchmarks.py --output bench.json          # store results
+    python benchmarks.py --compare bench.json         # fail on regressions against a stored run
+
+Every case reports nanoseconds per operation (best and median over several
+repeats, like ``timeit``), so runs on the same machine are comparable
+between commits. The order path runs against a ``LoopbackAcceptor`` over
+real localhost sockets; the round trip benchmark times a quote published
+by the acceptor until the resulting order's fill is reported back.
+"""
+from typing import Callable, Dict, Iterable, List, Optional
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+# Open trades held while timing open/close, and history lengths for decide.
+OPEN_TRADE_COUNTS = (1000, 5000)
+HISTORY_LENGTHS = (50, 200, 1000, 10000)
+# Symbols evaluated together by the decide_many benchmark.
+SYMBOL_COUNTS = (60, 500)
+DEFAULT_THRESHOLD = 0.15
+UNLIMITED_RISK = {'max_order_volume': None, 'max_symbol_exposure': None, 'max_gross_exposure': None,
+                  'max_open_positions': None, 'max_margin_usage': None}
+
+# name -> function(quick) returning {case: result}
+BENCHMARKS: Dict[str, Callable[[bool], Dict[str, dict]]] = {}
+
+
+def benchmark(func: Callable[[bool], Dict[str, dict]]) -> Callable[[bool], Dict[str, dict]]:
+    BENCHMARKS[func.__name__[len('bench_'):]] = func
+    return func
+
+
+def measure(func: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> dict:
+    """Time ``func`` like ``timeit``: each repeat runs it enough times to take ``min_time``."""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [t / number * 1e9 for t in timer.repeat(repeat=repeat, number=number)]
+    return _result(runs, number)
+
+
+def _result(per_op_ns: List[float], ops: int) -> dict:
+    return {
+        'best_ns': min(per_op_ns),
+        'median_ns': statistics.median(per_op_ns),
+        'ops': ops,
+        'repeats': len(per_op_ns),
+    }
+
+
+def _samples(samples_ns: List[float]) -> dict:
+    """Result for individually timed operations (latencies), with percentiles."""
+    ordered = sorted(samples_ns)
+    result = _result(ordered, 1)
+    result['repeats'] = 1
+    result['ops'] = len(ordered)
+    result['p99_ns'] = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return result
+
+
+# --- strategies ------------------------------------------------------------
+
+@benchmark
+def bench_decide(quick: bool) -> Dict[str, dict]:
+    from strategies import AggressiveStrategy, SafeStrategy
+
+    rng = random.Random(1)
+    prices = [1.1]
+    for _ in range(max(HISTORY_LENGTHS) - 1):
+        prices.append(prices[-1] + rng.gauss(0, 1e-4))
+    results = {}
+    for cls in (AggressiveStrategy, SafeStrategy):
+        strategy = cls()
+        for n in HISTORY_LENGTHS[:2] if quick else HISTORY_LENGTHS:
+            market_data = {'prices': prices[-n:]}
+            results[f"{cls.__name__}.decide[history={n}]"] = measure(lambda: strategy.decide(market_data))
+        it = itertools.cycle(prices)
+        results[f"{cls.__name__}.update"] = measure(lambda: strategy.update(next(it)))
+    return results
+
+
+@benchmark
+def bench_decide_many(quick: bool) -> Dict[str, dict]:
+    """One tick's evaluation of every symbol: a ``decide`` call per symbol
+    against one ``decide_many`` call, from the feed's buffers. Needs NumPy."""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("decide_many: skipped, NumPy is not installed.", file=sys.stderr)
+        return {}
+    from market_data import MarketDataFeed
+    from strategies import AggressiveStrategy, SafeStrategy
+
+    rng = random.Random(2)
+    results = {}
+    for count in (SYMBOL_COUNTS[:1] if quick else SYMBOL_COUNTS):
+        feed = MarketDataFeed()
+        symbols = [f"SYM{i:03d}" for i in range(count)]
+        for symbol in symbols:
+            mid = 1.0 + rng.random()
+            for t in range(max(HISTORY_LENGTHS[:2])):
+                mid += rng.gauss(0, 1e-4)
+                feed.on_quote(symbol, float(t), mid - 1e-5, mid + 1e-5)
+        for cls in (AggressiveStrategy, SafeStrategy):
+            strategy = cls()
+
+            def per_symbol():
+                return [strategy.decide(feed.market_data(symbol, history=strategy.history)) for symbol in symbols]
+
+            def batched():
+                return strategy.decide_many(feed.price_matrix(symbols, strategy.history))
+
+            results[f"{cls.__name__}.decide[symbols={count}]"] = measure(per_symbol)
+            results[f"{cls.__name__}.decide_many[symbols={count}]"] = measure(batched)
+    return results
+
+
+# --- settings --------------------------------------------------------------
+
+@benchmark
+def bench_settings(quick: bool) -> Dict[str, dict]:
+    import settings as settings_module
+    from settings import Settings
+
+    saved = settings_module.CONFIG_FILE
+    with tempfile.TemporaryDirectory() as tmp:
+        settings_module.CONFIG_FILE = os.path.join(tmp, 'config.json')
+        try:
+            Settings(fix_sender_comp_id='demo.icmarkets.1', fix_password='secret',
+                     risk_limits={'max_order_volume': 5.0},
+                     accounts=[{'name': f'acct{i}', 'fix_sender_comp_id': f'demo.{i}'} for i in range(10)]).save()
+            return {
+                'Settings.load': measure(Settings.load),
+                'Settings.save': measure(Settings.load().save),
+            }
+        finally:
+            settings_module.CONFIG_FILE = saved
+
+
+# --- order path ------------------------------------------------------------
+
+class _Loopback:
+    """A connected Trader and LoopbackAcceptor on a private loop thread."""
+
+    def __init__(self, with_feed: bool = False):
+        from fix_acceptor import LoopbackAcceptor
+        from journal import OFF, Journal
+        from market_data import MarketDataFeed
+        from settings import Settings
+        from trading import Trader
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.acceptor = LoopbackAcceptor(prices={'EURUSD': 1.1})
+        port = asyncio.run_coroutine_threadsafe(self.acceptor.start(), self.loop).result()
+        settings = Settings(fix_host='127.0.0.1', fix_port=port, fix_quote_port=port,
+                            fix_sender_comp_id='bench.1', fix_password='bench', risk_limits=UNLIMITED_RISK)
+        self.feed = MarketDataFeed() if with_feed else None
+        # No console echo: trader events would interleave with the results.
+        self.trader = Trader(settings, loop=self.loop, market_data=self.feed, journal=Journal(echo_level=OFF))
+        # Latest status per trade, and trade id -> status a waiter wants
+        self._status: Dict[str, str] = {}
+        self._waiting: Dict[str, str] = {}
+        self._done = threading.Condition()
+        self.trader.on_trade_update.append(self._on_trade)
+        if not self.trader.connect():
+            raise RuntimeError(f"Loopback logon failed: {self.trader.connection_message}")
+
+    def _on_trade(self, trade: dict) -> None:
+        with self._done:
+            status = self._status[trade['id']] = trade['status']
+            if status in (self._waiting.get(trade['id']), 'rejected'):
+                self._waiting.pop(trade['id'], None)
+                self._done.notify_all()
+
+    def expect(self, trade_id: str, status: str) -> None:
+        """Make the next ``wait`` block until ``trade_id`` reaches ``status``."""
+        with self._done:
+            if self._status.get(trade_id) not in (status, 'rejected'):
+                self._waiting[trade_id] = status
+
+    def wait(self, timeout: float = 30.0) -> None:
+        with self._done:
+            if not self._done.wait_for(lambda: not self._waiting, timeout):
+                raise TimeoutError(f"{len(self._waiting)} trades still pending")
+
+    def open_many(self, count: int) -> List[str]:
+        results = self.trader.open_trades_batch(
+            [{'symbol': 'EURUSD', 'volume': 0.01, 'direction': 'buy' if i % 2 else 'sell'} for i in range(count)],
+            timeout=60)
+        return [r['trade_id'] for r in results if 'trade_id' in r]
+
+    def close(self) -> None:
+        self.trader.close_all(timeout=60)
+        self.trader.disconnect()
+        self.trader.journal.close()
+        asyncio.run_coroutine_threadsafe(self.acceptor.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+@benchmark
+def bench_orders(quick: bool) -> Dict[str, dict]:
+    results = {}
+    ops = 200 if quick else 1000
+    for held in OPEN_TRADE_COUNTS[:1] if quick else OPEN_TRADE_COUNTS:
+        bench = _Loopback()
+        try:
+            bench.open_many(held)
+            trader = bench.trader
+            # Submission cost: validation, risk check, book insert and the socket write.
+            timings = []
+            ids = []
+            for _ in range(ops):
+                started = time.perf_counter_ns()
+                trade_id = trader.open_trade('EURUSD', 0.01, 'buy')
+                timings.append(time.perf_counter_ns() - started)
+                bench.expect(trade_id, 'open')
+                ids.append(trade_id)
+            bench.wait()
+            results[f"Trader.open_trade[open={held}]"] = _samples(timings)
+            timings = []
+            for trade_id in ids:
+                bench.expect(trade_id, 'closed')
+                started = time.perf_counter_ns()
+                trader.close_trade(trade_id)
+                timings.append(time.perf_counter_ns() - started)
+            bench.wait()
+            results[f"Trader.close_trade[open={held}]"] = _samples(timings)
+            # Full round trip: submit, fill, close, closed, one order at a time.
+            timings = []
+            for _ in range(ops // 4):
+                started = time.perf_counter_ns()
+                trade_id = trader.open_trade('EURUSD', 0.01, 'buy')
+                bench.expect(trade_id, 'open')
+                bench.wait()
+                bench.expect(trade_id, 'closed')
+                trader.close_trade(trade_id)
+                bench.wait()
+                timings.append(time.perf_counter_ns() - started)
+            results[f"open_fill_close_roundtrip[open={held}]"] = _samples(timings)
+        finally:
+            bench.close()
+    return results
+
+
+class _Flipper:
+    """Strategy stub whose signal flips on every tick, so every quote trades."""
+
+    timeframe = None
+
+    def __init__(self):
+        self.last = 'sell'
+
+    def update(self, price: float) -> str:
+        self.last = 'buy' if self.last == 'sell' else 'sell'
+        return self.last
+
+
+@benchmark
+def bench_tick_to_order(quick: bool) -> Dict[str, dict]:
+    """Quote published by the acceptor -> QUOTE session -> feed -> strategy ->
+    order -> fill report, timed end to end."""
+    ticks = 200 if quick else 1000
+    bench = _Loopback(with_feed=True)
+    try:
+        trader, feed = bench.trader, bench.feed
+        filled = threading.Event()
+        state = {}
+
+        def on_decision(symbol: str, decision: str) -> None:
+            state['id'] = trader.open_trade(symbol, 0.01, decision)
+
+        def on_trade(trade: dict) -> None:
+            if trade['id'] == state.get('id') and trade['status'] in ('open', 'rejected'):
+                filled.set()
+
+        trader.on_trade_update.append(on_trade)
+        feed.attach_strategy('EURUSD', _Flipper(), on_decision)
+        time.sleep(0.2)  # let the market data request reach the acceptor
+        timings = []
+        for i in range(ticks):
+            filled.clear()
+            mid = 1.1 + (i % 50) * 1e-5
+            started = time.perf_counter_ns()
+            bench.loop.call_soon_threadsafe(bench.acceptor.publish_quote, 'EURUSD', mid - 1e-5, mid + 1e-5)
+            if not filled.wait(10):
+                raise TimeoutError("No fill for a published quote")
+            timings.append(time.perf_counter_ns() - started)
+    finally:
+        bench.close()
+    return {'tick_to_fill_roundtrip': _samples(timings)}
+
+
+# --- runner ----------------------------------------------------------------
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(patterns: Iterable[str] = (), quick: bool = False) -> dict:
+    """Run the benchmarks whose names contain any of ``patterns`` (all if none)."""
+    patterns = list(patterns)
+    results: Dict[str, dict] = {}
+    for name, func in BENCHMARKS.items():
+        if patterns and not any(p in name for p in patterns):
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        for case, result in func(quick).items():
+            results[f"{name}/{case}"] = result
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def _format_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+def format_results(report: dict) -> str:
+    lines = [f"{'benchmark':<58} {'best':>10} {'median':>10} {'p99':>10}"]
+    for name, r in report['results'].items():
+        p99 = _format_ns(r['p99_ns']) if 'p99_ns' in r else ''
+        lines.append(f"{name:<58} {_format_ns(r['best_ns']):>10} {_format_ns(r['median_ns']):>10} {p99:>10}")
+    return "\n".join(lines)
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Print median changes against ``baseline``; returns the cases slower by more than ``threshold``."""
+    regressions = []
+    print(f"{'benchmark':<58} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, r in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f"{name:<58} {'-':>10} {_format_ns(r['median_ns']):>10} {'new':>8}")
+            continue
+        change = r['median_ns'] / old['median_ns'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<58} {_format_ns(old['median_ns']):>10} {_format_ns(r['median_ns']):>10} "
+              f"{change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Forex Scalper hot paths.")
+    parser.add_argument('-k', dest='patterns', action='append', default=[],
+                        help=f"only benchmarks whose name contains this ({', '.join(BENCHMARKS)})")
+    parser.add_argument('--quick', action='store_true', help="fewer sizes and iterations")
+    parser.add_argument('--output', metavar='FILE', help="write results as JSON")
+    parser.add_argument('--compare', metavar='FILE', help="compare medians with a stored JSON run")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown counted as a regression (default 0.15)")
+    args = parser.parse_args(argv)
+
+    report = run(args.patterns, quick=args.quick)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}.")
+            return 1
+        return 0
+    print(format_results(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
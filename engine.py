@@ -0,0 +1,367 @@
+"""Headless trading engine: strategies trading many symbols on one event loop.
+
+Nothing here imports tkinter, and strategy classes are imported on first
+use, so the engine starts quickly and stays small enough to run as a
+service on a display-less server::
+
+    python engine.py EURUSD:SafeStrategy GBPUSD:AggressiveStrategy --volume 0.01
+
+Every symbol gets its own strategy instance fed tick by tick from the FIX
+QUOTE session, or evaluated on a timer with ``--eval-interval``. When a
+strategy's signal flips, the engine flattens the symbol and opens a trade in
+the new direction. Timers (FIX heartbeats, reconnects, evaluation, status
+reports) all share the trader's ``Scheduler``. With ``--record DIR`` every
+tick is also appended to a ``tick_store`` for later backtests.
+
+Strategies come from a ``StrategyRegistry``; editing a strategy module while
+the engine runs reloads it within ``--reload-interval`` seconds, swapping in
+fresh instances warmed up from the feed's history without touching the FIX
+sessions.
+
+With ``Settings.snapshot_path`` set, the engine snapshots positions, orders
+in flight, account totals, FIX sequence numbers, each strategy's indicator
+state and recent ticks every ``snapshot_interval`` seconds. A restarted
+engine resumes from the snapshot plus the journal events after it, and logs
+on with the saved sequence numbers rather than resetting them.
+"""
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import argparse
+import asyncio
+import importlib.util
+import signal
+import sys
+import time
+
+from market_data import MarketDataFeed
+from scheduler import Timer
+from snapshot import SnapshotError, SnapshotWriter, read_snapshot, snapshot_path
+from tick_store import TickWriter
+from settings import Settings
+from strategy_registry import StrategyRegistry, warm_up
+from trading import Trader
+
+DEFAULT_STRATEGY = 'SafeStrategy'
+# Seconds between tick store index updates while recording.
+RECORD_FLUSH_INTERVAL = 10.0
+# Seconds between checks for edited strategy modules.
+DEFAULT_RELOAD_INTERVAL = 2.0
+# Timer-driven evaluation batches symbols through ``decide_many`` if NumPy is installed.
+_VECTORIZE = importlib.util.find_spec('numpy') is not None
+
+
+def parse_symbols(specs: Iterable[str], default_strategy: str = DEFAULT_STRATEGY) -> List[Tuple[str, str]]:
+    """Turn ``['EURUSD', 'GBPUSD:AggressiveStrategy']`` into (symbol, strategy) pairs."""
+    pairs = []
+    for spec in specs:
+        symbol, _, strategy = spec.partition(':')
+        symbol = symbol.strip().upper()
+        if not symbol:
+            raise ValueError(f"Invalid symbol specification '{spec}'.")
+        pairs.append((symbol, strategy.strip() or default_strategy))
+    return pairs
+
+
+class Engine:
+    """Runs a ``Trader`` and per-symbol strategies on the current event loop."""
+
+    def __init__(self, settings: Settings, symbols: Iterable[Tuple[str, str]], volume: float = 0.01,
+                 flatten_on_exit: bool = False, eval_interval: Optional[float] = None,
+                 status_interval: Optional[float] = 60.0, record_dir: Optional[str] = None,
+                 trader_factory: Optional[Callable[..., Trader]] = None,
+                 registry: Optional[StrategyRegistry] = None,
+                 reload_interval: Optional[float] = DEFAULT_RELOAD_INTERVAL,
+                 feed: Optional[MarketDataFeed] = None):
+        self.settings = settings
+        self.symbols = list(symbols)
+        if not self.symbols:
+            raise ValueError("At least one symbol is required.")
+        self.volume = volume
+        self.flatten_on_exit = flatten_on_exit
+        # None evaluates strategies on every tick; otherwise every N seconds.
+        self.eval_interval = eval_interval
+        self.status_interval = status_interval
+        self._timers: List[Timer] = []
+        # Engines in one process may share a feed (see supervisor.py).
+        self.feed = feed if feed is not None else MarketDataFeed()
+        self.recorder = TickWriter(record_dir) if record_dir else None
+        if self.recorder is not None:
+            self.recorder.attach(self.feed)
+        self._trader_factory = trader_factory or Trader
+        self.trader: Optional[Trader] = None
+        self.registry = registry or StrategyRegistry.from_settings(settings)
+        self.registry.listeners.append(self._on_strategy_reloaded)
+        self.reload_interval = reload_interval
+        self.strategies: Dict[str, object] = {}
+        # Feed callbacks of attached strategies, for detaching on reload
+        self._callbacks: Dict[str, Callable] = {}
+        # Last non-hold signal acted on per symbol; trades happen when it changes.
+        self.signals: Dict[str, str] = {}
+        # Signals that could not be acted on, retried on every decision; the
+        # failure is journaled once per signal.
+        self._failed: Dict[str, str] = {}
+        self.trades_opened = 0
+        self._stop: Optional[asyncio.Event] = None
+        # Warm-restart snapshots (see snapshot.py), if a path is configured
+        path = snapshot_path(settings)
+        self.snapshots = SnapshotWriter(path, name=settings.fix_sender_comp_id) if path else None
+        self.snapshot_interval = getattr(settings, 'snapshot_interval', 1.0)
+
+    def _build_strategies(self) -> None:
+        for symbol, spec in self.symbols:
+            strategy = self.registry.instance(symbol, spec)
+            self.strategies[symbol] = strategy
+            if self.eval_interval is None:
+                self._callbacks[symbol] = self.feed.attach_strategy(symbol, strategy, self._on_decision)
+            else:
+                self.feed.subscribe(symbol)
+
+    def _on_strategy_reloaded(self, symbol: str, name: str, old, new) -> None:
+        if self.strategies.get(symbol) is not old:
+            return
+        callback = self._callbacks.pop(symbol, None)
+        if callback is not None:
+            self.feed.detach_strategy(symbol, old, callback)
+        if self.feed.buffer(symbol).count:
+            warm_up(new, self.feed.market_data(symbol, timeframe=new.timeframe)['prices'])
+        self.strategies[symbol] = new
+        if self.eval_interval is None:
+            self._callbacks[symbol] = self.feed.attach_strategy(symbol, new, self._on_decision)
+        self.trader.journal.info('strategy_reloaded', "{symbol}: now running reloaded {name}.",
+                                 symbol=symbol, name=name)
+
+    def _evaluate_all(self) -> None:
+        """Run ``decide`` over each symbol's recent prices (timer-driven mode).
+
+        Symbols whose strategies share a ``batch_key`` are evaluated with one
+        ``decide_many`` call over a price matrix when NumPy is available.
+        """
+        batches: Dict[object, List[str]] = {}
+        for symbol, strategy in self.strategies.items():
+            if not self.feed.buffer(symbol).count:
+                continue
+            key = strategy.batch_key() if _VECTORIZE and hasattr(strategy, 'batch_key') else None
+            if key is None:
+                self._evaluate(symbol, strategy)
+            else:
+                batches.setdefault(key, []).append(symbol)
+        for symbols in batches.values():
+            strategy = self.strategies[symbols[0]]
+            if len(symbols) == 1:
+                self._evaluate(symbols[0], strategy)
+                continue
+            from strategies import DECISIONS
+
+            codes = strategy.decide_many(self.feed.price_matrix(symbols, strategy.history, strategy.timeframe))
+            latency = self.trader.latency
+            name = type(strategy).__name__
+            for symbol, code in zip(symbols, codes.tolist()):
+                latency.decision(symbol, name)
+                self._on_decision(symbol, DECISIONS[code])
+
+    def _evaluate(self, symbol: str, strategy) -> None:
+        market_data = self.feed.market_data(symbol, history=getattr(strategy, 'history', 1000),
+                                            timeframe=strategy.timeframe)
+        decision = strategy.decide(market_data)
+        self.trader.latency.decision(symbol, type(strategy).__name__)
+        self._on_decision(symbol, decision)
+
+    def _snapshot_state(self) -> dict:
+        """The trader's state plus strategy state, signals and each symbol's recent ticks."""
+        state = self.trader.snapshot_state()
+        strategies = {}
+        ticks = {}
+        for symbol, strategy in self.strategies.items():
+            strategies[symbol] = (type(strategy).__name__,
+                                  strategy.get_state() if hasattr(strategy, 'get_state') else None)
+            buf = self.feed.buffers.get(symbol)
+            if buf is not None and buf.count:
+                n = getattr(strategy, 'history', 1000)
+                ticks[symbol] = tuple(array('d', column).tobytes()
+                                      for column in (buf.latest_times(n), buf.latest_bids(n), buf.latest_asks(n)))
+        state.update(strategies=strategies, signals=dict(self.signals), ticks=ticks)
+        return state
+
+    def _take_snapshot(self) -> None:
+        timestamp = time.time()  # before capturing, so restoring replays anything newer
+        self.snapshots.submit(self._snapshot_state(), timestamp)
+
+    def _load_snapshot(self) -> Optional[Tuple[float, dict]]:
+        if self.snapshots is None:
+            return None
+        try:
+            return read_snapshot(self.snapshots.path)
+        except (OSError, SnapshotError) as e:
+            self.trader.journal.warning('snapshot_ignored', "Ignoring snapshot {path}: {error}",
+                                        path=self.snapshots.path, error=str(e))
+            return None
+
+    def _restore_ticks(self, ticks: Dict[str, tuple]) -> None:
+        for symbol, columns in ticks.items():
+            buf = self.feed.buffer(symbol)
+            if buf.count:
+                continue  # a shared feed already has newer data
+            for timestamp, bid, ask in zip(*(array('d', column) for column in columns)):
+                buf.append(timestamp, bid, ask)
+
+    def _restore_strategies(self, state: dict) -> None:
+        """Resume strategy state saved in ``state``, warming up from the feed
+        any strategy whose state is missing or does not fit."""
+        saved = state.get('strategies', {})
+        for symbol, strategy in self.strategies.items():
+            name, strategy_state = saved.get(symbol, (None, None))
+            try:
+                if name != type(strategy).__name__ or not hasattr(strategy, 'set_state'):
+                    raise ValueError("no saved state")
+                strategy.set_state(strategy_state)
+                continue
+            except (ValueError, TypeError) as e:
+                self.trader.journal.info('strategy_warm_up', "{symbol}: not resuming {strategy} state "
+                                         "({reason}); warming up.", symbol=symbol,
+                                         strategy=type(strategy).__name__, reason=str(e))
+            strategy.reset()
+            if self.feed.buffer(symbol).count:
+                warm_up(strategy, self.feed.market_data(symbol, timeframe=strategy.timeframe)['prices'])
+        self.signals.update((symbol, decision) for symbol, decision in state.get('signals', {}).items()
+                            if symbol in self.strategies)
+
+    def _report_status(self) -> None:
+        trader = self.trader
+        ticks = sum(buf.total for buf in self.feed.buffers.values())
+        trader.journal.info('engine_status', "{connection}; {ticks} ticks, {opened} trades opened, {open} open, "
+                            "equity {equity:.2f} (unrealized {unrealized:+.2f}); {jitter}",
+                            connection=trader.connection_message, ticks=ticks, opened=self.trades_opened,
+                            open=len(trader.positions), equity=trader.pnl.equity(),
+                            unrealized=trader.pnl.unrealized, jitter=trader.scheduler.format_jitter())
+
+    def _on_decision(self, symbol: str, decision: str) -> None:
+        if decision not in ('buy', 'sell') or self.signals.get(symbol) == decision:
+            return
+        trader = self.trader
+        if trader is None or not trader.is_connected:
+            return  # acted on once reconnected, if the strategy still says so
+        try:
+            trader.close_all(symbol)
+            trader.open_trade(symbol, self.volume, decision)
+        except (ConnectionError, ValueError) as e:
+            if self._failed.get(symbol) != decision:
+                self._failed[symbol] = decision
+                trader.journal.warning('decision_failed', "{symbol}: could not act on '{decision}': {error}",
+                                       symbol=symbol, decision=decision, error=str(e))
+            return
+        self._failed.pop(symbol, None)
+        self.signals[symbol] = decision
+        self.trades_opened += 1
+
+    async def run(self) -> bool:
+        """Connect and trade until ``stop`` is called. Returns False if logon failed."""
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self.trader = self._trader_factory(self.settings, loop=loop, market_data=self.feed)
+        self.registry.journal = self.trader.journal
+        snapshot = self._load_snapshot()
+        if snapshot is not None:
+            timestamp, state = snapshot
+            self._restore_ticks(state.get('ticks', {}))
+            self.trader.restore_snapshot(timestamp, state)
+        else:
+            self.trader.restore_positions()
+        self._build_strategies()
+        if snapshot is not None:
+            self._restore_strategies(snapshot[1])
+        if not await self.trader.connect_async():
+            return False
+        # From here on, dropped sessions are re-established with backoff.
+        self.trader.start_heartbeat()
+        scheduler = self.trader.scheduler
+        if self.eval_interval is not None:
+            self._timers.append(scheduler.call_every(self.eval_interval, self._evaluate_all))
+        if self.status_interval:
+            self._timers.append(scheduler.call_every(self.status_interval, self._report_status))
+        if self.recorder is not None:
+            self._timers.append(scheduler.call_every(RECORD_FLUSH_INTERVAL, self.recorder.flush))
+        if self.reload_interval:
+            self._timers.append(scheduler.call_every(self.reload_interval, self.registry.refresh))
+        if self.snapshots is not None:
+            self._timers.append(scheduler.call_every(self.snapshot_interval, self._take_snapshot))
+        self.trader.journal.info('engine_started', "Trading {count} symbols: {symbols}", count=len(self.symbols),
+                                 symbols=", ".join(f"{symbol} ({spec})" for symbol, spec in self.symbols))
+        try:
+            await self._stop.wait()
+        finally:
+            await self.shutdown()
+        return True
+
+    def stop(self) -> None:
+        """Ask ``run`` to return; safe to call from signal handlers on the loop."""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def shutdown(self) -> None:
+        trader = self.trader
+        if trader is None:
+            return
+        for timer in self._timers:
+            timer.cancel()
+        self._timers = []
+        trader.stop_heartbeat()
+        if self.flatten_on_exit and trader.is_connected:
+            trader.close_all()
+        if self.snapshots is not None:
+            self._take_snapshot()
+            self.snapshots.close()
+        if trader.is_connected:
+            await trader.disconnect_async()
+        if self.recorder is not None:
+            self.recorder.close()
+        trader.journal.info('engine_stopped', "Stopped after opening {opened} trades; {open} positions still open.",
+                            opened=self.trades_opened, open=len(trader.positions))
+        if trader.scheduler is not None:
+            trader.journal.info('scheduler_jitter', "{jitter}", jitter=trader.scheduler.format_jitter())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the Forex Scalper without a GUI.")
+    parser.add_argument('symbols', nargs='+', help="SYMBOL or SYMBOL:Strategy (module:Class also accepted)")
+    parser.add_argument('--strategy', default=DEFAULT_STRATEGY, help="strategy for symbols that name none")
+    parser.add_argument('--volume', type=float, default=0.01, help="lots per trade")
+    parser.add_argument('--eval-interval', type=float, default=None,
+                        help="evaluate strategies every N seconds instead of on every tick")
+    parser.add_argument('--status-interval', type=float, default=60.0, help="seconds between status lines (0 = off)")
+    parser.add_argument('--record', metavar='DIR', default=None, help="append every tick to a tick store in DIR")
+    parser.add_argument('--flatten-on-exit', action='store_true', help="close every position before stopping")
+    parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help="seconds between checks for edited strategy modules (0 = no hot reload)")
+    args = parser.parse_args(argv)
+
+    settings = Settings.load()
+    registry = StrategyRegistry.from_settings(settings)
+    try:
+        symbols = parse_symbols(args.symbols, args.strategy)
+        for _, spec in symbols:
+            registry.resolve(spec)
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+
+    engine = Engine(settings, symbols, volume=args.volume, flatten_on_exit=args.flatten_on_exit,
+                    eval_interval=args.eval_interval, status_interval=args.status_interval,
+                    record_dir=args.record, registry=registry, reload_interval=args.reload_interval)
+
+    async def _run() -> bool:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, engine.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: KeyboardInterrupt still ends asyncio.run
+        return await engine.run()
+
+    try:
+        ok = asyncio.run(_run())
+    except KeyboardInterrupt:
+        ok = True
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Thread-safe hand-off of trader and market data events to the GUI thread.
+
+Producers (the FIX session loop, quote callbacks, worker threads) call
+``post`` from any thread; the Tk thread calls ``drain`` from an ``after()``
+poll and applies the events in batches. Events posted with a key are
+coalesced: while one is still queued, newer events with the same key only
+replace its payload, so a burst of quotes or fills for one symbol or trade
+costs the GUI a single update per poll.
+"""
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+import threading
+
+Event = Tuple[str, Any]
+
+
+class EventBridge:
+    """FIFO of ``(kind, payload)`` events with per-key coalescing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: Deque[Tuple[str, Optional[Hashable], Any]] = deque()
+        # Latest payload of every keyed event still in the queue.
+        self._latest: Dict[Tuple[str, Hashable], Any] = {}
+        self.posted = 0
+        self.coalesced = 0
+
+    def post(self, kind: str, payload: Any, key: Optional[Hashable] = None) -> None:
+        """Queue an event; callable from any thread."""
+        with self._lock:
+            self.posted += 1
+            if key is None:
+                self._queue.append((kind, None, payload))
+                return
+            slot = (kind, key)
+            if slot in self._latest:
+                self.coalesced += 1
+            else:
+                self._queue.append((kind, key, None))
+            self._latest[slot] = payload
+
+    def drain(self, limit: Optional[int] = None) -> List[Event]:
+        """Remove and return up to ``limit`` events, oldest first."""
+        events: List[Event] = []
+        with self._lock:
+            queue = self._queue
+            latest = self._latest
+            n = len(queue) if limit is None else min(limit, len(queue))
+            for _ in range(n):
+                kind, key, payload = queue.popleft()
+                if key is not None:
+                    payload = latest.pop((kind, key))
+                events.append((kind, payload))
+        return events
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class EventDispatcher:
+    """Routes drained events to handlers registered per kind."""
+
+    def __init__(self, bridge: EventBridge):
+        self.bridge = bridge
+        self._handlers: Dict[str, List[Callable[[Any], None]]] = {}
+
+    def on(self, kind: str, handler: Callable[[Any], None]) -> None:
+        self._handlers.setdefault(kind, []).append(handler)
+
+    def dispatch(self, limit: Optional[int] = None) -> int:
+        """Apply one batch of events; returns how many were handled."""
+        events = self.bridge.drain(limit)
+        handlers = self._handlers
+        for kind, payload in events:
+            for handler in handlers.get(kind, ()):
+                handler(payload)
+        return len(events)
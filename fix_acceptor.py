@@ -0,0 +1,189 @@
+"""Loopback FIX 4.4 acceptor standing in for cTrader in tests and offline runs.
+
+It speaks enough of the session protocol for ``fix_session.FixSession`` to
+log on, heartbeat, resend and trade against it, and fills every
+NewOrderSingle immediately at a configurable price. Besides the tests,
+``sim_exchange.py`` builds its simulated venue on it and ``benchmarks.py``
+measures order round trips against it, so it lives with the application
+modules rather than under ``tests/``.
+"""
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import itertools
+
+from fix_codec import decode_message, encode_message, read_frame
+from fix_session import (
+    EXECUTION_REPORT, HEARTBEAT, LOGON, LOGOUT, MARKET_DATA_REQUEST, MARKET_DATA_SNAPSHOT,
+    NEW_ORDER_SINGLE, RESEND_REQUEST, SEQUENCE_RESET, TEST_REQUEST, utc_timestamp,
+)
+
+
+class _Connection:
+    """Session state for one connected initiator."""
+
+    def __init__(self, acceptor: 'LoopbackAcceptor', reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.acceptor = acceptor
+        self.reader = reader
+        self.writer = writer
+        self.next_out_seq = 1
+        self.target_comp_id = ''
+        self.target_sub_id = ''
+        # MarketDataRequest IDs by subscribed symbol.
+        self.md_subscriptions: Dict[str, str] = {}
+
+    def send(self, msg_type: str, body: List[Tuple[int, str]], seq: Optional[int] = None,
+             poss_dup: bool = False) -> None:
+        if seq is None:
+            seq = self.next_out_seq
+            self.next_out_seq += 1
+        sending_time = utc_timestamp()
+        header = [
+            (49, self.acceptor.sender_comp_id),
+            (56, self.target_comp_id),
+            (34, str(seq)),
+            (57, self.target_sub_id),
+            (52, sending_time),
+        ]
+        if poss_dup:
+            header += [(43, 'Y'), (122, sending_time)]
+        self.writer.write(encode_message(msg_type, header, body))
+
+    async def serve(self) -> None:
+        try:
+            while True:
+                fields = decode_message(await read_frame(self.reader))
+                self.acceptor.received.append(fields)
+                if not self.handle(fields):
+                    break
+                await self.writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.acceptor.connections.discard(self)
+            self.writer.close()
+
+    def handle(self, fields: Dict[int, str]) -> bool:
+        """Process one inbound message; False ends the connection."""
+        msg_type = fields.get(35)
+        acceptor = self.acceptor
+        if msg_type == LOGON:
+            self.target_comp_id = fields.get(49, '')
+            self.target_sub_id = fields.get(50, '')
+            if fields.get(141) == 'Y':
+                self.next_out_seq = 1
+            if acceptor.password is not None and fields.get(554) != acceptor.password:
+                self.send(LOGOUT, [(58, 'Invalid password')])
+                return False
+            self.send(LOGON, [(98, '0'), (108, fields.get(108, '30'))])
+        elif msg_type == TEST_REQUEST:
+            self.send(HEARTBEAT, [(112, fields.get(112, ''))])
+        elif msg_type == RESEND_REQUEST:
+            begin = int(fields.get(7, self.next_out_seq))
+            self.send(SEQUENCE_RESET, [(123, 'Y'), (36, str(self.next_out_seq))], seq=begin, poss_dup=True)
+        elif msg_type == LOGOUT:
+            self.send(LOGOUT, [])
+            return False
+        elif msg_type == NEW_ORDER_SINGLE:
+            self.execute(fields)
+        elif msg_type == MARKET_DATA_REQUEST:
+            symbol = fields.get(55, '')
+            if fields.get(263) == '2':
+                self.md_subscriptions.pop(symbol, None)
+            else:
+                self.md_subscriptions[symbol] = fields.get(262, '')
+                if symbol in acceptor.quotes:
+                    self.send_snapshot(symbol, *acceptor.quotes[symbol])
+        return True
+
+    def send_snapshot(self, symbol: str, bid: float, ask: float) -> None:
+        req_id = self.md_subscriptions.get(symbol)
+        if req_id is None:
+            return
+        self.send(MARKET_DATA_SNAPSHOT, [(262, req_id), (55, symbol), (268, '2'),
+                                         (269, '0'), (270, f"{bid:.10g}"),
+                                         (269, '1'), (270, f"{ask:.10g}")])
+
+    def execute(self, fields: Dict[int, str]) -> None:
+        acceptor = self.acceptor
+        symbol = fields.get(55, '')
+        order_id = str(next(acceptor._order_ids))
+        common = [(11, fields.get(11, '')), (37, order_id), (55, symbol), (54, fields.get(54, '')),
+                  (38, fields.get(38, '0'))]
+        if symbol in acceptor.reject_symbols:
+            self.send(EXECUTION_REPORT, common + [(17, f"E{order_id}"), (150, '8'), (39, '8'),
+                                                  (14, '0'), (6, '0'), (58, 'Symbol not tradable')])
+            return
+        position_id = fields.get(721) or str(next(acceptor._position_ids))
+        price = acceptor.price_for(symbol)
+        self.send(EXECUTION_REPORT, common + [(17, f"E{order_id}a"), (150, '0'), (39, '0'),
+                                              (14, '0'), (6, '0'), (721, position_id)])
+        self.send(EXECUTION_REPORT, common + [(17, f"E{order_id}b"), (150, 'F'), (39, '2'),
+                                              (14, fields.get(38, '0')), (6, f"{price:.10g}"),
+                                              (721, position_id)])
+
+
+class LoopbackAcceptor:
+    """Asyncio TCP server accepting FIX initiators on localhost.
+
+    ``prices`` maps symbols to fill prices (missing symbols fill at
+    ``default_price``); orders for ``reject_symbols`` are rejected. Quotes
+    given to ``publish_quote`` go to every market data subscriber and move
+    the fill price to the mid. Every inbound message is appended to
+    ``received`` for inspection.
+
+    Subclasses change per-connection behaviour through ``connection_class``
+    (see ``sim_exchange.SimulatedExchange``).
+    """
+
+    connection_class = _Connection
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, sender_comp_id: str = 'cServer',
+                 password: Optional[str] = None, prices: Optional[Dict[str, float]] = None,
+                 default_price: float = 1.0, reject_symbols: Optional[Set[str]] = None):
+        self.host = host
+        self.port = port
+        self.sender_comp_id = sender_comp_id
+        self.password = password
+        self.prices = dict(prices or {})
+        self.default_price = default_price
+        self.reject_symbols = set(reject_symbols or ())
+        self.quotes: Dict[str, Tuple[float, float]] = {}
+        self.received: List[Dict[int, str]] = []
+        self.connections: Set[_Connection] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._order_ids = itertools.count(1)
+        self._position_ids = itertools.count(1)
+
+    def price_for(self, symbol: str) -> float:
+        return self.prices.get(symbol, self.default_price)
+
+    def publish_quote(self, symbol: str, bid: float, ask: float) -> None:
+        self.quotes[symbol] = (bid, ask)
+        self.prices[symbol] = (bid + ask) / 2
+        for connection in list(self.connections):
+            connection.send_snapshot(symbol, bid, ask)
+
+    async def start(self) -> int:
+        """Start listening; returns the bound port (useful with ``port=0``)."""
+        self._server = await asyncio.start_server(self._on_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for connection in list(self.connections):
+            connection.writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = self.connection_class(self, reader, writer)
+        self.connections.add(connection)
+        await connection.serve()
+
+    def broadcast(self, callback: Callable[[_Connection], None]) -> None:
+        """Run ``callback`` against every live connection (e.g. to inject traffic)."""
+        for connection in list(self.connections):
+            callback(connection)
@@ -0,0 +1,480 @@
+"""Asynchronous FIX 4.4 initiator session.
+
+Implements the session layer cTrader's FIX API expects (logon, heartbeats,
+test requests, sequence numbers, resend requests, sequence resets, logout)
+on an asyncio buffered protocol, plus NewOrderSingle submission and
+ExecutionReport handling for the trade session.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import itertools
+import sys
+import time
+
+from fix_codec import Encoder, FixCodecError, FixMessage, FrameReader
+from scheduler import Scheduler, Timer
+
+# Message types used by the session.
+HEARTBEAT = '0'
+TEST_REQUEST = '1'
+RESEND_REQUEST = '2'
+REJECT = '3'
+SEQUENCE_RESET = '4'
+LOGOUT = '5'
+EXECUTION_REPORT = '8'
+LOGON = 'A'
+NEW_ORDER_SINGLE = 'D'
+MARKET_DATA_REQUEST = 'V'
+MARKET_DATA_SNAPSHOT = 'W'
+MARKET_DATA_INCREMENTAL = 'X'
+MARKET_DATA_REJECT = 'Y'
+BUSINESS_REJECT = 'j'
+
+ADMIN_TYPES = frozenset((HEARTBEAT, TEST_REQUEST, RESEND_REQUEST, REJECT, SEQUENCE_RESET, LOGOUT, LOGON))
+
+SIDE_CODES = {'buy': '1', 'sell': '2'}
+SIDE_NAMES = {code: name for name, code in SIDE_CODES.items()}
+
+
+class FixSessionError(Exception):
+    """Raised when the session cannot be established or is torn down."""
+
+
+def utc_timestamp() -> str:
+    """FIX UTCTimestamp with millisecond precision."""
+    return datetime.now(timezone.utc).strftime('%Y%m%d-%H:%M:%S.%f')[:-3]
+
+
+@dataclass
+class ExecutionReport:
+    """The ExecutionReport fields the trader cares about."""
+
+    cl_ord_id: str
+    order_id: str
+    exec_type: str
+    ord_status: str
+    symbol: str
+    side: str
+    cum_qty: float
+    avg_px: float
+    position_id: Optional[str] = None
+    text: str = ''
+
+    @property
+    def rejected(self) -> bool:
+        return self.ord_status == '8'
+
+    @property
+    def filled(self) -> bool:
+        return self.ord_status == '2'
+
+    @classmethod
+    def from_fields(cls, fields: Union[FixMessage, Dict[int, str]]) -> 'ExecutionReport':
+        return cls(
+            cl_ord_id=fields.get(11, ''),
+            order_id=fields.get(37, ''),
+            exec_type=fields.get(150, ''),
+            ord_status=fields.get(39, ''),
+            symbol=fields.get(55, ''),
+            side=SIDE_NAMES.get(fields.get(54, ''), ''),
+            cum_qty=float(fields.get(14) or 0),
+            avg_px=float(fields.get(6) or 0),
+            position_id=fields.get(721),
+            text=fields.get(58, ''),
+        )
+
+
+class _SessionProtocol(asyncio.BufferedProtocol):
+    """Feeds socket data straight into the session's receive buffer."""
+
+    def __init__(self, session: 'FixSession'):
+        self.session = session
+        # TCP already guarantees integrity; skip the per-byte CheckSum sum.
+        self.frames = FrameReader(validate_checksum=False)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.frames.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.frames.buffer_updated(nbytes)
+        session = self.session
+        try:
+            for message in self.frames:
+                session._handle(message)
+        except (FixCodecError, FixSessionError, ValueError) as exc:
+            # Malformed or out-of-sequence traffic; subscriber errors are
+            # caught in FixSession._notify and never get here.
+            session._abort(str(exc))
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.session._on_connection_lost(exc)
+
+
+class FixSession:
+    """One FIX 4.4 initiator session over an asyncio TCP stream.
+
+    All coroutines must run on the same event loop. Order submission does
+    not wait for the network: ``submit_order`` queues the frame on the
+    transport and returns a future resolved by the first ExecutionReport
+    (or reject) for that ClOrdID.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender_comp_id: str,
+        target_comp_id: str,
+        sender_sub_id: str = 'TRADE',
+        password: str = '',
+        heartbeat_interval: int = 30,
+        next_out_seq: int = 1,
+        next_in_seq: int = 1,
+        scheduler: Optional[Scheduler] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.sender_comp_id = sender_comp_id
+        self.target_comp_id = target_comp_id
+        self.sender_sub_id = sender_sub_id
+        self.password = password
+        self.heartbeat_interval = heartbeat_interval
+
+        self.next_out_seq = next_out_seq
+        self.next_in_seq = next_in_seq
+        self.logged_on = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Heartbeat timers run on this scheduler (one is created at logon if
+        # not given; pass the engine's to share it across sessions).
+        self.scheduler = scheduler
+
+        # Callbacks, invoked on the event loop.
+        self.on_execution_report: List[Callable[[ExecutionReport], None]] = []
+        self.on_disconnect: List[Callable[[str], None]] = []
+        # Market data handlers get the raw message view, valid only during the call.
+        self.on_market_data: List[Callable[[FixMessage], None]] = []
+        # Called with (exception, callback) when one of the callbacks above
+        # raises; the session carries on. Unset, the error goes to stderr.
+        self.on_callback_error: Optional[Callable[[Exception, Callable], None]] = None
+
+        self._encoder = Encoder([
+            (49, sender_comp_id),
+            (56, target_comp_id),
+            (50, sender_sub_id),
+            # cTrader routes on TargetSubID, which mirrors SenderSubID.
+            (57, sender_sub_id),
+        ])
+        self._transport: Optional[asyncio.Transport] = None
+        self._timers: List[Timer] = []
+        self._logon_waiter: Optional[asyncio.Future] = None
+        self._logout_waiter: Optional[asyncio.Future] = None
+        self._pending_orders: Dict[str, asyncio.Future] = {}
+        # ClOrdID by the MsgSeqNum that carried it, for session-level Rejects
+        # (35=3), which name the order only by RefSeqNum. Pruned lazily.
+        self._order_seqs: Dict[int, str] = {}
+        self._order_ids = itertools.count(1)
+        self._last_sent = 0.0
+        self._last_received = 0.0
+        self._test_request_id: Optional[str] = None
+        self._resend_pending = False
+
+    # -- lifecycle ---------------------------------------------------------
+
+    @property
+    def username(self) -> str:
+        """cTrader expects the numeric account (last SenderCompID part) as Username."""
+        return self.sender_comp_id.rsplit('.', 1)[-1]
+
+    async def logon(self, timeout: float = 10.0, reset_seq_num: bool = False) -> None:
+        """Open the TCP connection and complete the Logon handshake."""
+        loop = self.loop = asyncio.get_running_loop()
+        self._transport, _ = await asyncio.wait_for(
+            loop.create_connection(lambda: _SessionProtocol(self), self.host, self.port), timeout)
+        if reset_seq_num:
+            self.next_out_seq = 1
+            self.next_in_seq = 1
+        self._last_received = self._last_sent = time.monotonic()
+        self._test_request_id = None
+        self._resend_pending = False
+        self._logon_waiter = loop.create_future()
+        if self.scheduler is None:
+            self.scheduler = Scheduler(loop)
+        self._timers = [
+            self.scheduler.call_later(self.heartbeat_interval, self._heartbeat_due),
+            self.scheduler.call_later(1.2 * self.heartbeat_interval, self._watchdog),
+        ]
+
+        body = [(98, '0'), (108, str(self.heartbeat_interval))]
+        if reset_seq_num:
+            body.append((141, 'Y'))
+        body += [(553, self.username), (554, self.password)]
+        self._send(LOGON, body)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._logon_waiter), timeout)
+        except BaseException:
+            self._logon_waiter.cancel()
+            await self._close("Logon failed")
+            raise
+        self.logged_on = True
+
+    async def logout(self, text: str = '', timeout: float = 2.0) -> None:
+        """Send Logout, wait briefly for the confirmation and close."""
+        if self._transport is None:
+            return
+        if self.logged_on:
+            self._logout_waiter = asyncio.get_running_loop().create_future()
+            self._send(LOGOUT, [(58, text)] if text else [])
+            try:
+                await asyncio.wait_for(self._logout_waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+        await self._close("Logged out")
+
+    def _abort(self, reason: str) -> None:
+        asyncio.get_running_loop().create_task(self._close(reason))
+
+    def _on_connection_lost(self, exc: Optional[Exception]) -> None:
+        if self._transport is None:
+            return  # closed by us
+        if self._logout_waiter is not None and self._logout_waiter.done():
+            reason = "Logged out"
+        else:
+            reason = str(exc) if exc else "Connection closed by peer"
+        self._abort(reason)
+
+    async def _close(self, reason: str) -> None:
+        transport, self._transport = self._transport, None
+        was_logged_on, self.logged_on = self.logged_on, False
+        for timer in self._timers:
+            timer.cancel()
+        self._timers = []
+        for waiter in (self._logon_waiter, self._logout_waiter):
+            if waiter is not None and not waiter.done():
+                waiter.set_exception(FixSessionError(reason))
+        self._logout_waiter = None
+        for future in self._pending_orders.values():
+            if not future.done():
+                future.set_exception(FixSessionError(reason))
+        self._pending_orders.clear()
+        self._order_seqs.clear()
+        if transport is not None:
+            transport.close()
+        if was_logged_on:
+            self._notify(self.on_disconnect, reason)
+
+    # -- sending -----------------------------------------------------------
+
+    def _send(self, msg_type: str, body: List[Tuple[int, str]], seq: Optional[int] = None,
+              poss_dup: bool = False) -> int:
+        if seq is None:
+            seq = self.next_out_seq
+            self.next_out_seq += 1
+        self._write(self._encoder.encode(msg_type, seq, body, poss_dup))
+        return seq
+
+    def _write(self, frame: bytes) -> None:
+        if self._transport is None:
+            raise FixSessionError("Session is not connected.")
+        self._transport.write(frame)
+        self._last_sent = time.monotonic()
+
+    def next_cl_ord_id(self) -> str:
+        return f"{self.username}-{int(time.time())}-{next(self._order_ids)}"
+
+    def submit_order(self, symbol: str, side: str, quantity: float, cl_ord_id: Optional[str] = None,
+                     price: Optional[float] = None, position_id: Optional[str] = None) -> asyncio.Future:
+        """Send a NewOrderSingle without waiting for the network.
+
+        A market order is sent unless ``price`` is given (limit). Passing a
+        ``position_id`` closes that cTrader position.
+        """
+        return self.submit_orders([(symbol, side, quantity, cl_ord_id, price, position_id)])[0]
+
+    def submit_orders(self, orders: Sequence[tuple]) -> List[asyncio.Future]:
+        """Pipeline several NewOrderSingles in a single transport write.
+
+        Each order is a ``(symbol, side, quantity, cl_ord_id, price,
+        position_id)`` tuple as for ``submit_order``; one future per order is
+        returned in the same order. cTrader has no NewOrderList, so this is
+        the batch form it accepts.
+        """
+        if not self.logged_on:
+            raise FixSessionError("Session is not logged on.")
+        loop = asyncio.get_running_loop()
+        encode = self._encoder.new_order_single
+        order_seqs = self._order_seqs
+        if len(order_seqs) > 2 * len(self._pending_orders) + 1024:
+            pending = self._pending_orders
+            order_seqs = self._order_seqs = {s: c for s, c in order_seqs.items() if c in pending}
+        frames = []
+        futures = []
+        seq = self.next_out_seq
+        for symbol, side, quantity, cl_ord_id, price, position_id in orders:
+            cl_ord_id = cl_ord_id or self.next_cl_ord_id()
+            frames.append(encode(seq, cl_ord_id, symbol, SIDE_CODES[side], f"{quantity:g}",
+                                 price=None if price is None else f"{price:.10g}", position_id=position_id))
+            order_seqs[seq] = cl_ord_id
+            seq += 1
+            future = loop.create_future()
+            self._pending_orders[cl_ord_id] = future
+            futures.append(future)
+        try:
+            self._write(b''.join(frames))
+        except FixSessionError:
+            for future in futures:
+                future.cancel()
+            raise
+        self.next_out_seq = seq
+        return futures
+
+    def request_market_data(self, symbol: str, req_id: str, depth: int = 1, incremental: bool = False) -> None:
+        """Subscribe to bid/offer updates for ``symbol`` (MarketDataRequest).
+
+        ``depth=1`` asks for top of book, 0 for the full book. Full refresh
+        snapshots are requested unless ``incremental`` is set.
+        """
+        self._send(MARKET_DATA_REQUEST, [
+            (262, req_id),
+            (263, '1'),  # snapshot + updates
+            (264, str(depth)),
+            (265, '1' if incremental else '0'),
+            (146, '1'),
+            (55, symbol),
+            (267, '2'),
+            (269, '0'),
+            (269, '1'),
+        ])
+
+    def cancel_market_data(self, symbol: str, req_id: str) -> None:
+        self._send(MARKET_DATA_REQUEST, [(262, req_id), (263, '2'), (264, '0'), (146, '1'), (55, symbol)])
+
+    # -- receiving ---------------------------------------------------------
+
+    def _handle(self, fields: FixMessage) -> None:
+        """Process one inbound message (a view valid only during the call)."""
+        self._last_received = time.monotonic()
+        msg_type = fields.get(35, '')
+        seq = fields.get_int(34)
+
+        if msg_type == SEQUENCE_RESET and fields.get(123) != 'Y':
+            # Reset mode ignores sequence numbers entirely.
+            self.next_in_seq = fields.get_int(36)
+            return
+        if seq > self.next_in_seq:
+            # Gap: ask for everything from the first missing message and
+            # drop out-of-order traffic until the resend arrives.
+            if msg_type == LOGOUT:
+                self._on_logout(fields)
+            elif not self._resend_pending:
+                self._resend_pending = True
+                self._send(RESEND_REQUEST, [(7, str(self.next_in_seq)), (16, '0')])
+            if msg_type == LOGON and self._logon_waiter and not self._logon_waiter.done():
+                self._logon_waiter.set_result(True)
+            return
+        if seq < self.next_in_seq:
+            if fields.get(43) == 'Y':
+                return  # duplicate of something already processed
+            raise FixSessionError(f"MsgSeqNum too low, expecting {self.next_in_seq} but received {seq}")
+
+        self.next_in_seq = seq + 1
+        self._resend_pending = False
+
+        if msg_type == HEARTBEAT:
+            if self._test_request_id and fields.get(112) == self._test_request_id:
+                self._test_request_id = None
+        elif msg_type == TEST_REQUEST:
+            self._send(HEARTBEAT, [(112, fields.get(112, ''))])
+        elif msg_type == RESEND_REQUEST:
+            self._on_resend_request(fields)
+        elif msg_type == SEQUENCE_RESET:
+            self.next_in_seq = fields.get_int(36)
+        elif msg_type == LOGON:
+            if self._logon_waiter and not self._logon_waiter.done():
+                self._logon_waiter.set_result(True)
+        elif msg_type == LOGOUT:
+            self._on_logout(fields)
+        elif msg_type in (MARKET_DATA_SNAPSHOT, MARKET_DATA_INCREMENTAL, MARKET_DATA_REJECT):
+            self._notify(self.on_market_data, fields)
+        elif msg_type == EXECUTION_REPORT:
+            self._on_execution_report(ExecutionReport.from_fields(fields))
+        elif msg_type in (REJECT, BUSINESS_REJECT):
+            self._on_reject(fields)
+
+    def _on_resend_request(self, fields: FixMessage) -> None:
+        # Orders are never replayed: a stale resent order is worse than a
+        # missing one, so the whole range is gap-filled.
+        begin = fields.get_int(7, self.next_out_seq)
+        self._send(SEQUENCE_RESET, [(123, 'Y'), (36, str(self.next_out_seq))], seq=begin, poss_dup=True)
+
+    def _on_logout(self, fields: FixMessage) -> None:
+        text = fields.get(58, 'Logout')
+        if self._logout_waiter is not None:
+            if not self._logout_waiter.done():
+                self._logout_waiter.set_result(True)
+            return
+        if self._logon_waiter is not None and not self._logon_waiter.done():
+            self._logon_waiter.set_exception(FixSessionError(f"Logon rejected: {text}"))
+        if self._transport is not None:
+            self._send(LOGOUT, [])
+        self._abort(text)
+
+    def _on_execution_report(self, report: ExecutionReport) -> None:
+        future = self._pending_orders.pop(report.cl_ord_id, None)
+        if future is not None and not future.done():
+            future.set_result(report)
+        self._notify(self.on_execution_report, report)
+
+    def _notify(self, callbacks: list, arg) -> None:
+        """Call each subscriber, isolating the session from their errors."""
+        for callback in callbacks:
+            try:
+                callback(arg)
+            except Exception as exc:
+                if self.on_callback_error is not None:
+                    self.on_callback_error(exc, callback)
+                else:
+                    print(f"FIX session {self.sender_sub_id}: {getattr(callback, '__qualname__', callback)} "
+                          f"raised {exc!r}", file=sys.stderr)
+
+    def _on_reject(self, fields: FixMessage) -> None:
+        text = fields.get(58, 'Rejected')
+        if fields.get(35) == REJECT:
+            # Session-level rejects only give the rejected message's MsgSeqNum.
+            cl_ord_id = self._order_seqs.pop(fields.get_int(45), None)
+        else:
+            # Business rejects carry the ClOrdID in BusinessRejectRefID.
+            cl_ord_id = fields.get(379) or fields.get(11)
+        future = self._pending_orders.pop(cl_ord_id, None) if cl_ord_id else None
+        if future is not None and not future.done():
+            future.set_exception(FixSessionError(text))
+
+    # -- timers ------------------------------------------------------------
+
+    # Deadlines follow the last send/receive, so a busy session never
+    # heartbeats; each timer re-arms itself for the next possible deadline.
+
+    def _rearm(self, index: int, deadline: float, callback: Callable[[], None]) -> None:
+        if self._transport is None:
+            return
+        self._timers[index] = self.scheduler.call_later(max(0.0, deadline - time.monotonic()), callback)
+
+    def _heartbeat_due(self) -> None:
+        interval = self.heartbeat_interval
+        if time.monotonic() - self._last_sent >= interval:
+            self._send(HEARTBEAT, [])
+        self._rearm(0, self._last_sent + interval, self._heartbeat_due)
+
+    def _watchdog(self) -> None:
+        interval = self.heartbeat_interval
+        now = time.monotonic()
+        if self._test_request_id and now - self._last_received > 2 * interval:
+            self._abort("Heartbeat timeout")
+            return
+        if not self._test_request_id and now - self._last_received > 1.2 * interval:
+            self._test_request_id = f"TEST{int(now * 1000)}"
+            self._send(TEST_REQUEST, [(112, self._test_request_id)])
+        limit = 2 * interval if self._test_request_id else 1.2 * interval
+        # Just past the limit, so the check above sees it exceeded.
+        self._rearm(1, self._last_received + limit + 0.001, self._watchdog)
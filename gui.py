@@ -1,12 +1,21 @@
 """Tkinter GUI for the scalping application."""
 import tkinter as tk
-from tkinter import ttk
+from tkinter import filedialog, ttk
 from settings import Settings
 from trading import Trader
-from strategies import SafeStrategy, ModerateStrategy, AggressiveStrategy
+from event_bridge import EventBridge, EventDispatcher
+from market_data import MarketDataFeed
+from strategy_registry import StrategyRegistry
 
 
 class MainApplication(tk.Tk):
+    # Trader events are applied from the Tk thread every EVENT_POLL_MS, at most
+    # EVENT_BATCH per poll so a burst cannot stall redrawing.
+    EVENT_POLL_MS = 50
+    EVENT_BATCH = 2000
+    # Interval of the check for new or edited strategy plugins.
+    STRATEGY_RELOAD_MS = 2000
+
     def __init__(self):
         super().__init__()
         self.title("Forex Scalper")
@@ -16,7 +25,21 @@ class MainApplication(tk.Tk):
         # The Trader instance is initialized with the settings loaded at startup.
         # If active_environment is changed in settings, the application
         # currently needs to be restarted for the Trader to use the new environment.
-        self.trader = Trader(self.settings)
+        self.market_data = MarketDataFeed()
+        self.trader = Trader(self.settings, market_data=self.market_data)
+        self.trader.restore_positions()
+        self.strategies = StrategyRegistry.from_settings(self.settings, journal=self.trader.journal)
+
+        # Trader and quote callbacks run on the FIX session thread; they only
+        # post to this bridge, which _poll_events drains on the Tk thread.
+        self.events = EventBridge()
+        self.dispatcher = EventDispatcher(self.events)
+        self._watched_symbols = set()
+        self.trader.on_trade_update.append(
+            lambda trade: self.events.post("trade", trade, key=trade["id"]))
+        self.trader.on_connection_change.append(
+            lambda connected, message: self.events.post("connection", (connected, message), key="connection"))
+        self.trader.pnl.listeners.append(lambda account: self.events.post("account", account, key="account"))
         # Maintain a background connection to allow unattended operation
         self.trader.start_heartbeat()
 
@@ -30,11 +53,31 @@ class MainApplication(tk.Tk):
             frame.grid(row=0, column=0, sticky="nsew")
 
         self.show_frame("TradingPage")
+        self.after(self.EVENT_POLL_MS, self._poll_events)
+        self.after(self.STRATEGY_RELOAD_MS, self._reload_strategies)
 
     def show_frame(self, name: str):
         frame = self.frames[name]
         frame.tkraise()
 
+    def watch_symbol(self, symbol: str):
+        """Subscribe to ``symbol`` and forward its quotes to the GUI."""
+        if symbol in self._watched_symbols:
+            return
+        self._watched_symbols.add(symbol)
+        self.market_data.subscribe(
+            symbol, lambda sym, ts, bid, ask: self.events.post("quote", (sym, bid, ask), key=sym))
+
+    def _poll_events(self):
+        self.dispatcher.dispatch(self.EVENT_BATCH)
+        # Come straight back while a backlog remains.
+        self.after(1 if len(self.events) else self.EVENT_POLL_MS, self._poll_events)
+
+    def _reload_strategies(self):
+        self.strategies.refresh()
+        self.frames["TradingPage"].strategy_combobox["values"] = self.strategies.names()
+        self.after(self.STRATEGY_RELOAD_MS, self._reload_strategies)
+
 
 class TradingPage(ttk.Frame):
     def __init__(self, parent, controller):
@@ -85,7 +128,7 @@ class TradingPage(ttk.Frame):
         self.strategy_combobox = ttk.Combobox(
             strategy_actions_frame,
             textvariable=self.strategy_var,
-            values=["SafeStrategy", "ModerateStrategy", "AggressiveStrategy"],
+            values=controller.strategies.names(),
             width=20
         )
         self.strategy_combobox.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
@@ -106,6 +149,15 @@ class TradingPage(ttk.Frame):
         self.activity_button = ttk.Button(nav_frame, text="Activity Log", command=lambda: controller.show_frame("ActivityPage"))
         self.activity_button.pack(side="left", padx=5)
 
+        self.connection_label = ttk.Label(nav_frame, text="Disconnected", foreground="gray")
+        self.connection_label.pack(side="right", padx=5)
+
+        self.quote_label = ttk.Label(nav_frame, text="", font=("Courier", 10))
+        self.quote_label.pack(side="right", padx=5)
+
+        self.account_label = ttk.Label(nav_frame, text="", font=("Courier", 10))
+        self.account_label.pack(side="right", padx=5)
+
         # --- Feedback Label ---
         self.feedback_label = ttk.Label(self, text="", anchor="center")
         self.feedback_label.grid(row=2, column=0, columnspan=2, padx=5, pady=10, sticky="ew")
@@ -115,6 +167,40 @@ class TradingPage(ttk.Frame):
         self.columnconfigure(1, weight=1)
         # self.rowconfigure(0, weight=1) # If you want frames to expand vertically too
 
+        # Trade submitted from this page whose outcome the feedback label reports
+        self._last_trade_id = None
+        controller.dispatcher.on("connection", self.on_connection_change)
+        controller.dispatcher.on("quote", self.on_quote)
+        controller.dispatcher.on("trade", self.on_trade_update)
+        controller.dispatcher.on("account", self.on_account_update)
+
+    def on_account_update(self, account):
+        pnl = account["unrealized"]
+        self.account_label.config(text=f"Equity {account['equity']:,.2f} (P/L {pnl:+,.2f})",
+                                  foreground="green" if pnl >= 0 else "red")
+
+    def on_connection_change(self, event):
+        connected, message = event
+        self.connection_label.config(text=message, foreground="green" if connected else "gray")
+
+    def on_quote(self, event):
+        symbol, bid, ask = event
+        if symbol == self.symbol_var.get().strip().upper():
+            self.quote_label.config(text=f"{symbol} {bid:.5f} / {ask:.5f}")
+
+    def on_trade_update(self, trade):
+        if trade["id"] != self._last_trade_id:
+            return
+        status = trade["status"]
+        if status == "open":
+            self.feedback_label.config(
+                text=f"Trade {trade['id']} filled: {trade['direction'].capitalize()} {trade['volume']} of "
+                     f"{trade['symbol']} at {trade['entry_price']}.",
+                foreground="green"
+            )
+        elif status == "rejected":
+            self.feedback_label.config(text=f"Trade {trade['id']} was rejected.", foreground="red")
+
     def execute_trade(self):
         symbol = self.symbol_var.get().strip().upper()
         volume_str = self.volume_var.get().strip()
@@ -151,25 +237,24 @@ class TradingPage(ttk.Frame):
                 return
 
         selected_strategy_name = self.strategy_var.get()
-        strategy_class_map = {
-            "SafeStrategy": SafeStrategy,
-            "ModerateStrategy": ModerateStrategy,
-            "AggressiveStrategy": AggressiveStrategy
-        }
-
-        strategy_class = strategy_class_map.get(selected_strategy_name)
-        if not strategy_class: # Should not happen with Combobox
-            self.feedback_label.config(text="Invalid strategy selected.", foreground="red")
+        try:
+            # One instance per symbol and strategy, kept across clicks.
+            strategy = self.controller.strategies.instance(symbol, selected_strategy_name)
+        except Exception as e:  # Unknown name or a plugin that fails to import
+            self.feedback_label.config(text=f"Invalid strategy selected: {e}", foreground="red")
             return
 
-        strategy = strategy_class()
-        # Market data is still None. In a real scenario, this would be fetched or passed.
-        # Potentially, symbol could be used to fetch relevant market data.
-        decision = strategy.decide(market_data=None)
+        # Subscribing is a no-op for known symbols; a new symbol starts
+        # streaming now and has prices from the next click on.
+        self.controller.watch_symbol(symbol)
+        decision = strategy.decide(market_data=self.controller.market_data.market_data(symbol, timeframe=strategy.timeframe))
+        self.controller.trader.latency.decision(symbol, selected_strategy_name)
 
         if decision in ("buy", "sell"):
             try:
-                self.controller.trader.open_trade(
+                # Only queues the order for the session thread; the fill or
+                # rejection comes back through on_trade_update.
+                self._last_trade_id = self.controller.trader.open_trade(
                     symbol=symbol,
                     volume=volume,
                     direction=decision,
@@ -177,8 +262,8 @@ class TradingPage(ttk.Frame):
                     take_profit=take_profit
                 )
                 self.feedback_label.config(
-                    text=f"Trade {decision.capitalize()} {volume} of {symbol} initiated.",
-                    foreground="green"
+                    text=f"Trade {decision.capitalize()} {volume} of {symbol} submitted.",
+                    foreground="blue"
                 )
             except ValueError as ve: # Catch specific validation errors from Trader
                 self.feedback_label.config(text=f"Trade failed: {ve}", foreground="red")
@@ -212,29 +297,35 @@ class SettingsPage(ttk.Frame):
         self.fix_port_entry = ttk.Entry(credentials_frame, textvariable=self.fix_port_var, width=10)
         self.fix_port_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w") # sticky w for short field
 
+        # FIX Quote Port
+        ttk.Label(credentials_frame, text="Quote Port:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.fix_quote_port_var = tk.StringVar()
+        self.fix_quote_port_entry = ttk.Entry(credentials_frame, textvariable=self.fix_quote_port_var, width=10)
+        self.fix_quote_port_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+
         # FIX SenderCompID
-        ttk.Label(credentials_frame, text="SenderCompID:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(credentials_frame, text="SenderCompID:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
         self.fix_sender_comp_id_var = tk.StringVar()
         self.fix_sender_comp_id_entry = ttk.Entry(credentials_frame, textvariable=self.fix_sender_comp_id_var, width=40)
-        self.fix_sender_comp_id_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        self.fix_sender_comp_id_entry.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
 
         # FIX TargetCompID
-        ttk.Label(credentials_frame, text="TargetCompID:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(credentials_frame, text="TargetCompID:").grid(row=4, column=0, padx=5, pady=5, sticky="w")
         self.fix_target_comp_id_var = tk.StringVar()
         self.fix_target_comp_id_entry = ttk.Entry(credentials_frame, textvariable=self.fix_target_comp_id_var, width=40)
-        self.fix_target_comp_id_entry.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+        self.fix_target_comp_id_entry.grid(row=4, column=1, padx=5, pady=5, sticky="ew")
 
         # FIX SenderSubID
-        ttk.Label(credentials_frame, text="SenderSubID:").grid(row=4, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(credentials_frame, text="SenderSubID:").grid(row=5, column=0, padx=5, pady=5, sticky="w")
         self.fix_sender_sub_id_var = tk.StringVar()
         self.fix_sender_sub_id_entry = ttk.Entry(credentials_frame, textvariable=self.fix_sender_sub_id_var, width=40)
-        self.fix_sender_sub_id_entry.grid(row=4, column=1, padx=5, pady=5, sticky="ew")
+        self.fix_sender_sub_id_entry.grid(row=5, column=1, padx=5, pady=5, sticky="ew")
 
         # FIX Password
-        ttk.Label(credentials_frame, text="Password:").grid(row=5, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(credentials_frame, text="Password:").grid(row=6, column=0, padx=5, pady=5, sticky="w")
         self.fix_password_var = tk.StringVar()
         self.fix_password_entry = ttk.Entry(credentials_frame, textvariable=self.fix_password_var, width=40, show='*')
-        self.fix_password_entry.grid(row=5, column=1, padx=5, pady=5, sticky="ew")
+        self.fix_password_entry.grid(row=6, column=1, padx=5, pady=5, sticky="ew")
 
         credentials_frame.columnconfigure(1, weight=1) # Make entry fields expand (except port)
 
@@ -256,6 +347,7 @@ class SettingsPage(ttk.Frame):
         settings = self.controller.settings
         self.fix_host_var.set(settings.fix_host)
         self.fix_port_var.set(str(settings.fix_port)) # Port is int in settings, str for Entry
+        self.fix_quote_port_var.set(str(settings.fix_quote_port))
         self.fix_sender_comp_id_var.set(settings.fix_sender_comp_id)
         self.fix_target_comp_id_var.set(settings.fix_target_comp_id)
         self.fix_sender_sub_id_var.set(settings.fix_sender_sub_id)
@@ -278,6 +370,10 @@ class SettingsPage(ttk.Frame):
             # A more robust solution would show a message in the UI.
             print(f"Warning: Invalid port number '{self.fix_port_var.get()}'. Port not saved.")
             # Optionally, could revert fix_port_var to original value or highlight error.
+        try:
+            settings.fix_quote_port = int(self.fix_quote_port_var.get())
+        except ValueError:
+            print(f"Warning: Invalid quote port number '{self.fix_quote_port_var.get()}'. Quote port not saved.")
 
         settings.fix_sender_comp_id = self.fix_sender_comp_id_var.get()
         settings.fix_target_comp_id = self.fix_target_comp_id_var.get()
@@ -291,20 +387,70 @@ class SettingsPage(ttk.Frame):
         print("Settings saved.") # Placeholder feedback
 
 class ActivityPage(ttk.Frame):
+    COLUMNS = ("id", "symbol", "direction", "volume", "status", "entry_price", "position_id")
+    # Trades in these states have left the book and are dropped from the view.
+    FINISHED = ("closed", "rejected")
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
+        controller.dispatcher.on("trade", self.apply_trade)
         ttk.Label(self, text="Activity Page").pack(pady=10)
-        ttk.Button(self, text="Back", command=lambda: controller.show_frame("TradingPage")).pack()
-        self.output = tk.Text(self, height=15)
-        self.output.pack(fill="both", expand=True)
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack()
+        ttk.Button(button_frame, text="Back", command=lambda: controller.show_frame("TradingPage")).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Refresh", command=self.refresh).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Export Latency JSON", command=self.export_latency).pack(side="left", padx=5)
+
+        self.trade_view = ttk.Treeview(self, columns=self.COLUMNS, show="headings", height=12)
+        for column in self.COLUMNS:
+            self.trade_view.heading(column, text=column.replace("_", " ").title())
+            self.trade_view.column(column, width=80, anchor="w")
+        self.trade_view.pack(fill="both", expand=True)
+        # Values currently shown per trade id, so updates touch changed rows only
+        self._rows = {}
+
+        latency_frame = ttk.Labelframe(self, text="Tick-to-Trade Latency", padding="5")
+        latency_frame.pack(fill="x")
+        self.latency_output = tk.Text(latency_frame, height=7, font=("Courier", 9))
+        self.latency_output.pack(fill="x")
         self.refresh()
 
+    def apply_trade(self, trade):
+        """Insert, update or remove the row for one trade."""
+        trade_id = trade["id"]
+        shown = self._rows.get(trade_id)
+        if trade["status"] in self.FINISHED:
+            if shown is not None:
+                self.trade_view.delete(trade_id)
+                del self._rows[trade_id]
+            return
+        values = tuple("" if trade[column] is None else trade[column] for column in self.COLUMNS)
+        if shown is None:
+            self.trade_view.insert("", tk.END, iid=trade_id, values=values)
+        elif shown != values:
+            self.trade_view.item(trade_id, values=values)
+        else:
+            return
+        self._rows[trade_id] = values
+
     def refresh(self):
+        """Reconcile the view with the trader's book and redraw latency."""
         trades = self.controller.trader.get_open_trades()
-        self.output.delete("1.0", tk.END)
+        current = {trade["id"] for trade in trades}
+        for trade_id in [trade_id for trade_id in self._rows if trade_id not in current]:
+            self.trade_view.delete(trade_id)
+            del self._rows[trade_id]
         for trade in trades:
-            self.output.insert(tk.END, f"{trade}\n")
+            self.apply_trade(trade)
+        self.latency_output.delete("1.0", tk.END)
+        self.latency_output.insert(tk.END, self.controller.trader.latency.format_summary())
+
+    def export_latency(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            self.controller.trader.latency.export_json(path)
 
 
 if __name__ == "__main__":
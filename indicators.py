@@ -0,0 +1,226 @@
+"""Incremental rolling-window indicators.
+
+Every indicator here is updated one value at a time in O(1) and never slices
+or copies its history, so strategies can be fed tick by tick instead of
+recomputing averages over the whole price list on every decision.
+``get_state``/``set_state`` export and resume that state as plain values,
+so a restarted engine need not replay the ticks that built it.
+"""
+from array import array
+from math import sqrt
+from typing import Optional
+
+
+class RollingWindow:
+    """Fixed-size ring buffer of floats with running sum and sum of squares."""
+
+    __slots__ = ('size', '_buf', '_index', '_count', '_sum', '_sumsq')
+
+    def __init__(self, size: int):
+        if not isinstance(size, int) or size <= 0:
+            raise ValueError("Window size must be a positive integer.")
+        self.size = size
+        self._buf = array('d', bytes(8 * size))  # preallocated, zero filled
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count == self.size
+
+    def push(self, value: float) -> Optional[float]:
+        """Add a value, returning the value it evicted (None while filling)."""
+        value = float(value)
+        buf = self._buf
+        i = self._index
+        evicted = None
+        if self._count == self.size:
+            evicted = buf[i]
+            self._sum += value - evicted
+            self._sumsq += value * value - evicted * evicted
+        else:
+            self._count += 1
+            self._sum += value
+            self._sumsq += value * value
+        buf[i] = value
+        i += 1
+        if i == self.size:
+            i = 0
+            # Re-sum once per lap so add/subtract rounding error cannot
+            # accumulate; amortised this is still O(1) per push.
+            self._resync()
+        self._index = i
+        return evicted
+
+    def _resync(self) -> None:
+        # Only called on wrap-around, when every slot holds a live value.
+        buf = self._buf
+        self._sum = sum(buf)
+        self._sumsq = sum(v * v for v in buf)
+
+    @property
+    def last(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._buf[self._index - 1]
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def mean(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+    def variance(self) -> Optional[float]:
+        """Population variance of the values currently in the window."""
+        if not self._count:
+            return None
+        m = self._sum / self._count
+        # Clamp tiny negative results caused by cancellation.
+        return max(self._sumsq / self._count - m * m, 0.0)
+
+    def values(self) -> list:
+        """Window contents oldest first (copies; not for the hot path)."""
+        if self._count < self.size:
+            return list(self._buf[:self._count])
+        i = self._index
+        return list(self._buf[i:]) + list(self._buf[:i])
+
+    def clear(self) -> None:
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def get_state(self) -> tuple:
+        """Everything needed to resume the window, as plain values (see snapshot.py)."""
+        return self.size, self._index, self._count, self._sum, self._sumsq, self._buf.tobytes()
+
+    def set_state(self, state: tuple) -> None:
+        size, index, count, total, sumsq, data = state
+        if size != self.size or len(data) != 8 * size:
+            raise ValueError(f"State is for a window of {size}, not {self.size}.")
+        self._buf = array('d', data)
+        self._index = index
+        self._count = count
+        self._sum = total
+        self._sumsq = sumsq
+
+
+class SMA:
+    """Simple moving average over the last ``window`` values.
+
+    Until the window has filled, the average is over every value seen so far,
+    matching ``SMACrossoverStrategy.decide`` on a short price list.
+    """
+
+    __slots__ = ('window', '_ring')
+
+    def __init__(self, window: int):
+        self.window = window
+        self._ring = RollingWindow(window)
+
+    def update(self, value: float) -> float:
+        self._ring.push(value)
+        return self._ring._sum / self._ring._count
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._ring.mean()
+
+    @property
+    def count(self) -> int:
+        return len(self._ring)
+
+    def reset(self) -> None:
+        self._ring.clear()
+
+    def get_state(self) -> tuple:
+        return self._ring.get_state()
+
+    def set_state(self, state: tuple) -> None:
+        self._ring.set_state(state)
+
+
+class EMA:
+    """Exponential moving average seeded with the first value."""
+
+    __slots__ = ('window', 'alpha', '_value', '_count')
+
+    def __init__(self, window: int):
+        if not isinstance(window, int) or window <= 0:
+            raise ValueError("Window size must be a positive integer.")
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self._value: Optional[float] = None
+        self._count = 0
+
+    def update(self, value: float) -> float:
+        value = float(value)
+        if self._value is None:
+            self._value = value
+        else:
+            self._value += self.alpha * (value - self._value)
+        self._count += 1
+        return self._value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._value
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def reset(self) -> None:
+        self._value = None
+        self._count = 0
+
+    def get_state(self) -> tuple:
+        return self.window, self._value, self._count
+
+    def set_state(self, state: tuple) -> None:
+        window, value, count = state
+        if window != self.window:
+            raise ValueError(f"State is for a window of {window}, not {self.window}.")
+        self._value = value
+        self._count = count
+
+
+class RollingStd:
+    """Rolling (population) standard deviation over the last ``window`` values."""
+
+    __slots__ = ('window', '_ring')
+
+    def __init__(self, window: int):
+        self.window = window
+        self._ring = RollingWindow(window)
+
+    def update(self, value: float) -> float:
+        self._ring.push(value)
+        return sqrt(self._ring.variance())
+
+    @property
+    def value(self) -> Optional[float]:
+        var = self._ring.variance()
+        return None if var is None else sqrt(var)
+
+    @property
+    def count(self) -> int:
+        return len(self._ring)
+
+    def reset(self) -> None:
+        self._ring.clear()
+
+    def get_state(self) -> tuple:
+        return self._ring.get_state()
+
+    def set_state(self, state: tuple) -> None:
+        self._ring.set_state(state)
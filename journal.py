@@ -0,0 +1,278 @@
+"""Structured event journal written by a background thread.
+
+Callers record events as a name plus keyword fields; ``Journal`` appends a
+tuple to a ``collections.deque`` (atomic under the GIL, so producers never
+take a lock) and a writer thread drains it every ``flush_interval`` seconds.
+All formatting happens on that thread: JSON for the file, one line per
+event, and an optional human-readable echo to the console built from the
+event's message template. Events below the journal's levels are dropped
+before anything is built, so disabled debug events cost one comparison.
+
+With a file, the journal doubles as an audit log. ``Trader`` records every
+order and position change at ``AUDIT`` level, and ``replay_trades`` folds
+those events back into the trades still open, so a restarted trader can
+rebuild its position book (``Trader.restore_positions``), or bring a
+``snapshot`` up to date with the events recorded after it was taken.
+"""
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+AUDIT = 25
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', AUDIT: 'AUDIT', WARNING: 'WARNING', ERROR: 'ERROR'}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+# Disables a sink.
+OFF = 100
+
+_FLUSH = '_flush'
+
+
+def parse_level(level) -> int:
+    if isinstance(level, int):
+        return level
+    try:
+        return LEVELS[str(level).upper()]
+    except KeyError:
+        raise ValueError(f"Unknown journal level '{level}'; expected one of {', '.join(LEVELS)}.") from None
+
+
+class Journal:
+    """Leveled events to a JSON-lines file and/or the console.
+
+    ``level`` filters the file (keep it at or below ``AUDIT`` to be able to
+    rebuild positions) and ``echo_level`` the console; either sink can be
+    ``OFF``. Safe to call from any thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, level=INFO, echo_level=INFO, name: str = '',
+                 flush_interval: float = 0.1, stream: Optional[TextIO] = None):
+        self.path = path or None
+        self.level = parse_level(level) if self.path else OFF
+        self.echo_level = parse_level(echo_level)
+        self.name = name
+        self.flush_interval = flush_interval
+        self._stream = stream
+        # Lowest level either sink accepts; anything below is dropped at the call site.
+        self.min_level = min(self.level, self.echo_level)
+        self.written = 0
+        self._queue: deque = deque()
+        self._file = None
+        if self.path:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"journal-{name or 'main'}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_settings(cls, settings, name: str = '') -> 'Journal':
+        """File journal per ``Settings.journal_path`` (``{account}`` expands to the SenderCompID)."""
+        path = getattr(settings, 'journal_path', '') or None
+        if path:
+            path = path.format(account=getattr(settings, 'fix_sender_comp_id', '') or 'default')
+        return cls(path, level=getattr(settings, 'journal_level', 'INFO'), name=name)
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.min_level
+
+    def log(self, level: int, event: str, message: Optional[str] = None, **fields) -> None:
+        """Record ``event``; ``message`` is a ``str.format`` template over ``fields`` for the console."""
+        if level >= self.min_level and not self._closed:
+            self._queue.append((time.time(), level, event, message, fields))
+
+    # Shortcuts; each repeats the level check so a dropped event costs no more than a call.
+
+    def debug(self, event: str, message: Optional[str] = None, **fields) -> None:
+        if DEBUG >= self.min_level and not self._closed:
+            self._queue.append((time.time(), DEBUG, event, message, fields))
+
+    def info(self, event: str, message: Optional[str] = None, **fields) -> None:
+        if INFO >= self.min_level and not self._closed:
+            self._queue.append((time.time(), INFO, event, message, fields))
+
+    def audit(self, event: str, message: Optional[str] = None, **fields) -> None:
+        if AUDIT >= self.min_level and not self._closed:
+            self._queue.append((time.time(), AUDIT, event, message, fields))
+
+    def warning(self, event: str, message: Optional[str] = None, **fields) -> None:
+        if WARNING >= self.min_level and not self._closed:
+            self._queue.append((time.time(), WARNING, event, message, fields))
+
+    def error(self, event: str, message: Optional[str] = None, **fields) -> None:
+        if ERROR >= self.min_level and not self._closed:
+            self._queue.append((time.time(), ERROR, event, message, fields))
+
+    # --- writer thread -----------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            closing = self._closed
+            try:
+                self._drain()
+            except Exception as e:  # Keep journaling whatever one bad record did.
+                print(f"Journal {self.path or self.name} write failed: {e}", file=sys.stderr)
+            if closing:
+                return
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+
+    def _echo_line(self, level: int, event: str, message: Optional[str], fields: dict) -> str:
+        if message is not None:
+            try:
+                text = message.format(**fields)
+            except (KeyError, IndexError, ValueError):
+                text = message
+        else:
+            text = event + ''.join(f" {key}={value}" for key, value in fields.items())
+        prefix = f"[{self.name}] " if self.name else ''
+        if level >= WARNING:
+            prefix += f"{LEVEL_NAMES.get(level, level)}: "
+        return prefix + text
+
+    def _drain(self) -> None:
+        queue = self._queue
+        if not queue:
+            return
+        lines: List[str] = []
+        echo: List[str] = []
+        flushed: List[threading.Event] = []
+        level_names = LEVEL_NAMES
+        while queue:
+            ts, level, event, message, fields = queue.popleft()
+            if event is _FLUSH:
+                flushed.append(fields['done'])
+                continue
+            if level >= self.level:
+                record = {'ts': ts, 'level': level_names.get(level, level), 'event': event}
+                if self.name:
+                    record['src'] = self.name
+                record.update(fields)
+                lines.append(json.dumps(record, default=str))
+            if level >= self.echo_level:
+                echo.append(self._echo_line(level, event, message, fields))
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            self.written += len(lines)
+        if echo:
+            stream = self._stream or sys.stdout
+            stream.write('\n'.join(echo) + '\n')
+            stream.flush()
+        for done in flushed:
+            done.set()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything recorded so far is written."""
+        if self._closed or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.append((0.0, OFF, _FLUSH, None, {'done': done}))
+        self._wake.set()
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Write what is queued and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(5.0)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        atexit.unregister(self.close)
+
+
+# --- audit replay -------------------------------------------------------------
+
+def _line_time(line: str) -> float:
+    # Every record starts with its timestamp: {"ts": 1700000000.123, ...
+    try:
+        return float(line[7:line.index(',', 7)])
+    except ValueError:
+        return float('inf')  # not in that form; decode it to find out
+
+
+def read_journal(path: str, since: float = 0.0) -> Iterator[dict]:
+    """Records of a journal file; a torn last line (crash mid-write) is skipped.
+
+    Records stamped at or before ``since`` are skipped without being decoded.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or (since and _line_time(line) <= since):
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _trade_number(trade_id: str) -> int:
+    try:
+        return int(trade_id.lstrip('T'))
+    except (AttributeError, ValueError):
+        return 0
+
+
+def replay_trades(path: Optional[str], since: float = 0.0,
+                  open_trades: Iterable[dict] = ()) -> Tuple[List[dict], int]:
+    """Fold a journal's audit events into the trades not yet closed.
+
+    Returns those trades (``status`` is 'open', 'closing' or 'pending') and
+    the highest trade number used, so new ids do not repeat. ``cl_ord_id``
+    is the order a pending or closing trade awaits a report for. To carry
+    on from a snapshot, pass its trades as ``open_trades`` and its time as
+    ``since``; only later events are applied to them.
+    """
+    trades: Dict[str, dict] = {trade['id']: dict(trade) for trade in open_trades}
+    last = max((_trade_number(trade_id) for trade_id in trades), default=0)
+    if not path or not os.path.exists(path):
+        return list(trades.values()), last
+    for record in read_journal(path, since):
+        if record.get('level') != 'AUDIT':
+            continue
+        event = record.get('event')
+        trade_id = record.get('trade_id')
+        if event == 'order_submitted':
+            last = max(last, _trade_number(trade_id))
+            trades[trade_id] = {
+                'id': trade_id,
+                'symbol': record['symbol'],
+                'volume': record['volume'],
+                'direction': record['direction'],
+                'stop_loss': record.get('stop_loss'),
+                'take_profit': record.get('take_profit'),
+                'status': 'pending',
+                'position_id': None,
+                'entry_price': None,
+                'cl_ord_id': record.get('cl_ord_id'),
+            }
+            continue
+        trade = trades.get(trade_id)
+        if trade is None:
+            continue
+        if event == 'order_filled':
+            trade.update(status='open', entry_price=record.get('price'), position_id=record.get('position_id'),
+                         cl_ord_id=None)
+        elif event == 'order_closing':
+            trade.update(status='closing', cl_ord_id=record.get('cl_ord_id'))
+        elif event == 'close_failed':
+            trade.update(status='open', cl_ord_id=None)
+        elif event in ('position_closed', 'order_rejected'):
+            del trades[trade_id]
+    return list(trades.values()), last
@@ -0,0 +1,237 @@
+"""Tick-to-trade latency instrumentation.
+
+Hot-path hooks take ``time.perf_counter_ns()`` stamps and bump integer
+counters only; percentiles are computed when a report is requested.
+Histograms are HDR-style: values are bucketed logarithmically with 64
+linear sub-buckets per power of two, giving under 1.6% relative error from
+1 ns up to about 18 minutes in a fixed 2240-slot array.
+"""
+from array import array
+from typing import Dict, Iterable, Optional, Tuple
+from time import perf_counter_ns
+import json
+import threading
+
+_SUB_BITS = 7
+_SUB_COUNT = 1 << _SUB_BITS      # values below this are recorded exactly
+_HALF = _SUB_COUNT >> 1
+_MAX_VALUE = (1 << 40) - 1       # ~18 minutes in nanoseconds
+_BUCKETS = (_MAX_VALUE.bit_length() - _SUB_BITS) * _HALF + _SUB_COUNT
+
+# Stages recorded for every order.
+QUOTE_TO_DECISION = 'quote_to_decision'
+DECISION_TO_SEND = 'decision_to_send'
+ENCODE_AND_SEND = 'encode_and_send'
+TICK_TO_TRADE = 'tick_to_trade'
+SEND_TO_ACK = 'send_to_ack'
+METRICS = (QUOTE_TO_DECISION, DECISION_TO_SEND, ENCODE_AND_SEND, TICK_TO_TRADE, SEND_TO_ACK)
+
+
+def _index(value: int) -> int:
+    if value < _SUB_COUNT:
+        return value if value > 0 else 0
+    if value > _MAX_VALUE:
+        value = _MAX_VALUE
+    shift = value.bit_length() - _SUB_BITS
+    return shift * _HALF + (value >> shift)
+
+
+def _bucket_value(index: int) -> int:
+    """Midpoint of the values that map to ``index``."""
+    if index < _SUB_COUNT:
+        return index
+    shift = index // _HALF - 1
+    mantissa = index - shift * _HALF
+    return (mantissa << shift) + ((1 << shift) >> 1)
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of nanosecond durations."""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * _BUCKETS))
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value_ns: int) -> None:
+        self.counts[_index(value_ns)] += 1
+        if not self.count or value_ns < self.min:
+            self.min = value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+        self.count += 1
+        self.total += value_ns
+
+    def percentiles(self, quantiles: Iterable[float]) -> Dict[float, int]:
+        """Values at the given quantiles (0-100) in one pass over the buckets."""
+        wanted = sorted(quantiles)
+        result: Dict[float, int] = {}
+        if not self.count:
+            return {q: 0 for q in wanted}
+        targets = [(q, max(1, -(-self.count * q // 100))) for q in wanted]
+        seen = 0
+        i = 0
+        for index, n in enumerate(self.counts):
+            if not n:
+                continue
+            seen += n
+            while i < len(targets) and seen >= targets[i][1]:
+                result[targets[i][0]] = min(_bucket_value(index), self.max)
+                i += 1
+            if i == len(targets):
+                break
+        return result
+
+    def percentile(self, quantile: float) -> int:
+        return self.percentiles([quantile])[quantile]
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        for index, n in enumerate(other.counts):
+            if n:
+                self.counts[index] += n
+        if other.count:
+            self.min = other.min if not self.count else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def summary(self) -> dict:
+        p = self.percentiles((50, 99, 99.9))
+        return {
+            'count': self.count,
+            'mean_us': (self.total / self.count / 1000) if self.count else 0.0,
+            'p50_us': p[50] / 1000,
+            'p99_us': p[99] / 1000,
+            'p99_9_us': p[99.9] / 1000,
+            'min_us': self.min / 1000,
+            'max_us': self.max / 1000,
+        }
+
+
+class LatencyTracker:
+    """Collects per-stage order latencies keyed by symbol and by strategy.
+
+    Call ``quote`` when a price arrives, ``decision`` when a strategy acts on
+    it, ``order_sending``/``order_sent`` around the session write and
+    ``execution_report`` when the venue answers. Disabled trackers return
+    immediately from every hook.
+    """
+
+    def __init__(self, enabled: bool = True, max_pending: int = 100_000):
+        self.enabled = enabled
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._quote_ns: Dict[str, int] = {}
+        # symbol -> (strategy name, quote stamp, decision stamp)
+        self._decisions: Dict[str, Tuple[str, int, int]] = {}
+        # cl_ord_id -> [symbol, strategy, quote, decision, encode start, sent]
+        self._pending: Dict[str, list] = {}
+        self._histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+
+    def _record(self, metric: str, symbol: str, strategy: Optional[str], value: int) -> None:
+        hists = self._histograms
+        for key in ((metric, 'all', ''), (metric, 'symbol', symbol), (metric, 'strategy', strategy or 'manual')):
+            hist = hists.get(key)
+            if hist is None:
+                hist = hists[key] = LatencyHistogram()
+            hist.record(value)
+
+    def quote(self, symbol: str) -> None:
+        if self.enabled:
+            self._quote_ns[symbol] = perf_counter_ns()
+
+    def decision(self, symbol: str, strategy: str) -> None:
+        if not self.enabled:
+            return
+        now = perf_counter_ns()
+        quoted = self._quote_ns.get(symbol, 0)
+        self._decisions[symbol] = (strategy, quoted, now)
+        if quoted:
+            with self._lock:
+                self._record(QUOTE_TO_DECISION, symbol, strategy, now - quoted)
+
+    def order_sending(self, cl_ord_id: str, symbol: str, opening: bool = True) -> None:
+        """Stamp an order just before it is encoded.
+
+        Only an opening order takes the symbol's last decision stamp; closing
+        orders sent first to flatten the symbol leave it for the new trade.
+        """
+        if not self.enabled:
+            return
+        now = perf_counter_ns()
+        strategy, quoted, decided = self._decisions.pop(symbol, (None, 0, 0)) if opening else (None, 0, 0)
+        if len(self._pending) >= self.max_pending:
+            return  # venue not answering; don't grow without bound
+        self._pending[cl_ord_id] = [symbol, strategy, quoted, decided, now, 0]
+
+    def order_sent(self, cl_ord_ids: Iterable[str]) -> None:
+        """Stamp orders once the session has written them to the transport."""
+        if not self.enabled:
+            return
+        now = perf_counter_ns()
+        with self._lock:
+            for cl_ord_id in cl_ord_ids:
+                stamps = self._pending.get(cl_ord_id)
+                if stamps is None:
+                    continue
+                stamps[5] = now
+                symbol, strategy, quoted, decided, encoding = stamps[:5]
+                self._record(ENCODE_AND_SEND, symbol, strategy, now - encoding)
+                if decided:
+                    self._record(DECISION_TO_SEND, symbol, strategy, now - decided)
+                if quoted:
+                    self._record(TICK_TO_TRADE, symbol, strategy, now - quoted)
+
+    def execution_report(self, cl_ord_id: str) -> None:
+        if not self.enabled:
+            return
+        stamps = self._pending.pop(cl_ord_id, None)
+        if stamps is None or not stamps[5]:
+            return
+        with self._lock:
+            self._record(SEND_TO_ACK, stamps[0], stamps[1], perf_counter_ns() - stamps[5])
+
+    def histogram(self, metric: str, by: str = 'all', name: str = '') -> Optional[LatencyHistogram]:
+        return self._histograms.get((metric, by, name))
+
+    def report(self) -> dict:
+        """Summaries as ``{metric: {'all': {...}, 'symbol': {...}, 'strategy': {...}}}``."""
+        with self._lock:
+            items = list(self._histograms.items())
+        out: dict = {}
+        for (metric, by, name), hist in sorted(items):
+            section = out.setdefault(metric, {})
+            if by == 'all':
+                section['all'] = hist.summary()
+            else:
+                section.setdefault(by, {})[name] = hist.summary()
+        return out
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.report(), indent=indent)
+
+    def export_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+
+    def format_summary(self) -> str:
+        """Human-readable p50/p99/p99.9 table of the overall histograms."""
+        lines = [f"{'stage':<18} {'count':>8} {'p50 us':>9} {'p99 us':>9} {'p99.9 us':>9} {'max us':>9}"]
+        report = self.report()
+        for metric in METRICS:
+            summary = report.get(metric, {}).get('all')
+            if summary is None:
+                continue
+            lines.append(f"{metric:<18} {summary['count']:>8} {summary['p50_us']:>9.1f} {summary['p99_us']:>9.1f} "
+                         f"{summary['p99_9_us']:>9.1f} {summary['max_us']:>9.1f}")
+        return '\n'.join(lines)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._pending.clear()
+            self._decisions.clear()
@@ -1,13 +1,26 @@
-"""Entry point for the Forex Scalper application."""
+"""Entry point for the Forex Scalper application.
+
+``python main.py`` opens the GUI; ``python main.py --headless SYMBOL ...``
+runs the trading engine without importing tkinter (see ``engine.py``), and
+``python main.py --supervise ...`` runs every configured account across
+worker processes (see ``supervisor.py``).
+"""
 import sys
 import os
 
 # Add the project root to sys.path to allow absolute imports
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from gui import MainApplication
 
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == '--headless':
+        from engine import main as engine_main
+        sys.exit(engine_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == '--supervise':
+        from supervisor import main as supervisor_main
+        sys.exit(supervisor_main(sys.argv[2:]))
+
+    from gui import MainApplication
     app = MainApplication()
     app.mainloop()
 
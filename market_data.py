@@ -0,0 +1,401 @@
+"""Streaming market data: per-symbol tick ring buffers and quote sources.
+
+``MarketDataFeed`` stores every quote in preallocated ``array`` ring buffers
+(bounded memory per symbol) and pushes each tick to subscribers as plain
+arguments, so nothing is copied per update. OHLC bars are built on demand
+for symbols and timeframes someone asks for (``bar_series``). Quotes come
+from a cTrader FIX QUOTE session (``FixQuoteSource``) or from a recorded
+sequence (``replay``/``replay_async``) for tests and offline runs.
+"""
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import itertools
+import time
+
+from bars import Bar, BarAggregator, BarSeries
+from fix_codec import FixMessage
+from fix_session import MARKET_DATA_INCREMENTAL, MARKET_DATA_REJECT, FixSession, FixSessionError
+from latency import LatencyTracker
+from order_book import OrderBook, apply_incremental, apply_snapshot
+
+# A subscriber receives (symbol, timestamp, bid, ask).
+QuoteCallback = Callable[[str, float, float, float], None]
+
+DEFAULT_CAPACITY = 16384
+
+
+class TickBuffer:
+    """Fixed-capacity ring of (time, bid, ask) for one symbol."""
+
+    __slots__ = ('symbol', 'capacity', 'times', 'bids', 'asks', 'head', 'count', 'total')
+
+    def __init__(self, symbol: str, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive.")
+        self.symbol = symbol
+        self.capacity = capacity
+        zeros = bytes(8 * capacity)
+        self.times = array('d', zeros)
+        self.bids = array('d', zeros)
+        self.asks = array('d', zeros)
+        self.head = 0    # next slot to write
+        self.count = 0   # valid entries (<= capacity)
+        self.total = 0   # ticks ever appended
+
+    def append(self, timestamp: float, bid: float, ask: float) -> None:
+        i = self.head
+        self.times[i] = timestamp
+        self.bids[i] = bid
+        self.asks[i] = ask
+        i += 1
+        self.head = 0 if i == self.capacity else i
+        if self.count < self.capacity:
+            self.count += 1
+        self.total += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def last(self) -> Optional[Tuple[float, float, float]]:
+        if not self.count:
+            return None
+        i = self.head - 1
+        return self.times[i], self.bids[i], self.asks[i]
+
+    def _tail(self, column: array, n: Optional[int]) -> List[float]:
+        n = self.count if n is None else min(n, self.count)
+        start = self.head - n
+        if start >= 0:
+            return column[start:self.head].tolist()
+        return column[start:].tolist() + column[:self.head].tolist()
+
+    def latest_bids(self, n: Optional[int] = None) -> List[float]:
+        """Up to ``n`` most recent bids, oldest first (copies)."""
+        return self._tail(self.bids, n)
+
+    def latest_asks(self, n: Optional[int] = None) -> List[float]:
+        return self._tail(self.asks, n)
+
+    def latest_times(self, n: Optional[int] = None) -> List[float]:
+        return self._tail(self.times, n)
+
+    def latest_mids(self, n: Optional[int] = None) -> List[float]:
+        return [(b + a) * 0.5 for b, a in zip(self._tail(self.bids, n), self._tail(self.asks, n))]
+
+
+class MarketDataFeed:
+    """Holds tick buffers for every symbol and fans quotes out to subscribers."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buffers: Dict[str, TickBuffer] = {}
+        self._subscribers: Dict[str, List[QuoteCallback]] = {}
+        # Called with a symbol the first time anyone subscribes to it.
+        self.on_new_symbol: List[Callable[[str], None]] = []
+        # Stamps quote receipt for tick-to-trade measurements when set.
+        self.latency: Optional[LatencyTracker] = None
+        self.bars = BarAggregator()
+        # Level-2 books of symbols subscribed with depth (see FixQuoteSource)
+        self.books: Dict[str, OrderBook] = {}
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._subscribers)
+
+    def buffer(self, symbol: str) -> TickBuffer:
+        buf = self.buffers.get(symbol)
+        if buf is None:
+            buf = self.buffers[symbol] = TickBuffer(symbol, self.capacity)
+        return buf
+
+    def subscribe(self, symbol: str, callback: Optional[QuoteCallback] = None) -> TickBuffer:
+        """Start tracking ``symbol``; ``callback`` (if any) is called per tick."""
+        is_new = symbol not in self._subscribers
+        callbacks = self._subscribers.setdefault(symbol, [])
+        if callback is not None:
+            callbacks.append(callback)
+        if is_new:
+            for hook in self.on_new_symbol:
+                hook(symbol)
+        return self.buffer(symbol)
+
+    def unsubscribe(self, symbol: str, callback: QuoteCallback) -> None:
+        callbacks = self._subscribers.get(symbol)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+
+    def book(self, symbol: str) -> OrderBook:
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+        return book
+
+    def on_book_update(self, book: OrderBook, timestamp: float) -> None:
+        """Record a changed book's top as a quote when the touch moved."""
+        book.timestamp = timestamp
+        bid, ask = book.best_bid, book.best_ask
+        if bid is None or ask is None:
+            return
+        buf = self.buffers.get(book.symbol)
+        last = buf.last() if buf is not None else None
+        if last is None or last[1] != bid or last[2] != ask:
+            self.on_quote(book.symbol, timestamp, bid, ask)
+
+    def bar_series(self, symbol: str, timeframe: str) -> BarSeries:
+        """Bars of ``symbol``, backfilled from its tick buffer when first requested."""
+        if not self.bars.has_series(symbol, timeframe):
+            series = self.bars.series(symbol, timeframe)
+            buf = self.buffers.get(symbol)
+            if buf is not None and buf.count:
+                for timestamp, mid in zip(buf.latest_times(), buf.latest_mids()):
+                    series.update(timestamp, mid)
+            return series
+        return self.bars.series(symbol, timeframe)
+
+    def attach_strategy(self, symbol: str, strategy, on_decision: Callable[[str, str], None]) -> Callable:
+        """Drive ``strategy.update`` with every tick's mid price, or with bar
+        closes if the strategy declares a ``timeframe``.
+
+        Returns the registered callback.
+        """
+        name = type(strategy).__name__
+        timeframe = getattr(strategy, 'timeframe', None)
+        if timeframe:
+            def _on_bar(sym: str, tf: str, bar: Bar) -> None:
+                decision = strategy.update(bar.close)
+                if self.latency is not None:
+                    self.latency.decision(sym, name)
+                on_decision(sym, decision)
+            self.subscribe(symbol)
+            self.bar_series(symbol, timeframe)
+            self.bars.on_bar(symbol, timeframe, _on_bar)
+            return _on_bar
+
+        def _on_quote(sym: str, timestamp: float, bid: float, ask: float) -> None:
+            decision = strategy.update((bid + ask) * 0.5)
+            if self.latency is not None:
+                self.latency.decision(sym, name)
+            on_decision(sym, decision)
+        self.subscribe(symbol, _on_quote)
+        return _on_quote
+
+    def detach_strategy(self, symbol: str, strategy, callback: Callable) -> None:
+        """Undo ``attach_strategy`` given the callback it returned."""
+        timeframe = getattr(strategy, 'timeframe', None)
+        if timeframe:
+            self.bars.remove_listener(symbol, timeframe, callback)
+        else:
+            self.unsubscribe(symbol, callback)
+
+    def on_quote(self, symbol: str, timestamp: float, bid: float, ask: float) -> None:
+        """Record a quote and notify the symbol's subscribers."""
+        buf = self.buffers.get(symbol)
+        if buf is None:
+            buf = self.buffer(symbol)
+        if self.latency is not None:
+            self.latency.quote(symbol)
+        buf.append(timestamp, bid, ask)
+        if symbol in self.bars:
+            self.bars.on_quote(symbol, timestamp, bid, ask)
+        callbacks = self._subscribers.get(symbol)
+        if callbacks:
+            for callback in callbacks:
+                callback(symbol, timestamp, bid, ask)
+
+    def market_data(self, symbol: str, history: int = 1000, timeframe: Optional[str] = None) -> dict:
+        """``Strategy.decide`` input built from the latest mids of ``symbol``,
+        or from its closed ``timeframe`` bars when given. ``book`` is the
+        symbol's live ``OrderBook`` (not a copy) when depth is subscribed."""
+        buf = self.buffers.get(symbol)
+        if buf is None:
+            return {'symbol': symbol, 'prices': [], 'book': self.books.get(symbol)}
+        last = buf.last()
+        if timeframe:
+            prices = self.bar_series(symbol, timeframe).latest_closes(history)
+        else:
+            prices = buf.latest_mids(history)
+        return {
+            'symbol': symbol,
+            'prices': prices,
+            'bid': last[1] if last else None,
+            'ask': last[2] if last else None,
+            'book': self.books.get(symbol),
+        }
+
+    def price_matrix(self, symbols: List[str], history: int, timeframe: Optional[str] = None):
+        """``Strategy.decide_many`` input: the latest ``history`` mids (or
+        ``timeframe`` bar closes) of each symbol, one row per symbol, oldest
+        first and NaN-padded on the left. Requires NumPy."""
+        import numpy as np
+
+        padding = array('d', [float('nan')]) * history
+        bids: List[array] = []
+        asks: List[array] = []
+        for symbol in symbols:
+            buf = self.buffers.get(symbol)
+            if timeframe:
+                closes = array('d', self.bar_series(symbol, timeframe).latest_closes(history)) if buf else padding[:0]
+                bids += (padding[len(closes):], closes)
+                continue
+            n = min(history, buf.count) if buf is not None else 0
+            bids.append(padding[n:])
+            asks.append(padding[n:])
+            if n:
+                # Slices of the ring buffers, joined into one block below.
+                start = buf.head - n
+                if start >= 0:
+                    bids.append(buf.bids[start:buf.head])
+                    asks.append(buf.asks[start:buf.head])
+                else:
+                    bids += (buf.bids[start:], buf.bids[:buf.head])
+                    asks += (buf.asks[start:], buf.asks[:buf.head])
+        shape = (len(symbols), history)
+        matrix = np.frombuffer(b''.join(bids), dtype=np.float64).reshape(shape)
+        if timeframe:
+            return matrix.copy()
+        return (matrix + np.frombuffer(b''.join(asks), dtype=np.float64).reshape(shape)) * 0.5
+
+
+def replay(feed: MarketDataFeed, ticks: Iterable[Tuple[str, float, float, float]]) -> int:
+    """Push recorded (symbol, timestamp, bid, ask) ticks as fast as possible."""
+    on_quote = feed.on_quote
+    count = 0
+    for symbol, timestamp, bid, ask in ticks:
+        on_quote(symbol, timestamp, bid, ask)
+        count += 1
+    return count
+
+
+async def replay_async(feed: MarketDataFeed, ticks: Iterable[Tuple[str, float, float, float]],
+                       speed: Optional[float] = None, batch: int = 1000) -> int:
+    """Replay ticks on the event loop.
+
+    With ``speed`` set, ticks are paced by their timestamps (2.0 = twice real
+    time); otherwise the loop is yielded to every ``batch`` ticks.
+    """
+    on_quote = feed.on_quote
+    count = 0
+    first_ts = None
+    started = time.monotonic()
+    for symbol, timestamp, bid, ask in ticks:
+        if speed:
+            if first_ts is None:
+                first_ts = timestamp
+            delay = (timestamp - first_ts) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif count % batch == 0:
+            await asyncio.sleep(0)
+        on_quote(symbol, timestamp, bid, ask)
+        count += 1
+    return count
+
+
+def _snapshot_prices(message: FixMessage) -> Tuple[Optional[float], Optional[float]]:
+    """Best bid and offer from a MarketDataSnapshotFullRefresh."""
+    bid = ask = None
+    entry_type = None
+    for tag, value in message.iter_from(268):
+        if tag == 269:
+            entry_type = value
+        elif tag == 270:
+            price = float(value)
+            if entry_type == b'0':
+                bid = price if bid is None else max(bid, price)
+            elif entry_type == b'1':
+                ask = price if ask is None else min(ask, price)
+    return bid, ask
+
+
+class FixQuoteSource:
+    """Feeds a ``MarketDataFeed`` from a cTrader FIX QUOTE session.
+
+    Every symbol subscribed on the feed gets a top-of-book MarketDataRequest,
+    including symbols added while connected. With ``depth`` the request is
+    for the full book with incremental refreshes instead, kept in the feed's
+    ``books``; each change of the touch is also recorded as a quote.
+    """
+
+    def __init__(self, feed: MarketDataFeed, session: FixSession, depth: bool = False):
+        self.feed = feed
+        self.session = session
+        self.depth = depth
+        self._req_ids: Dict[str, str] = {}
+        self._ids = itertools.count(1)
+        session.on_market_data.append(self._on_market_data)
+        feed.on_new_symbol.append(self._on_new_symbol)
+
+    async def start(self, timeout: float = 10.0) -> None:
+        await self.session.logon(timeout=timeout)
+        for symbol in self.feed.symbols:
+            self._request(symbol)
+
+    async def stop(self) -> None:
+        self.detach()
+        await self.session.logout()
+
+    def detach(self) -> None:
+        """Stop following new feed symbols."""
+        if self._on_new_symbol in self.feed.on_new_symbol:
+            self.feed.on_new_symbol.remove(self._on_new_symbol)
+        self._req_ids.clear()
+
+    def _on_new_symbol(self, symbol: str) -> None:
+        # May be called from any thread; requests go out on the session's loop.
+        if not self.session.logged_on:
+            return
+        loop = self.session.loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._request(symbol)
+        else:
+            loop.call_soon_threadsafe(self._request, symbol)
+
+    def _request(self, symbol: str) -> None:
+        if symbol in self._req_ids or not self.session.logged_on:
+            return
+        req_id = f"MD{next(self._ids)}"
+        self._req_ids[symbol] = req_id
+        try:
+            if self.depth:
+                self.session.request_market_data(symbol, req_id, depth=0, incremental=True)
+            else:
+                self.session.request_market_data(symbol, req_id)
+        except FixSessionError:
+            del self._req_ids[symbol]
+
+    def _on_market_data(self, message: FixMessage) -> None:
+        if message.get(35) == MARKET_DATA_REJECT:
+            req_id = message.get(262)
+            for symbol, rid in list(self._req_ids.items()):
+                if rid == req_id:
+                    del self._req_ids[symbol]
+            return
+        if self.depth:
+            now = time.time()
+            if message.get(35) == MARKET_DATA_INCREMENTAL:
+                for book in apply_incremental(self.feed.book, message):
+                    self.feed.on_book_update(book, now)
+            else:
+                book = apply_snapshot(self.feed.book, message)
+                if book is not None:
+                    self.feed.on_book_update(book, now)
+            return
+        symbol = message.get(55)
+        if symbol is None:
+            return
+        bid, ask = _snapshot_prices(message)
+        if bid is None or ask is None:
+            # One-sided update: carry the other side forward.
+            last = self.feed.buffer(symbol).last()
+            if last is None:
+                return
+            bid = last[1] if bid is None else bid
+            ask = last[2] if ask is None else ask
+        self.feed.on_quote(symbol, time.time(), bid, ask)
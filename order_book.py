@@ -0,0 +1,288 @@
+"""Level-2 order books maintained from FIX market data.
+
+``OrderBook`` keeps each side's price levels in two parallel ``array('d')``
+columns sorted ascending (bids too, so the best bid is the last element)
+and finds a level with ``bisect``. Best bid/ask, their sizes and the
+size-weighted mid are O(1); a level update is an O(log n) search plus, when
+a level appears or disappears, a ``memmove`` of the shorter arrays. Nothing
+is allocated per update beyond the entry table.
+
+cTrader sends depth as individual quotes keyed by MDEntryID, several of
+which may share a price; ``add``/``remove`` aggregate them into levels.
+``set_level`` serves feeds that send price levels directly, and
+``add_size`` those whose anonymous entries may repeat a price.
+``apply_snapshot`` and ``apply_incremental`` walk a
+MarketDataSnapshotFullRefresh (W) or MarketDataIncrementalRefresh (X) in
+place and update the books of the symbols it mentions.
+"""
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from fix_codec import FixMessage
+
+BID = 0
+ASK = 1
+# Sizes are summed and subtracted per entry; a level this small is empty.
+SIZE_EPSILON = 1e-9
+
+_ENTRY_SIDES = {b'0': BID, b'1': ASK}
+_DELETE = b'2'
+
+
+class OrderBook:
+    """Aggregated price levels of one symbol; use from the feed's thread."""
+
+    __slots__ = ('symbol', 'bid_prices', 'bid_sizes', 'ask_prices', 'ask_sizes', '_entries', 'version', 'timestamp')
+
+    def __init__(self, symbol: str = ''):
+        self.symbol = symbol
+        self.bid_prices = array('d')
+        self.bid_sizes = array('d')
+        self.ask_prices = array('d')
+        self.ask_sizes = array('d')
+        # MDEntryID -> (side, price, size)
+        self._entries: Dict[Hashable, Tuple[int, float, float]] = {}
+        # Bumped on every change, so readers can tell whether the book moved.
+        self.version = 0
+        self.timestamp = 0.0
+
+    def _columns(self, side: int) -> Tuple[array, array]:
+        if side == BID:
+            return self.bid_prices, self.bid_sizes
+        return self.ask_prices, self.ask_sizes
+
+    def _adjust(self, side: int, price: float, delta: float) -> None:
+        prices, sizes = self._columns(side)
+        i = bisect_left(prices, price)
+        if i < len(prices) and prices[i] == price:
+            size = sizes[i] + delta
+            if size > SIZE_EPSILON:
+                sizes[i] = size
+            else:
+                del prices[i]
+                del sizes[i]
+        elif delta > SIZE_EPSILON:
+            prices.insert(i, price)
+            sizes.insert(i, delta)
+
+    # --- updates -----------------------------------------------------------
+
+    def set_level(self, side: int, price: float, size: float) -> None:
+        """Set the total size at ``price``; zero removes the level."""
+        prices, sizes = self._columns(side)
+        i = bisect_left(prices, price)
+        found = i < len(prices) and prices[i] == price
+        if size > SIZE_EPSILON:
+            if found:
+                sizes[i] = size
+            else:
+                prices.insert(i, price)
+                sizes.insert(i, size)
+        elif found:
+            del prices[i]
+            del sizes[i]
+        self.version += 1
+
+    def add_size(self, side: int, price: float, size: float) -> None:
+        """Add ``size`` to the level at ``price`` (negative subtracts); for
+        feeds whose anonymous entries may repeat a price."""
+        self._adjust(side, price, size)
+        self.version += 1
+
+    def add(self, entry_id: Hashable, side: int, price: float, size: float) -> None:
+        """Add quote ``entry_id``, replacing it if already present."""
+        old = self._entries.get(entry_id)
+        if old is not None:
+            self._adjust(old[0], old[1], -old[2])
+        self._entries[entry_id] = (side, price, size)
+        self._adjust(side, price, size)
+        self.version += 1
+
+    def remove(self, entry_id: Hashable) -> bool:
+        old = self._entries.pop(entry_id, None)
+        if old is None:
+            return False
+        self._adjust(old[0], old[1], -old[2])
+        self.version += 1
+        return True
+
+    def clear(self) -> None:
+        for column in (self.bid_prices, self.bid_sizes, self.ask_prices, self.ask_sizes):
+            del column[:]
+        self._entries.clear()
+        self.version += 1
+
+    # --- queries -----------------------------------------------------------
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bid_prices[-1] if self.bid_prices else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.ask_prices[0] if self.ask_prices else None
+
+    @property
+    def bid_size(self) -> float:
+        return self.bid_sizes[-1] if self.bid_sizes else 0.0
+
+    @property
+    def ask_size(self) -> float:
+        return self.ask_sizes[0] if self.ask_sizes else 0.0
+
+    def levels(self, side: int) -> int:
+        return len(self.bid_prices if side == BID else self.ask_prices)
+
+    def mid(self) -> Optional[float]:
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        return (self.bid_prices[-1] + self.ask_prices[0]) * 0.5
+
+    def spread(self) -> Optional[float]:
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        return self.ask_prices[0] - self.bid_prices[-1]
+
+    def weighted_mid(self) -> Optional[float]:
+        """Mid weighted by the opposite side's size at the touch (the micro-price)."""
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        bid, ask = self.bid_prices[-1], self.ask_prices[0]
+        bid_size, ask_size = self.bid_sizes[-1], self.ask_sizes[0]
+        return (bid * ask_size + ask * bid_size) / (bid_size + ask_size)
+
+    def bids(self, n: Optional[int] = None) -> List[Tuple[float, float]]:
+        """Up to ``n`` (price, size) bid levels, best first (copies)."""
+        count = len(self.bid_prices) if n is None else min(n, len(self.bid_prices))
+        start = len(self.bid_prices) - count
+        return list(zip(reversed(self.bid_prices[start:]), reversed(self.bid_sizes[start:])))
+
+    def asks(self, n: Optional[int] = None) -> List[Tuple[float, float]]:
+        """Up to ``n`` (price, size) ask levels, best first (copies)."""
+        return list(zip(self.ask_prices[:n], self.ask_sizes[:n]))
+
+    def volume(self, side: int, n: Optional[int] = None) -> float:
+        """Total size of the best ``n`` levels of ``side`` (all if None)."""
+        if side == BID:
+            return sum(self.bid_sizes if n is None else self.bid_sizes[max(0, len(self.bid_sizes) - n):])
+        return sum(self.ask_sizes[:n])
+
+    def imbalance(self, n: int = 1) -> Optional[float]:
+        """(bid volume - ask volume) / total over the best ``n`` levels, in [-1, 1]."""
+        bid, ask = self.volume(BID, n), self.volume(ASK, n)
+        if bid + ask <= 0:
+            return None
+        return (bid - ask) / (bid + ask)
+
+    def fill_price(self, side: int, quantity: float) -> Optional[float]:
+        """Average price a market order of ``quantity`` would get taking
+        liquidity from ``side`` (ASK for a buy), or None if the book is too thin."""
+        prices, sizes = self._columns(side)
+        indices = range(len(prices) - 1, -1, -1) if side == BID else range(len(prices))
+        remaining = quantity
+        notional = 0.0
+        for i in indices:
+            take = min(remaining, sizes[i])
+            notional += take * prices[i]
+            remaining -= take
+            if remaining <= SIZE_EPSILON:
+                return notional / quantity
+        return None
+
+    def __repr__(self) -> str:
+        return (f"OrderBook({self.symbol!r}, {len(self.bid_prices)} bids, {len(self.ask_prices)} asks, "
+                f"best {self.best_bid}/{self.best_ask})")
+
+
+# --- FIX market data ------------------------------------------------------------
+
+BookSource = Callable[[str], OrderBook]
+
+
+def _apply_entry(book: OrderBook, action: Optional[bytes], side: Optional[int], entry_id: Optional[bytes],
+                 price: Optional[float], size: float) -> None:
+    if action == _DELETE:
+        if entry_id is not None:
+            book.remove(entry_id)
+        elif side is not None and price is not None:
+            book.set_level(side, price, 0.0)
+    elif side is not None and price is not None:
+        if entry_id is not None:
+            book.add(entry_id, side, price, size)
+        else:
+            book.set_level(side, price, size)
+
+
+def apply_snapshot(book_for: BookSource, message: FixMessage) -> Optional[OrderBook]:
+    """Replace a symbol's book with a MarketDataSnapshotFullRefresh (W)."""
+    symbol = message.get(55)
+    if symbol is None:
+        return None
+    book = book_for(symbol)
+    book.clear()
+    side = entry_id = price = None
+    size = 0.0
+    for tag, value in message.iter_from(268):
+        if tag == 269:  # each entry starts with MDEntryType
+            if price is not None:
+                _apply_snapshot_entry(book, side, entry_id, price, size)
+            side, entry_id, price, size = _ENTRY_SIDES.get(value), None, None, 0.0
+        elif tag == 270:
+            price = float(value)
+        elif tag == 271:
+            size = float(value)
+        elif tag == 278:
+            entry_id = value
+    if price is not None:
+        _apply_snapshot_entry(book, side, entry_id, price, size)
+    return book
+
+
+def _apply_snapshot_entry(book: OrderBook, side: Optional[int], entry_id: Optional[bytes],
+                          price: float, size: float) -> None:
+    if side is None:
+        return
+    if entry_id is not None:
+        book.add(entry_id, side, price, size)
+    else:
+        # Entries without IDs may repeat a price; sizes add up.
+        book.add_size(side, price, size)
+
+
+def apply_incremental(book_for: BookSource, message: FixMessage) -> List[OrderBook]:
+    """Apply a MarketDataIncrementalRefresh (X); returns the books it changed.
+
+    Entries start with MDUpdateAction (279) and may name their own symbol;
+    entries without one use the previous entry's. New and Change both set
+    the entry (or level), Delete removes it.
+    """
+    symbol = message.get(55)  # the first entry's symbol, or the message's
+    if symbol is None:
+        return []
+    book = book_for(symbol)
+    touched = [book]
+    pending = False
+    action = side = entry_id = price = None
+    size = 0.0
+    for tag, value in message.iter_from(268):
+        if tag == 279:
+            if pending:
+                _apply_entry(book, action, side, entry_id, price, size)
+            pending = True
+            action, side, entry_id, price, size = value, None, None, None, 0.0
+        elif tag == 269:
+            side = _ENTRY_SIDES.get(value)
+        elif tag == 270:
+            price = float(value)
+        elif tag == 271:
+            size = float(value)
+        elif tag == 278:
+            entry_id = value
+        elif tag == 55:
+            book = book_for(value.decode('ascii'))
+            if book not in touched:
+                touched.append(book)
+    if pending:
+        _apply_entry(book, action, side, entry_id, price, size)
+    return touched
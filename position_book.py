@@ -0,0 +1,126 @@
+"""Indexed in-memory book of open positions."""
+from typing import Dict, Iterator, List, Optional
+import threading
+
+
+class Position:
+    """One trade opened through ``Trader``."""
+
+    __slots__ = ('id', 'symbol', 'volume', 'direction', 'stop_loss', 'take_profit', 'status',
+                 'cl_ord_id', 'position_id', 'entry_price', 'exit_price')
+
+    def __init__(self, id: str, symbol: str, volume: float, direction: str,
+                 stop_loss: Optional[float] = None, take_profit: Optional[float] = None,
+                 status: str = 'pending', cl_ord_id: Optional[str] = None,
+                 position_id: Optional[str] = None, entry_price: Optional[float] = None,
+                 exit_price: Optional[float] = None):
+        self.id = id
+        self.symbol = symbol
+        self.volume = volume
+        self.direction = direction
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.status = status
+        self.cl_ord_id = cl_ord_id
+        self.position_id = position_id
+        self.entry_price = entry_price
+        self.exit_price = exit_price
+
+    @property
+    def signed_volume(self) -> float:
+        return self.volume if self.direction == 'buy' else -self.volume
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"Position({self.to_dict()})"
+
+
+class PositionBook:
+    """Positions indexed by id, symbol and direction.
+
+    Adding, removing and looking up a position are O(1), and the net volume
+    per symbol is maintained incrementally. All mutation happens under
+    ``lock``, which callers may also hold to update a position's fields
+    consistently with the book.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._by_id: Dict[str, Position] = {}
+        self._by_symbol: Dict[str, Dict[str, Position]] = {}
+        self._by_direction: Dict[str, Dict[str, Position]] = {'buy': {}, 'sell': {}}
+        self._net: Dict[str, float] = {}
+
+    def add(self, position: Position) -> None:
+        with self.lock:
+            if position.id in self._by_id:
+                raise ValueError(f"Position {position.id} is already in the book.")
+            self._by_id[position.id] = position
+            self._by_symbol.setdefault(position.symbol, {})[position.id] = position
+            self._by_direction[position.direction][position.id] = position
+            self._net[position.symbol] = self._net.get(position.symbol, 0.0) + position.signed_volume
+
+    def remove(self, position_id: str) -> Optional[Position]:
+        with self.lock:
+            position = self._by_id.pop(position_id, None)
+            if position is None:
+                return None
+            same_symbol = self._by_symbol[position.symbol]
+            del same_symbol[position_id]
+            if not same_symbol:
+                del self._by_symbol[position.symbol]
+            del self._by_direction[position.direction][position_id]
+            net = self._net[position.symbol] - position.signed_volume
+            if same_symbol:
+                self._net[position.symbol] = net
+            else:
+                del self._net[position.symbol]  # drop rounding residue with the last position
+            return position
+
+    def get(self, position_id: str) -> Optional[Position]:
+        return self._by_id.get(position_id)
+
+    def __contains__(self, position_id: str) -> bool:
+        return position_id in self._by_id
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Position]:
+        with self.lock:
+            return iter(list(self._by_id.values()))
+
+    def by_symbol(self, symbol: str) -> List[Position]:
+        with self.lock:
+            return list(self._by_symbol.get(symbol, {}).values())
+
+    def by_direction(self, direction: str) -> List[Position]:
+        with self.lock:
+            return list(self._by_direction[direction].values())
+
+    def symbols(self) -> List[str]:
+        with self.lock:
+            return list(self._by_symbol)
+
+    def net_exposure(self, symbol: str) -> float:
+        """Net volume in lots for ``symbol`` (long positive, short negative)."""
+        return self._net.get(symbol, 0.0)
+
+    def exposures(self) -> Dict[str, float]:
+        with self.lock:
+            return dict(self._net)
+
+    def snapshot(self) -> List[dict]:
+        """Plain-dict copies of every position, safe to hand to another thread."""
+        with self.lock:
+            return [position.to_dict() for position in self._by_id.values()]
+
+    def clear(self) -> None:
+        with self.lock:
+            self._by_id.clear()
+            self._by_symbol.clear()
+            for index in self._by_direction.values():
+                index.clear()
+            self._net.clear()
@@ -0,0 +1,279 @@
+"""Pre-trade risk checks with incrementally maintained counters.
+
+``RiskEngine`` keeps per-symbol net exposure, gross exposure, used margin,
+the open position count and the day's realized PnL as running totals that
+are adjusted when an order is admitted, filled, closed or rejected, so
+checking a new order is a handful of dictionary lookups and comparisons no
+matter how many positions are open. Volumes are in lots; money is in the
+account currency. Notional and PnL are in a pair's quote currency and are
+converted with ``quote_rate`` from the latest prices (USDJPY for a JPY
+quote in a USD account).
+"""
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Dict, Optional, Tuple
+import time
+
+# Units per standard lot (same as trading.LOT_SIZE).
+LOT_SIZE = 100_000
+SECONDS_PER_DAY = 86400
+
+
+def currencies(symbol: str) -> Tuple[str, str]:
+    """Base and quote currency of a six-letter symbol such as 'EURUSD' ('' if not one)."""
+    symbol = symbol.upper()
+    if len(symbol) == 6 and symbol.isalpha():
+        return symbol[:3], symbol[3:]
+    return '', ''
+
+
+def quote_rate(symbol: str, account_currency: str,
+               price_source: Callable[[str], Optional[float]]) -> Optional[float]:
+    """Account-currency value of one unit of ``symbol``'s quote currency.
+
+    Uses the price of the account/quote pair in either direction (for a
+    USD account, 1/USDJPY for any JPY-quoted symbol); None if
+    ``price_source`` has neither. Symbols that are not currency pairs are
+    taken to be quoted in the account currency.
+    """
+    quote = currencies(symbol)[1]
+    if not quote or quote == account_currency:
+        return 1.0
+    price = price_source(account_currency + quote)
+    if price:
+        return 1.0 / price
+    price = price_source(quote + account_currency)
+    return price or None
+
+
+class RiskRejected(ValueError):
+    """An order would breach a risk limit."""
+
+
+@dataclass
+class RiskLimits:
+    """Limits applied to every opening order; None disables a limit."""
+
+    max_order_volume: Optional[float] = 10.0        # lots per order
+    max_symbol_exposure: Optional[float] = 50.0     # |net lots| per symbol
+    max_gross_exposure: Optional[float] = 200.0     # sum of |lots| over all positions
+    max_open_positions: Optional[int] = 2000
+    leverage: float = 30.0                          # margin = notional / leverage
+    max_margin_usage: Optional[float] = 1.0         # used margin / balance after the order
+    max_daily_loss: Optional[float] = None          # realized loss since UTC midnight
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> 'RiskLimits':
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in (data or {}).items() if key in known})
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class RiskEngine:
+    """Running exposure/margin/loss totals and the checks that use them.
+
+    Call ``admit`` before sending an opening order (it raises
+    ``RiskRejected`` or reserves the order's exposure), ``on_fill`` when it
+    fills, ``on_close`` when the position is closed and ``release`` if the
+    order is rejected. Not thread-safe by itself; ``Trader`` calls it under
+    its position book lock.
+    """
+
+    def __init__(self, limits: Optional[RiskLimits] = None, balance: float = 0.0,
+                 price_source: Optional[Callable[[str], Optional[float]]] = None,
+                 account_currency: str = 'USD'):
+        self.limits = limits or RiskLimits()
+        self.balance = balance
+        self.account_currency = account_currency.upper()
+        # Latest price per symbol for margin estimates, falling back to the
+        # last fill; with neither, the margin check is skipped.
+        self.price_source = price_source
+        self._fill_prices: Dict[str, float] = {}
+        self.net: Dict[str, float] = {}
+        self.gross = 0.0
+        self.margin_used = 0.0
+        self.open_positions = 0
+        self.daily_realized = 0.0
+        self.rejections = 0
+        self._day = int(time.time() // SECONDS_PER_DAY)
+        # trade id -> (symbol, signed lots, margin)
+        self._reserved: Dict[str, Tuple[str, float, float]] = {}
+
+    def _price(self, symbol: str) -> Optional[float]:
+        price = self.price_source(symbol) if self.price_source is not None else None
+        return price if price is not None else self._fill_prices.get(symbol)
+
+    def quote_rate(self, symbol: str, price: Optional[float] = None) -> Optional[float]:
+        """``quote_rate`` for ``symbol``, taking its own price as ``price`` if given."""
+        if price:
+            return quote_rate(symbol, self.account_currency, lambda s: price if s == symbol else self._price(s))
+        return quote_rate(symbol, self.account_currency, self._price)
+
+    def to_account(self, symbol: str, amount: float, price: Optional[float] = None) -> float:
+        """Convert a quote-currency ``amount`` of ``symbol`` to the account currency.
+
+        Left unconverted only if no price to convert with is known yet.
+        """
+        rate = self.quote_rate(symbol, price)
+        return amount * rate if rate is not None else amount
+
+    def _margin(self, symbol: str, volume: float, price: Optional[float]) -> float:
+        """Margin in the account currency; 0 (check skipped) without the prices to work it out."""
+        if not price:
+            return 0.0
+        rate = self.quote_rate(symbol, price)
+        if rate is None:
+            return 0.0
+        return volume * LOT_SIZE * price * rate / self.limits.leverage
+
+    def _roll_day(self) -> None:
+        day = int(time.time() // SECONDS_PER_DAY)
+        if day != self._day:
+            self._day = day
+            self.daily_realized = 0.0
+
+    def check(self, symbol: str, volume: float, direction: str, price: Optional[float] = None) -> float:
+        """Raise ``RiskRejected`` if the order breaches a limit; returns its margin."""
+        limits = self.limits
+        signed = volume if direction == 'buy' else -volume
+        reason = None
+        if limits.max_order_volume is not None and volume > limits.max_order_volume:
+            reason = f"order volume {volume} exceeds {limits.max_order_volume} lots"
+        elif limits.max_open_positions is not None and self.open_positions >= limits.max_open_positions:
+            reason = f"{self.open_positions} positions already open"
+        elif (limits.max_symbol_exposure is not None
+              and abs(self.net.get(symbol, 0.0) + signed) > limits.max_symbol_exposure):
+            reason = f"{symbol} net exposure would exceed {limits.max_symbol_exposure} lots"
+        elif limits.max_gross_exposure is not None and self.gross + volume > limits.max_gross_exposure:
+            reason = f"gross exposure would exceed {limits.max_gross_exposure} lots"
+        if reason is None and limits.max_daily_loss is not None:
+            self._roll_day()
+            if -self.daily_realized >= limits.max_daily_loss:
+                reason = f"daily loss limit of {limits.max_daily_loss} reached"
+        if price is None:
+            price = self._price(symbol)
+        margin = self._margin(symbol, volume, price)
+        if (reason is None and margin and limits.max_margin_usage is not None
+                and self.margin_used + margin > self.balance * limits.max_margin_usage):
+            reason = (f"margin {self.margin_used + margin:.2f} would exceed "
+                      f"{limits.max_margin_usage:.0%} of balance {self.balance:.2f}")
+        if reason is not None:
+            self.rejections += 1
+            raise RiskRejected(f"Risk check failed: {reason}.")
+        return margin
+
+    def admit(self, trade_id: str, symbol: str, volume: float, direction: str,
+              price: Optional[float] = None) -> None:
+        """Check an opening order and reserve its exposure under ``trade_id``."""
+        self._reserve(trade_id, symbol, volume, direction, self.check(symbol, volume, direction, price))
+
+    def restore(self, trade_id: str, symbol: str, volume: float, direction: str,
+                price: Optional[float]) -> None:
+        """Count a position that is already open (e.g. after a restart), without checking limits."""
+        if price:
+            self._fill_prices[symbol] = price
+        self._reserve(trade_id, symbol, volume, direction, self._margin(symbol, volume, price))
+
+    def _reserve(self, trade_id: str, symbol: str, volume: float, direction: str, margin: float) -> None:
+        signed = volume if direction == 'buy' else -volume
+        self.net[symbol] = self.net.get(symbol, 0.0) + signed
+        self.gross += volume
+        self.margin_used += margin
+        self.open_positions += 1
+        self._reserved[trade_id] = (symbol, signed, margin)
+
+    def on_fill(self, trade_id: str, price: float) -> None:
+        """Re-price the reserved margin at the fill price."""
+        entry = self._reserved.get(trade_id)
+        if entry is None or not price:
+            return
+        symbol, signed, margin = entry
+        self._fill_prices[symbol] = price
+        new_margin = self._margin(symbol, abs(signed), price)
+        self.margin_used += new_margin - margin
+        self._reserved[trade_id] = (symbol, signed, new_margin)
+
+    def release(self, trade_id: str) -> None:
+        """Drop a position's exposure (rejected order or closed position)."""
+        entry = self._reserved.pop(trade_id, None)
+        if entry is None:
+            return
+        symbol, signed, margin = entry
+        net = self.net.get(symbol, 0.0) - signed
+        if abs(net) < 1e-9:
+            self.net.pop(symbol, None)  # flat; drop rounding residue
+        else:
+            self.net[symbol] = net
+        self.gross -= abs(signed)
+        if self.gross < 1e-9:
+            self.gross = 0.0
+        self.margin_used -= margin
+        if not self._reserved:
+            self.margin_used = 0.0
+        self.open_positions -= 1
+
+    def on_close(self, trade_id: str, realized_pnl: float) -> None:
+        """Release a closed position and book its realized PnL."""
+        self.release(trade_id)
+        self._roll_day()
+        self.daily_realized += realized_pnl
+        self.balance += realized_pnl
+
+    @staticmethod
+    def realized_pnl(direction: str, volume: float, entry_price: Optional[float],
+                     exit_price: Optional[float]) -> float:
+        """PnL in the symbol's quote currency; ``to_account`` converts it."""
+        if entry_price is None or exit_price is None:
+            return 0.0
+        signed = volume if direction == 'buy' else -volume
+        return (exit_price - entry_price) * signed * LOT_SIZE
+
+    def reset(self) -> None:
+        self.net.clear()
+        self._reserved.clear()
+        self.gross = 0.0
+        self.margin_used = 0.0
+        self.open_positions = 0
+
+    def get_state(self) -> tuple:
+        """Balance and today's realized PnL, for ``snapshot``; exposure is rebuilt from positions."""
+        return self.balance, self.daily_realized, self._day
+
+    def set_state(self, state: tuple) -> None:
+        balance, daily_realized, day = state
+        self.balance = balance
+        self._roll_day()
+        if day == self._day:
+            self.daily_realized = daily_realized
+
+    def snapshot(self) -> dict:
+        return {
+            'balance': self.balance,
+            'margin_used': self.margin_used,
+            'free_margin': self.balance - self.margin_used,
+            'gross_exposure': self.gross,
+            'net_exposure': dict(self.net),
+            'open_positions': self.open_positions,
+            'daily_realized': self.daily_realized,
+            'rejections': self.rejections,
+        }
+
+
+if __name__ == "__main__":
+    import random
+
+    engine = RiskEngine(RiskLimits(max_open_positions=None, max_gross_exposure=None, max_symbol_exposure=None),
+                        balance=1e9, price_source={'EURUSD': 1.1, 'GBPUSD': 1.3, 'USDJPY': 150.0}.get)
+    symbols = ['EURUSD', 'GBPUSD', 'USDJPY']
+    for i in range(1000):
+        engine.admit(f"P{i}", random.choice(symbols), 0.1, random.choice(('buy', 'sell')))
+    engine.on_fill("P0", 1.1)
+
+    n = 200_000
+    started = time.perf_counter_ns()
+    for i in range(n):
+        engine.admit("bench", 'EURUSD', 0.1, 'buy')
+        engine.release("bench")
+    elapsed = (time.perf_counter_ns() - started) / n
+    print(f"admit + release with {engine.open_positions} open positions: {elapsed / 1000:.2f} us per order")
@@ -0,0 +1,130 @@
+"""Timer scheduler for everything periodic on an engine's event loop.
+
+One binary heap of deadlines drives FIX heartbeats and test requests,
+reconnect backoff and periodic strategy evaluation, with a single
+``loop.call_at`` handle armed for the earliest deadline instead of a task
+or thread per timer. Cancelled timers are dropped lazily when they reach
+the top of the heap. Each wakeup's lateness against its deadline is
+recorded, so ``jitter`` shows how well the loop keeps time under load.
+"""
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+
+from latency import LatencyHistogram
+
+
+class Timer:
+    """Handle for a scheduled callback."""
+
+    __slots__ = ('when', 'interval', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when: float, interval: Optional[float], callback: Callable[..., Any], args: tuple):
+        self.when = when
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class Scheduler:
+    """Heap of timers on one event loop; use it only from that loop's thread."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self._heap: List[Tuple[float, int, Timer]] = []
+        self._seq = itertools.count()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed_at: Optional[float] = None
+        # Lateness of each timer callback against its deadline, in ns.
+        self.jitter = LatencyHistogram()
+        self.fired = 0
+
+    def time(self) -> float:
+        return self.loop.time()
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        """Run ``callback(*args)`` once at loop time ``when``."""
+        return self._push(Timer(when, None, callback, args))
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        return self._push(Timer(self.loop.time() + delay, None, callback, args))
+
+    def call_every(self, interval: float, callback: Callable[..., Any], *args: Any,
+                   first: Optional[float] = None) -> Timer:
+        """Run ``callback(*args)`` every ``interval`` seconds (first after ``first``).
+
+        Deadlines advance at a fixed rate; if the loop falls more than one
+        interval behind, missed runs are skipped rather than bunched up.
+        """
+        if interval <= 0:
+            raise ValueError("Interval must be positive.")
+        delay = interval if first is None else first
+        return self._push(Timer(self.loop.time() + delay, interval, callback, args))
+
+    def _push(self, timer: Timer) -> Timer:
+        heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+        if self._armed_at is None or timer.when < self._armed_at:
+            self._arm(timer.when)
+        return timer
+
+    def _arm(self, when: float) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._armed_at = when
+        self._handle = self.loop.call_at(when, self._run)
+
+    def _run(self) -> None:
+        self._handle = None
+        self._armed_at = None
+        heap = self._heap
+        now = self.loop.time()
+        while heap and heap[0][0] <= now:
+            when, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                continue
+            self.jitter.record(int((now - when) * 1e9))
+            self.fired += 1
+            if timer.interval is not None:
+                timer.when = when + timer.interval
+                if timer.when <= now:
+                    timer.when = now + timer.interval
+                heapq.heappush(heap, (timer.when, next(self._seq), timer))
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                self.loop.call_exception_handler({
+                    'message': f"Scheduled callback {timer.callback!r} failed",
+                    'exception': e,
+                })
+            now = self.loop.time()
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        if heap:
+            self._arm(heap[0][0])
+
+    def __len__(self) -> int:
+        return sum(1 for _, _, timer in self._heap if not timer.cancelled)
+
+    def close(self) -> None:
+        """Cancel every timer."""
+        for _, _, timer in self._heap:
+            timer.cancel()
+        self._heap.clear()
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = None
+        self._armed_at = None
+
+    def jitter_summary(self) -> dict:
+        """Wakeup lateness (count, mean/p50/p99/p99.9/max in microseconds)."""
+        return self.jitter.summary()
+
+    def format_jitter(self) -> str:
+        s = self.jitter.summary()
+        return (f"timer jitter over {s['count']} wakeups: p50 {s['p50_us']:.0f} us, "
+                f"p99 {s['p99_us']:.0f} us, p99.9 {s['p99_9_us']:.0f} us, max {s['max_us']:.0f} us")
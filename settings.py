@@ -1,5 +1,5 @@
 """Application settings and credential management."""
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, replace
 from typing import Optional
 import json
 import os
@@ -11,11 +11,32 @@ class Settings:
     # FIX connection parameters (assuming single, live configuration)
     fix_host: str = 'live-uk-eqx-01.p.c-trader.com'
     fix_port: int = 5212
+    fix_quote_port: int = 5211    # cTrader serves prices on a separate QUOTE session
     fix_sender_comp_id: str = ''  # User specific, e.g., 'live4.icmarkets.6077021'
     fix_target_comp_id: str = 'cServer'
     fix_sender_sub_id: str = 'TRADE'
     fix_password: str = ''        # User specific
 
+    # Currency the account balance is kept in; margin and PnL are converted to it
+    account_currency: str = 'USD'
+    # Overrides for risk.RiskLimits fields, e.g. {"max_order_volume": 5.0}
+    risk_limits: dict = field(default_factory=dict)
+    # Extra directories scanned for strategy plugin modules
+    strategy_dirs: list = field(default_factory=list)
+    # Accounts run by supervisor.py: dicts overriding any field above (at least
+    # fix_sender_comp_id and fix_password) plus "name", "symbols" and "volume".
+    accounts: list = field(default_factory=list)
+    # JSON-lines event journal and order audit log ('' = console only);
+    # "{account}" in the path is replaced by the SenderCompID.
+    journal_path: str = ''
+    journal_level: str = 'INFO'
+    # Subscribe to full market depth (Level 2) rather than top of book
+    market_depth: bool = False
+    # Warm-restart state snapshot written by engine.py every snapshot_interval
+    # seconds ('' = off); "{account}" is expanded as in journal_path.
+    snapshot_path: str = ''
+    snapshot_interval: float = 1.0
+
     # __post_init__ is removed as migration logic for old fields is no longer complex;
     # old fields are entirely removed. Load method will handle missing new fields from very old configs.
 
@@ -31,10 +52,20 @@ class Settings:
                 settings_data = {
                     'fix_host': data.get('fix_host', 'live-uk-eqx-01.p.c-trader.com'),
                     'fix_port': data.get('fix_port', 5212),
+                    'fix_quote_port': data.get('fix_quote_port', 5211),
                     'fix_sender_comp_id': data.get('fix_sender_comp_id', ''),
                     'fix_target_comp_id': data.get('fix_target_comp_id', 'cServer'),
                     'fix_sender_sub_id': data.get('fix_sender_sub_id', 'TRADE'),
-                    'fix_password': data.get('fix_password', '')
+                    'fix_password': data.get('fix_password', ''),
+                    'account_currency': data.get('account_currency', 'USD'),
+                    'risk_limits': data.get('risk_limits', {}),
+                    'strategy_dirs': data.get('strategy_dirs', []),
+                    'accounts': data.get('accounts', []),
+                    'journal_path': data.get('journal_path', ''),
+                    'journal_level': data.get('journal_level', 'INFO'),
+                    'market_depth': data.get('market_depth', False),
+                    'snapshot_path': data.get('snapshot_path', ''),
+                    'snapshot_interval': data.get('snapshot_interval', 1.0),
                 }
                 return cls(**settings_data)
             except json.JSONDecodeError:
@@ -44,6 +75,11 @@ class Settings:
         # If config file doesn't exist or fails to load, return instance with defaults
         return cls()
 
+    def for_account(self, account: dict) -> 'Settings':
+        """A copy with the connection fields overridden by ``account``."""
+        known = {f.name for f in fields(self)} - {'accounts'}
+        return replace(self, accounts=[], **{key: value for key, value in account.items() if key in known})
+
     def save(self) -> None:
         # Save all current attributes of the dataclass instance
         with open(CONFIG_FILE, 'w') as f:
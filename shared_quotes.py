@@ -0,0 +1,157 @@
+"""Quotes shared between processes through a shared-memory ring buffer.
+
+One process (the supervisor) owns the QUOTE session and writes every quote
+into a ``SharedQuoteRing``; worker processes attach to it by name and poll
+it into their own ``MarketDataFeed``, so N workers cost one FIX feed instead
+of N. The ring has a single writer and any number of readers, needs no
+locks and copies no Python objects between processes.
+
+Layout (all native-endian 8-byte words)::
+
+    header   published count, capacity, symbol table length, unused
+    symbols  JSON list of symbol names, padded to 8 bytes
+    records  capacity x (timestamp, bid, ask, symbol index) float64
+
+The writer fills a record and then bumps the published count; readers copy
+the records between their position and the count, then re-read the count
+and drop whatever the writer may have overwritten meanwhile (up to and
+including the slot of the next, possibly half-written, record). This relies
+on aligned 8-byte stores becoming visible in program order, as they do on
+x86-64. A reader that falls ``capacity`` or more quotes behind skips
+ahead and counts the gap in ``dropped``.
+"""
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+import json
+
+HEADER_WORDS = 4
+RECORD_WORDS = 4  # timestamp, bid, ask, symbol index
+DEFAULT_RING_CAPACITY = 1 << 16
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers every attachment with the resource tracker;
+        # harmless for processes spawned by the creator, which share its tracker.
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedQuoteRing:
+    """A quote ring in shared memory; ``create`` it in the writer, ``attach`` in readers."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self._header = shm.buf[:HEADER_WORDS * 8].cast('Q')
+        self.capacity = self._header[1]
+        table_len = self._header[2]
+        table_start = HEADER_WORDS * 8
+        self.symbols: List[str] = json.loads(bytes(shm.buf[table_start:table_start + table_len]))
+        self._index: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        records_start = table_start + (table_len + 7) // 8 * 8
+        self._records = shm.buf[records_start:records_start + self.capacity * RECORD_WORDS * 8].cast('d')
+        self._seq = self._header[0]
+
+    @classmethod
+    def create(cls, symbols: Sequence[str], capacity: int = DEFAULT_RING_CAPACITY,
+               name: Optional[str] = None) -> 'SharedQuoteRing':
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive.")
+        table = json.dumps(list(symbols)).encode()
+        padded = (len(table) + 7) // 8 * 8
+        size = HEADER_WORDS * 8 + padded + capacity * RECORD_WORDS * 8
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = shm.buf[:HEADER_WORDS * 8].cast('Q')
+        header[0] = 0
+        header[1] = capacity
+        header[2] = len(table)
+        header.release()
+        shm.buf[HEADER_WORDS * 8:HEADER_WORDS * 8 + len(table)] = table
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedQuoteRing':
+        return cls(_attach(name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def published(self) -> int:
+        """Quotes written since the ring was created."""
+        return self._header[0]
+
+    def write(self, symbol: str, timestamp: float, bid: float, ask: float) -> bool:
+        """Publish a quote (feed subscriber signature). False for unknown symbols."""
+        index = self._index.get(symbol)
+        if index is None:
+            return False
+        seq = self._seq
+        base = (seq % self.capacity) * RECORD_WORDS
+        records = self._records
+        records[base] = timestamp
+        records[base + 1] = bid
+        records[base + 2] = ask
+        records[base + 3] = index
+        self._seq = seq + 1
+        self._header[0] = seq + 1
+        return True
+
+    def close(self) -> None:
+        self._header.release()
+        self._records.release()
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Remove the shared memory block (writer only, after readers detached)."""
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedQuoteReader:
+    """One reader's position in a ``SharedQuoteRing``."""
+
+    def __init__(self, ring: SharedQuoteRing, from_start: bool = False):
+        self.ring = ring
+        self.position = 0 if from_start else ring.published()
+        self.dropped = 0
+
+    def lag(self) -> int:
+        return self.ring.published() - self.position
+
+    def poll(self, feed, limit: Optional[int] = None) -> int:
+        """Pass new quotes to ``feed.on_quote``; returns how many."""
+        ring = self.ring
+        capacity = ring.capacity
+        end = ring.published()
+        start = self.position
+        if end == start:
+            return 0
+        if end - start >= capacity:
+            # The oldest slot may be mid-overwrite by the record after ``end``.
+            self.dropped += end - start - capacity + 1
+            start = end - capacity + 1
+        if limit is not None and end - start > limit:
+            end = start + limit
+        first = (start % capacity) * RECORD_WORDS
+        last = first + (end - start) * RECORD_WORDS
+        records = ring._records
+        if last <= capacity * RECORD_WORDS:
+            values = records[first:last].tolist()
+        else:
+            values = records[first:].tolist() + records[:last - capacity * RECORD_WORDS].tolist()
+        # Records below this index may have been overwritten while copying,
+        # including the slot of the record the writer may be filling now.
+        overwritten = ring.published() - capacity + 1
+        if overwritten > start:
+            skip = min(overwritten, end) - start
+            self.dropped += skip
+            del values[:skip * RECORD_WORDS]
+        self.position = end
+        symbols = ring.symbols
+        on_quote = feed.on_quote
+        for i in range(0, len(values), RECORD_WORDS):
+            on_quote(symbols[int(values[i + 3])], values[i], values[i + 1], values[i + 2])
+        return len(values) // RECORD_WORDS
@@ -0,0 +1,490 @@
+"""Simulated exchange for paper trading and load testing the order path.
+
+``SimulatedExchange`` is a ``LoopbackAcceptor`` that behaves like a venue
+instead of a test double: market orders are matched against the latest
+quote, published directly or replayed from recorded ticks (it has the
+feed's ``on_quote`` signature, so ``market_data.replay_async`` drives it),
+after a configurable latency, with adverse slippage, partial fills and
+random rejects. ``Trader`` connects to it exactly as it does to cTrader, so
+everything from ``open_trade`` down to the FIX session is exercised.
+
+Connections split frames with ``FrameReader``, answer through cached
+``Encoder`` templates and write each burst of replies at once, so the venue
+keeps up with well over 10,000 orders a second. ``load_test`` runs it in a
+separate process and drives a ``Trader`` at increasing order rates to find
+where our side saturates::
+
+    python sim_exchange.py --rates 2000 5000 10000 20000 --duration 5
+    python sim_exchange.py --ticks data/ticks --symbols EURUSD --latency 0.002 --partial-fill-rate 0.2
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import random
+import sys
+import time
+
+from fix_acceptor import LoopbackAcceptor, _Connection
+from fix_codec import Encoder, FixCodecError, FrameReader
+from fix_session import EXECUTION_REPORT
+from market_data import replay_async
+
+# ExecutionReport fields in template order; PositionID, LastQty, LastPx and
+# Text follow when present.
+REPORT_TAGS = (11, 37, 17, 150, 39, 55, 54, 38, 14, 6)
+# Risk limits for load tests: the point is to find the stack's limits, not the account's.
+LOAD_TEST_RISK = {'max_order_volume': None, 'max_symbol_exposure': None, 'max_gross_exposure': None,
+                  'max_open_positions': None, 'max_margin_usage': None}
+DEFAULT_RATES = (1000, 2000, 5000, 10000, 20000)
+# A step counts as saturated below this fraction of its target rate.
+SATURATION_THRESHOLD = 0.95
+
+
+class _Order:
+    """A NewOrderSingle as the venue tracks it until fully filled or rejected."""
+
+    __slots__ = ('connection', 'cl_ord_id', 'order_id', 'symbol', 'side', 'quantity', 'position_id',
+                 'cum_qty', 'notional', 'exec_ids')
+
+    def __init__(self, connection: '_VenueConnection', cl_ord_id: str, order_id: str, symbol: str,
+                 side: str, quantity: float, position_id: Optional[str]):
+        self.connection = connection
+        self.cl_ord_id = cl_ord_id
+        self.order_id = order_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.position_id = position_id
+        self.cum_qty = 0.0
+        self.notional = 0.0
+        self.exec_ids = itertools.count(1)
+
+
+class _VenueConnection(_Connection):
+    """Connection with buffered frame parsing and templated, batched replies.
+
+    Inbound messages are not kept in ``acceptor.received``; the exchange
+    keeps counters in ``stats`` instead.
+    """
+
+    def __init__(self, acceptor: 'SimulatedExchange', reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        super().__init__(acceptor, reader, writer)
+        self._encoder: Optional[Encoder] = None
+        self._out: List[bytes] = []
+        self.closed = False
+
+    def _encoder_for(self) -> Encoder:
+        if self._encoder is None:
+            # Logon sets the target IDs before the first reply is encoded.
+            self._encoder = Encoder([(49, self.acceptor.sender_comp_id), (56, self.target_comp_id),
+                                     (57, self.target_sub_id)])
+        return self._encoder
+
+    def _queue(self, frame: bytes) -> None:
+        if self.closed:
+            return
+        if not self._out:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._out.append(frame)
+
+    def _flush(self) -> None:
+        if self._out and not self.closed:
+            self.writer.write(b''.join(self._out))
+        self._out.clear()
+
+    def send(self, msg_type: str, body: List[Tuple[int, str]], seq: Optional[int] = None,
+             poss_dup: bool = False) -> None:
+        if seq is None:
+            seq = self.next_out_seq
+            self.next_out_seq += 1
+        self._queue(self._encoder_for().encode(msg_type, seq, body, poss_dup=poss_dup))
+
+    def report(self, order: _Order, exec_type: str, status: str, last_qty: float = 0.0,
+               last_px: float = 0.0, text: Optional[str] = None) -> None:
+        """Send an ExecutionReport for ``order`` in its current state."""
+        encoder = self._encoder_for()
+        seq = self.next_out_seq
+        self.next_out_seq += 1
+        avg_px = order.notional / order.cum_qty if order.cum_qty else 0.0
+        values = (order.cl_ord_id, order.order_id, f"E{order.order_id}-{next(order.exec_ids)}", exec_type,
+                  status, order.symbol, order.side, f"{order.quantity:g}", f"{order.cum_qty:g}", f"{avg_px:.10g}")
+        extra = []
+        if order.position_id:
+            extra.append((721, order.position_id))
+        if last_qty:
+            extra += [(32, f"{last_qty:g}"), (31, f"{last_px:.10g}")]
+        if text:
+            extra.append((58, text))
+        self._queue(encoder.template(EXECUTION_REPORT, REPORT_TAGS).encode(seq, encoder.timestamp(), values, extra))
+
+    def execute(self, fields) -> None:
+        self.acceptor.submit(self, fields.get(11, ''), fields.get(55, ''), fields.get(54, ''),
+                             float(fields.get(38) or 0), fields.get(721))
+
+    async def serve(self) -> None:
+        frames = FrameReader()
+        try:
+            while True:
+                data = await self.reader.read(1 << 16)
+                if not data:
+                    break
+                frames.feed(data)
+                for fields in frames:
+                    if not self.handle(fields):
+                        return
+                await self.writer.drain()
+        except (ConnectionError, FixCodecError, asyncio.CancelledError):
+            pass  # cancelled: the exchange is shutting down
+        finally:
+            self._flush()
+            self.closed = True
+            self.acceptor.connections.discard(self)
+            self.writer.close()
+
+
+class SimulatedExchange(LoopbackAcceptor):
+    """A FIX venue matching market orders against its latest quotes.
+
+    Buys fill at the ask and sells at the bid, moved against the order by
+    up to ``slippage`` (price units, drawn uniformly). Orders are handled
+    ``latency`` seconds after arrival plus up to ``latency_jitter``. With
+    probability ``partial_fill_rate`` an order fills in 2 to ``max_fills``
+    parts, ``fill_interval`` seconds apart and each at the quote of its
+    time. Orders are rejected for symbols in ``reject_symbols``, symbols
+    without a quote or a ``prices`` entry, quantities (units) above
+    ``max_quantity``, and at random with probability ``reject_rate``.
+    ``seed`` makes a run repeatable. Counters are kept in ``stats``.
+    """
+
+    connection_class = _VenueConnection
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, sender_comp_id: str = 'cServer',
+                 password: Optional[str] = None, prices: Optional[Dict[str, float]] = None,
+                 latency: float = 0.0, latency_jitter: float = 0.0, slippage: float = 0.0,
+                 partial_fill_rate: float = 0.0, max_fills: int = 3, fill_interval: float = 0.0,
+                 reject_rate: float = 0.0, max_quantity: Optional[float] = None,
+                 reject_symbols: Optional[Set[str]] = None, seed: Optional[int] = None):
+        super().__init__(host, port, sender_comp_id, password, prices=prices, reject_symbols=reject_symbols)
+        if max_fills < 2 and partial_fill_rate:
+            raise ValueError("Partial fills need max_fills of at least 2.")
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.slippage = slippage
+        self.partial_fill_rate = partial_fill_rate
+        self.max_fills = max_fills
+        self.fill_interval = fill_interval
+        self.reject_rate = reject_rate
+        self.max_quantity = max_quantity
+        self.rng = random.Random(seed)
+        self.stats = {'orders': 0, 'fills': 0, 'partial_fills': 0, 'rejects': 0, 'quotes': 0}
+
+    def on_quote(self, symbol: str, timestamp: float, bid: float, ask: float) -> None:
+        """Feed subscriber signature, for ``market_data.replay_async``."""
+        self.stats['quotes'] += 1
+        self.publish_quote(symbol, bid, ask)
+
+    async def replay(self, ticks: Iterable[Tuple[str, float, float, float]], speed: Optional[float] = None) -> int:
+        """Match against recorded (symbol, time, bid, ask) ticks, e.g. ``tick_store.iter_ticks``."""
+        return await replay_async(self, ticks, speed=speed)
+
+    def quote(self, symbol: str) -> Optional[Tuple[float, float]]:
+        quote = self.quotes.get(symbol)
+        if quote is None and symbol in self.prices:
+            price = self.prices[symbol]
+            return price, price
+        return quote
+
+    # --- matching ----------------------------------------------------------
+
+    def submit(self, connection: _VenueConnection, cl_ord_id: str, symbol: str, side: str,
+               quantity: float, position_id: Optional[str]) -> None:
+        self.stats['orders'] += 1
+        order = _Order(connection, cl_ord_id, str(next(self._order_ids)), symbol, side, quantity, position_id)
+        delay = self.latency + (self.rng.random() * self.latency_jitter if self.latency_jitter else 0.0)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._match, order)
+        else:
+            self._match(order)
+
+    def _reject_reason(self, order: _Order) -> Optional[str]:
+        if order.symbol in self.reject_symbols:
+            return "Symbol not tradable"
+        if self.quote(order.symbol) is None:
+            return f"No quotes for {order.symbol}"
+        if order.quantity <= 0:
+            return "Invalid quantity"
+        if self.max_quantity is not None and order.quantity > self.max_quantity:
+            return f"Quantity above {self.max_quantity:g}"
+        if self.reject_rate and self.rng.random() < self.reject_rate:
+            return "Simulated reject"
+        return None
+
+    def _match(self, order: _Order) -> None:
+        connection = order.connection
+        if connection.closed:
+            return
+        reason = self._reject_reason(order)
+        if reason is not None:
+            self.stats['rejects'] += 1
+            connection.report(order, '8', '8', text=reason)
+            return
+        if not order.position_id:
+            order.position_id = str(next(self._position_ids))
+        connection.report(order, '0', '0')
+        parts = 1
+        if self.partial_fill_rate and self.rng.random() < self.partial_fill_rate:
+            parts = self.rng.randint(2, self.max_fills)
+        self._fill(order, parts)
+
+    def _fill(self, order: _Order, parts: int) -> None:
+        connection = order.connection
+        if connection.closed:
+            return
+        remaining = order.quantity - order.cum_qty
+        quantity = remaining if parts <= 1 else max(1.0, round(remaining / parts))
+        bid, ask = self.quote(order.symbol)
+        slip = self.rng.random() * self.slippage if self.slippage else 0.0
+        price = ask + slip if order.side == '1' else bid - slip
+        order.cum_qty += quantity
+        order.notional += quantity * price
+        if order.cum_qty >= order.quantity:
+            self.stats['fills'] += 1
+            connection.report(order, 'F', '2', quantity, price)
+            return
+        self.stats['partial_fills'] += 1
+        connection.report(order, 'F', '1', quantity, price)
+        if self.fill_interval > 0:
+            asyncio.get_running_loop().call_later(self.fill_interval, self._fill, order, parts - 1)
+        else:
+            self._fill(order, parts - 1)
+
+
+def random_walk_ticks(symbols: Iterable[str], interval: float = 0.01, start: float = 1.1,
+                      step: float = 1e-5, spread: float = 2e-5, seed: Optional[int] = None
+                      ) -> Iterator[Tuple[str, float, float, float]]:
+    """Endless synthetic (symbol, time, bid, ask) ticks, one per symbol every ``interval`` seconds."""
+    rng = random.Random(seed)
+    mids = {symbol: start for symbol in symbols}
+    now = time.time()
+    while True:
+        now += interval
+        for symbol, mid in mids.items():
+            mid = mids[symbol] = mid + rng.gauss(0.0, step)
+            yield symbol, now, mid - spread / 2, mid + spread / 2
+
+
+# --- load test ------------------------------------------------------------------
+
+def _ticks_for(symbols: List[str], tick_dir: Optional[str], seed: Optional[int]) -> Iterable[tuple]:
+    if not tick_dir:
+        return random_walk_ticks(symbols, seed=seed)
+    from tick_store import iter_ticks
+
+    return heapq.merge(*(iter_ticks(tick_dir, symbol) for symbol in symbols), key=lambda tick: tick[1])
+
+
+async def _serve_venue(conn, options: dict, symbols: List[str], tick_dir: Optional[str]) -> None:
+    exchange = SimulatedExchange(**options)
+    port = await exchange.start()
+    loop = asyncio.get_running_loop()
+    ticks = _ticks_for(symbols, tick_dir, options.get('seed'))
+    first = next(iter(ticks), None)
+    if first is not None:
+        exchange.on_quote(*first)  # priced before the first order arrives
+    replay = asyncio.ensure_future(exchange.replay(ticks, speed=1.0))
+    conn.send(port)
+    await loop.run_in_executor(None, conn.recv)  # stop request
+    replay.cancel()
+    conn.send(dict(exchange.stats))
+    await exchange.stop()
+
+
+def venue_main(conn, options: dict, symbols: List[str], tick_dir: Optional[str] = None) -> None:
+    """Process entry point: serve a ``SimulatedExchange`` until told to stop over ``conn``."""
+    asyncio.run(_serve_venue(conn, options, symbols, tick_dir))
+
+
+class _Counter:
+    """Trade status transitions seen by the load test (updated on the session thread)."""
+
+    def __init__(self):
+        self.filled = 0
+        self.rejected = 0
+        self.closed = 0
+        # A rejected close reopens its trade; count each fill once.
+        self._opened: Set[str] = set()
+
+    def __call__(self, trade: dict) -> None:
+        status = trade['status']
+        if status == 'open':
+            if trade['id'] not in self._opened:
+                self._opened.add(trade['id'])
+                self.filled += 1
+        elif status == 'rejected':
+            self.rejected += 1
+        elif status == 'closed':
+            self.closed += 1
+
+
+def _run_step(trader, counter: _Counter, rate: int, duration: float, symbols: List[str],
+              volume: float, batch: int, max_open: int, drain_timeout: float) -> dict:
+    from latency import SEND_TO_ACK, LatencyTracker
+
+    trader.latency = LatencyTracker()
+    filled, rejected, closed = counter.filled, counter.rejected, counter.closed
+    directions = itertools.cycle(('buy', 'sell'))
+    symbol_cycle = itertools.cycle(symbols)
+    submitted = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < duration:
+        due = int(rate * elapsed) - submitted
+        if due > 0:
+            orders = [{'symbol': next(symbol_cycle), 'volume': volume, 'direction': next(directions)}
+                      for _ in range(due)]
+            if batch > 1:
+                for i in range(0, due, batch):
+                    trader.open_trades_batch(orders[i:i + batch])
+            else:
+                for order in orders:
+                    trader.open_trade(order['symbol'], order['volume'], order['direction'])
+            submitted += due
+        if len(trader.positions) > max_open:
+            trader.close_all()
+        time.sleep(0.001)
+        elapsed = time.perf_counter() - started
+    done_in_time = counter.filled - filled + counter.rejected - rejected
+    # Let the backlog drain so the next step starts clean.
+    deadline = time.perf_counter() + drain_timeout
+    while counter.filled - filled + counter.rejected - rejected < submitted and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    drained = time.perf_counter() - started
+    completed = counter.filled - filled + counter.rejected - rejected
+    ack = trader.latency.histogram(SEND_TO_ACK)
+    summary = ack.summary() if ack is not None else {}
+    return {
+        'target_rate': rate,
+        'submitted': submitted,
+        'completed': completed,
+        'rejected': counter.rejected - rejected,
+        'closed': counter.closed - closed,
+        'throughput': done_in_time / elapsed,
+        'backlog': submitted - done_in_time,
+        'drain_s': drained - elapsed,
+        'ack_p50_ms': summary.get('p50_us', 0.0) / 1000,
+        'ack_p99_ms': summary.get('p99_us', 0.0) / 1000,
+        'saturated': done_in_time < SATURATION_THRESHOLD * rate * elapsed or completed < submitted,
+    }
+
+
+def load_test(rates: Iterable[int] = DEFAULT_RATES, duration: float = 5.0, symbols: Iterable[str] = ('EURUSD',),
+              volume: float = 0.01, batch: int = 1, max_open: int = 1000, journal_path: Optional[str] = None,
+              tick_dir: Optional[str] = None, drain_timeout: float = 30.0, stop_at_saturation: bool = True,
+              **venue_options) -> dict:
+    """Drive a ``Trader`` against a ``SimulatedExchange`` process at each of ``rates`` orders/s.
+
+    Orders alternate buy/sell over ``symbols`` (``batch`` > 1 submits them
+    through ``open_trades_batch``); open positions are flattened with
+    ``close_all`` whenever more than ``max_open`` are open. Each step
+    reports the completed order rate, the backlog left at its end and
+    send-to-ack latency percentiles. ``venue_options`` go to
+    ``SimulatedExchange``. Returns ``{'steps': [...], 'venue': stats}``.
+    """
+    from journal import WARNING, Journal
+    from settings import Settings
+    from trading import Trader
+
+    symbols = list(symbols)
+    context = multiprocessing.get_context('spawn')
+    conn, child_conn = context.Pipe()
+    venue = context.Process(target=venue_main, name="sim-exchange",
+                            args=(child_conn, venue_options, symbols, tick_dir), daemon=True)
+    venue.start()
+    trader = None
+    steps: List[dict] = []
+    venue_stats: dict = {}
+    try:
+        if not conn.poll(30):
+            raise RuntimeError("Simulated exchange did not start.")
+        port = conn.recv()
+        settings = Settings(fix_host='127.0.0.1', fix_port=port, fix_quote_port=port,
+                            fix_sender_comp_id='loadtest.1', fix_password='loadtest',
+                            risk_limits=LOAD_TEST_RISK)
+        trader = Trader(settings, journal=Journal(journal_path, level='AUDIT', echo_level=WARNING, name='load'))
+        counter = _Counter()
+        trader.on_trade_update.append(counter)
+        if not trader.connect():
+            raise RuntimeError(f"Logon to the simulated exchange failed: {trader.connection_message}")
+        for rate in rates:
+            step = _run_step(trader, counter, rate, duration, symbols, volume, batch, max_open, drain_timeout)
+            steps.append(step)
+            print(format_step(step), flush=True)
+            if step['saturated'] and stop_at_saturation:
+                break
+        trader.close_all(timeout=drain_timeout)
+    finally:
+        if trader is not None:
+            trader.disconnect()
+            trader.journal.close()
+        if venue.is_alive():
+            conn.send('stop')
+            if conn.poll(10):
+                venue_stats = conn.recv()
+        venue.join(10)
+        if venue.is_alive():
+            venue.terminate()
+    return {'steps': steps, 'venue': venue_stats}
+
+
+STEP_HEADER = f"{'target/s':>9} {'done/s':>9} {'backlog':>8} {'rejected':>8} {'ack p50':>9} {'ack p99':>9}"
+
+
+def format_step(step: dict) -> str:
+    line = (f"{step['target_rate']:>9} {step['throughput']:>9.0f} {step['backlog']:>8} {step['rejected']:>8} "
+            f"{step['ack_p50_ms']:>7.2f}ms {step['ack_p99_ms']:>7.2f}ms")
+    return line + ("  saturated" if step['saturated'] else '')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the order path against a simulated exchange.")
+    parser.add_argument('--rates', type=int, nargs='+', default=list(DEFAULT_RATES), help="orders per second, per step")
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per step")
+    parser.add_argument('--symbols', nargs='+', default=['EURUSD'])
+    parser.add_argument('--volume', type=float, default=0.01, help="lots per order")
+    parser.add_argument('--batch', type=int, default=1, help="orders per open_trades_batch call (1 = open_trade)")
+    parser.add_argument('--max-open', type=int, default=1000, help="flatten once more positions are open")
+    parser.add_argument('--journal', default=None, help="also write the audit journal to this file")
+    parser.add_argument('--ticks', default=None, help="tick_store directory to replay (default: random walk)")
+    parser.add_argument('--latency', type=float, default=0.0, help="venue latency in seconds")
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--slippage', type=float, default=0.0, help="maximum adverse slippage in price units")
+    parser.add_argument('--partial-fill-rate', type=float, default=0.0)
+    parser.add_argument('--max-fills', type=int, default=3)
+    parser.add_argument('--fill-interval', type=float, default=0.0)
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--keep-going', action='store_true', help="run every rate even after saturating")
+    args = parser.parse_args(argv)
+
+    print(STEP_HEADER)
+    result = load_test(args.rates, args.duration, args.symbols, args.volume, args.batch, args.max_open,
+                       journal_path=args.journal, tick_dir=args.ticks, stop_at_saturation=not args.keep_going,
+                       latency=args.latency, latency_jitter=args.latency_jitter, slippage=args.slippage,
+                       partial_fill_rate=args.partial_fill_rate, max_fills=args.max_fills,
+                       fill_interval=args.fill_interval, reject_rate=args.reject_rate, seed=args.seed)
+    steps = result['steps']
+    saturated = [step for step in steps if step['saturated']]
+    if saturated:
+        print(f"Saturated at {saturated[0]['target_rate']} orders/s; "
+              f"best sustained {max(step['throughput'] for step in steps):.0f} orders/s.")
+    else:
+        print(f"No saturation up to {steps[-1]['target_rate'] if steps else 0} orders/s.")
+    print(f"Venue: {result['venue']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Compact binary state snapshots for warm restarts.
+
+A snapshot is a nested structure of plain values (None, bools, ints,
+floats, strings, bytes, lists, tuples and string-keyed dicts) encoded with
+``struct`` into one tagged binary record and checksummed with CRC-32.
+Bulk numeric state (ring buffers, tick tails) travels as raw ``array``
+bytes, so a whole window is one value rather than one per price.
+
+``SnapshotWriter`` encodes and writes on a background thread. The caller
+only builds the state (cheap copies, taken on the loop so it is
+consistent) and hands it over; only the latest state is kept, and each
+file is written to a temporary name, fsynced and renamed over the
+previous one, so a crash mid-write leaves the last complete snapshot.
+
+``Engine`` snapshots the position book, pending orders, account totals,
+FIX sequence numbers and each strategy's indicator state every
+``Settings.snapshot_interval`` seconds; see ``Trader.snapshot_state`` and
+``Trader.restore_snapshot``.
+"""
+from typing import Any, Optional, Tuple
+import atexit
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+MAGIC = b'FXSNAP'
+VERSION = 1
+# Outgoing MsgSeqNum is resumed this far past the snapshot's, since messages
+# sent after the snapshot was taken are not in it. The counterparty sees a
+# gap, asks for a resend and ``FixSession`` gap-fills it with one message.
+SEQ_NUM_HEADROOM = 10_000
+
+_HEADER = struct.Struct('<6sBd')  # magic, version, timestamp
+_CRC = struct.Struct('<I')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+_LEN = struct.Struct('<I')
+
+_NONE = b'N'
+_TRUE = b'T'
+_FALSE = b'F'
+_INT_TAG = b'i'
+_BIG_INT = b'I'
+_FLOAT_TAG = b'f'
+_STR = b's'
+_BYTES = b'b'
+_LIST = b'l'
+_TUPLE = b't'
+_DICT = b'd'
+
+
+class SnapshotError(ValueError):
+    """A snapshot file is truncated, corrupt or from an unknown version."""
+
+
+def _encode(value: Any, out: list) -> None:
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        if -2 ** 63 <= value < 2 ** 63:
+            out += (_INT_TAG, _INT.pack(value))
+        else:
+            data = str(value).encode('ascii')
+            out += (_BIG_INT, _LEN.pack(len(data)), data)
+    elif isinstance(value, float):
+        out += (_FLOAT_TAG, _FLOAT.pack(value))
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        out += (_STR, _LEN.pack(len(data)), data)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        out += (_BYTES, _LEN.pack(len(data)), data)
+    elif isinstance(value, dict):
+        out += (_DICT, _LEN.pack(len(value)))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Snapshot dict keys must be strings, not {type(key).__name__}.")
+            _encode(key, out)
+            _encode(item, out)
+    elif isinstance(value, (list, tuple)):
+        out += (_TUPLE if isinstance(value, tuple) else _LIST, _LEN.pack(len(value)))
+        for item in value:
+            _encode(item, out)
+    else:
+        raise TypeError(f"Cannot snapshot a {type(value).__name__}.")
+
+
+def _decode(data: bytes, pos: int) -> Tuple[Any, int]:
+    tag = data[pos:pos + 1]
+    pos += 1
+    if tag == _INT_TAG:
+        return _INT.unpack_from(data, pos)[0], pos + 8
+    if tag == _FLOAT_TAG:
+        return _FLOAT.unpack_from(data, pos)[0], pos + 8
+    if tag == _STR or tag == _BYTES or tag == _BIG_INT:
+        (size,) = _LEN.unpack_from(data, pos)
+        pos += 4
+        end = pos + size
+        if end > len(data):
+            raise SnapshotError("Snapshot is truncated.")
+        if tag == _STR:
+            return data[pos:end].decode('utf-8'), end
+        if tag == _BIG_INT:
+            return int(data[pos:end]), end
+        return data[pos:end], end
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _LIST or tag == _TUPLE:
+        (count,) = _LEN.unpack_from(data, pos)
+        pos += 4
+        items = []
+        for _ in range(count):
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return (tuple(items) if tag == _TUPLE else items), pos
+    if tag == _DICT:
+        (count,) = _LEN.unpack_from(data, pos)
+        pos += 4
+        result = {}
+        for _ in range(count):
+            key, pos = _decode(data, pos)
+            result[key], pos = _decode(data, pos)
+        return result, pos
+    raise SnapshotError(f"Unknown snapshot tag {tag!r} at offset {pos - 1}.")
+
+
+def encode(state: dict, timestamp: Optional[float] = None) -> bytes:
+    """One snapshot record: header, tagged body and CRC-32 of both."""
+    out = [_HEADER.pack(MAGIC, VERSION, time.time() if timestamp is None else timestamp)]
+    _encode(state, out)
+    data = b''.join(out)
+    return data + _CRC.pack(zlib.crc32(data))
+
+
+def decode(data: bytes) -> Tuple[float, dict]:
+    """Timestamp and state of a snapshot record; raises ``SnapshotError``."""
+    if len(data) < _HEADER.size + _CRC.size:
+        raise SnapshotError("Snapshot is truncated.")
+    body, (crc,) = data[:-_CRC.size], _CRC.unpack_from(data, len(data) - _CRC.size)
+    if zlib.crc32(body) != crc:
+        raise SnapshotError("Snapshot checksum does not match.")
+    magic, version, timestamp = _HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise SnapshotError("Not a snapshot file.")
+    if version != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}.")
+    try:
+        state, end = _decode(body, _HEADER.size)
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        raise SnapshotError(f"Snapshot is malformed: {e}") from None
+    if end != len(body) or not isinstance(state, dict):
+        raise SnapshotError("Snapshot is malformed.")
+    return timestamp, state
+
+
+def write_snapshot(path: str, state: dict, timestamp: Optional[float] = None) -> int:
+    """Atomically replace ``path`` with a snapshot of ``state``; returns its size."""
+    data = encode(state, timestamp)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(data)
+
+
+def read_snapshot(path: str) -> Optional[Tuple[float, dict]]:
+    """(timestamp, state) of the snapshot at ``path``, or None if there is none."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return decode(data)
+
+
+def snapshot_path(settings) -> Optional[str]:
+    """``Settings.snapshot_path`` with ``{account}`` expanded to the SenderCompID."""
+    path = getattr(settings, 'snapshot_path', '') or None
+    if path:
+        path = path.format(account=getattr(settings, 'fix_sender_comp_id', '') or 'default')
+    return path
+
+
+class SnapshotWriter:
+    """Writes the latest submitted state to ``path`` from a daemon thread.
+
+    ``submit`` never blocks: a state not yet written when the next one
+    arrives is simply replaced. Safe to call from any thread.
+    """
+
+    def __init__(self, path: str, name: str = ''):
+        self.path = path
+        self.name = name
+        self.written = 0
+        self.last_size = 0
+        # Seconds the last encode + write took, for status reports.
+        self.last_duration = 0.0
+        self._pending: Optional[Tuple[float, dict]] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"snapshot-{name or 'main'}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, state: dict, timestamp: Optional[float] = None) -> None:
+        """Queue ``state`` (which must no longer be mutated) for writing."""
+        if self._closed:
+            return
+        with self._lock:
+            self._pending = (time.time() if timestamp is None else timestamp, state)
+            self._idle.clear()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = self._pending, None
+            if pending is not None:
+                started = time.perf_counter()
+                try:
+                    self.last_size = write_snapshot(self.path, pending[1], pending[0])
+                    self.written += 1
+                except Exception as e:  # Keep snapshotting whatever one bad state did.
+                    print(f"Snapshot {self.path} write failed: {e}", file=sys.stderr)
+                self.last_duration = time.perf_counter() - started
+            with self._lock:
+                if self._pending is None:
+                    self._idle.set()
+                    if self._closed:
+                        return
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until the last submitted state is on disk."""
+        return self._idle.wait(timeout)
+
+    def close(self) -> None:
+        """Write the last submitted state and stop the writer thread."""
+        if self._closed:
+            return
+        with self._lock:
+            self._closed = True
+        self._wake.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(5.0)
+        atexit.unregister(self.close)
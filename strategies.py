@@ -1,60 +1,233 @@
 """AI trading strategies."""
 from abc import ABC, abstractmethod
-from typing import Any, Sequence
-from statistics import mean
+from array import array
+from collections import deque
+from typing import Any, Optional, Sequence
+
+from indicators import SMA
+
+# Relative tolerance under which two averages count as equal. Running sums
+# and exact means can disagree in the last bit, which must not flip a flat
+# market from 'hold' into 'buy' or 'sell'.
+SIGNAL_EPSILON = 1e-12
+
+# Decision codes returned by ``decide_many``; ``DECISIONS[code]`` is the
+# decision string (index -1 is 'sell').
+BUY = 1
+SELL = -1
+HOLD = 0
+DECISIONS = ('hold', 'buy', 'sell')
+_CODES = {'hold': HOLD, 'buy': BUY, 'sell': SELL}
+
 
 class Strategy(ABC):
     """Abstract base class for trading strategies."""
 
+    # Bar timeframe the strategy trades on ('1s', '1m', '5m' or '1h'). When
+    # set, streaming callers feed it bar closes rather than every tick, and
+    # ``decide`` receives bar closes as ``prices``. None means raw ticks.
+    timeframe: Optional[str] = None
+    # Most recent prices ``decide`` looks at; callers need not pass more.
+    history: int = 1000
+    # Prices seen by the default ``update``, created on its first call.
+    _prices: Optional[deque] = None
+
     @abstractmethod
     def decide(self, market_data: Any) -> str:
-        """Return 'buy', 'sell', or 'hold'."""
+        """Return 'buy', 'sell', or 'hold'.
+
+        ``market_data`` is a dict with ``prices`` (oldest first), ``bid``,
+        ``ask`` and ``book``: the symbol's live ``order_book.OrderBook`` when
+        market depth is subscribed, else None.
+        """
         pass
 
+    def decide_many(self, prices: Any) -> Any:
+        """Decisions for many price histories at once. Requires NumPy.
 
-def _sma(values: Sequence[float], window: int) -> float:
-    if len(values) < window:
-        return mean(values)
-    return mean(values[-window:])
+        ``prices`` is a 2-D array with one row per symbol, oldest price
+        first; shorter histories are padded with NaN on the left (see
+        ``MarketDataFeed.price_matrix``). Returns an ``int8`` array of
+        ``BUY``/``SELL``/``HOLD`` codes, one per row. This default calls
+        ``decide`` for each row; vectorized strategies override it.
+        """
+        import numpy as np
 
-class SafeStrategy(Strategy):
-    def decide(self, market_data: Any) -> str:
-        """Conservative strategy using a long-term moving average."""
-        prices = market_data.get('prices', []) if isinstance(market_data, dict) else []
-        if len(prices) < 2:
-            return 'hold'
-        short = _sma(prices, 20)
-        long = _sma(prices, 50)
-        if short > long:
-            return 'buy'
-        if short < long:
-            return 'sell'
+        matrix = _as_matrix(prices)
+        codes = np.zeros(matrix.shape[0], dtype=np.int8)
+        for i, row in enumerate(matrix):
+            codes[i] = _CODES.get(self.decide({'prices': row[~np.isnan(row)].tolist()}), HOLD)
+        return codes
+
+    def batch_key(self) -> Any:
+        """Instances with equal keys decide alike, so callers may evaluate
+        their symbols with one ``decide_many`` call. None opts out."""
+        return None
+
+    def update(self, price: float) -> str:
+        """Feed a single new price and return the decision for it.
+
+        This default keeps the last ``history`` prices and passes them to
+        ``decide``; stateful strategies override it to update their
+        indicators in O(1).
+        """
+        prices = self._prices
+        if prices is None:
+            prices = self._prices = deque(maxlen=self.history)
+        prices.append(price)
+        return self.decide({'prices': list(prices)})
+
+    def reset(self) -> None:
+        """Discard any incremental state."""
+        self._prices = None
+
+    def get_state(self) -> Any:
+        """Incremental state as plain values for ``snapshot``, or None if there is none."""
+        return array('d', self._prices).tobytes() if self._prices else None
+
+    def set_state(self, state: Any) -> None:
+        """Resume from ``get_state``'s result; raises ValueError if it does not fit."""
+        if state is None:
+            self._prices = None
+            return
+        if not isinstance(state, bytes) or len(state) % 8:
+            raise ValueError(f"{type(self).__name__} state must be packed prices.")
+        self._prices = deque(array('d', state), maxlen=self.history)
+
+
+def _signal(short: float, long: float) -> str:
+    if abs(short - long) <= SIGNAL_EPSILON * abs(long):
         return 'hold'
+    return 'buy' if short > long else 'sell'
 
-class ModerateStrategy(Strategy):
-    def decide(self, market_data: Any) -> str:
-        """Balanced strategy with shorter averages."""
-        prices = market_data.get('prices', []) if isinstance(market_data, dict) else []
-        if len(prices) < 2:
+
+def _as_matrix(prices: Any) -> Any:
+    import numpy as np
+
+    matrix = np.asarray(prices, dtype=np.float64)
+    if matrix.ndim != 2:
+        raise ValueError("decide_many expects a 2-D array of prices (symbols x history).")
+    return matrix
+
+
+def _crossover_means(prices: Sequence[float], short_window: int, long_window: int) -> tuple:
+    """Short and long trailing means computed in a single pass over the tail."""
+    n = len(prices)
+    long_n = min(n, long_window)
+    short_n = min(n, short_window)
+    short_sum = 0.0
+    long_sum = 0.0
+    # Walk backwards so the short window is a prefix of the long one.
+    for k in range(1, max(long_n, short_n) + 1):
+        p = prices[n - k]
+        if k <= long_n:
+            long_sum += p
+        if k <= short_n:
+            short_sum += p
+    return short_sum / short_n, long_sum / long_n
+
+
+class SMACrossoverStrategy(Strategy):
+    """Trend follower comparing a short and a long simple moving average.
+
+    Prices can be streamed through ``update`` (O(1) per tick, no history kept
+    beyond the two ring buffers) or passed as a full list to ``decide``.
+    The windows default to the class attributes and can be overridden per
+    instance, e.g. ``SMACrossoverStrategy(short_window=8, long_window=21)``.
+    """
+
+    short_window: int = 20
+    long_window: int = 50
+
+    def __init__(self, short_window: Optional[int] = None, long_window: Optional[int] = None):
+        if short_window is not None:
+            self.short_window = short_window
+        if long_window is not None:
+            self.long_window = long_window
+        for window in (self.short_window, self.long_window):
+            if not isinstance(window, int) or window <= 0:
+                raise ValueError("SMA windows must be positive integers.")
+        if self.short_window >= self.long_window:
+            raise ValueError("Short window must be smaller than the long window.")
+        self._short = SMA(self.short_window)
+        self._long = SMA(self.long_window)
+
+    def update(self, price: float) -> str:
+        short = self._short.update(price)
+        long = self._long.update(price)
+        if self._long.count < 2:
             return 'hold'
-        short = _sma(prices, 10)
-        long = _sma(prices, 30)
-        if short > long:
-            return 'buy'
-        if short < long:
-            return 'sell'
-        return 'hold'
+        return _signal(short, long)
+
+    @property
+    def history(self) -> int:
+        return self.long_window
+
+    def batch_key(self) -> Any:
+        return type(self), self.short_window, self.long_window, self.timeframe
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(short_window={self.short_window}, long_window={self.long_window})"
+
+    def reset(self) -> None:
+        self._short.reset()
+        self._long.reset()
+
+    def get_state(self) -> Any:
+        return self._short.get_state(), self._long.get_state()
+
+    def set_state(self, state: Any) -> None:
+        short, long = state
+        self._short.set_state(short)
+        self._long.set_state(long)
 
-class AggressiveStrategy(Strategy):
     def decide(self, market_data: Any) -> str:
-        """Aggressive strategy reacting quickly to price changes."""
         prices = market_data.get('prices', []) if isinstance(market_data, dict) else []
         if len(prices) < 2:
             return 'hold'
-        short = _sma(prices, 5)
-        long = _sma(prices, 15)
-        if short > long:
-            return 'buy'
-        if short < long:
-            return 'sell'
-        return 'hold'
+        short, long = _crossover_means(prices, self.short_window, self.long_window)
+        return _signal(short, long)
+
+    def decide_many(self, prices: Any) -> Any:
+        """Row ``i`` equals ``decide({'prices': row i without its NaN padding})``,
+        computed for all rows with a handful of array operations."""
+        import numpy as np
+
+        matrix = _as_matrix(prices)
+        tail = matrix[:, -self.long_window:]
+        present = ~np.isnan(tail)
+        filled = np.where(present, tail, 0.0)
+        long_n = np.count_nonzero(present, axis=1)
+        short_n = np.count_nonzero(present[:, -self.short_window:], axis=1)
+        # decide() holds with fewer than two prices.
+        enough = np.count_nonzero(present[:, -2:], axis=1) == 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            long = filled.sum(axis=1) / long_n
+            short = filled[:, -self.short_window:].sum(axis=1) / short_n
+        diff = short - long
+        tol = SIGNAL_EPSILON * np.abs(long)
+        codes = (diff > tol).view(np.int8) - (diff < -tol).view(np.int8)
+        codes[~enough] = HOLD
+        return codes
+
+
+class SafeStrategy(SMACrossoverStrategy):
+    """Conservative strategy using a long-term moving average of 1-minute closes."""
+
+    short_window = 20
+    long_window = 50
+    timeframe = '1m'
+
+
+class ModerateStrategy(SMACrossoverStrategy):
+    """Balanced strategy with shorter averages."""
+
+    short_window = 10
+    long_window = 30
+
+
+class AggressiveStrategy(SMACrossoverStrategy):
+    """Aggressive strategy reacting quickly to price changes."""
+
+    short_window = 5
+    long_window = 15
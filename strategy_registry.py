@@ -0,0 +1,372 @@
+"""Strategy plugin registry: discovery, lazy loading, per-symbol instances and hot reload.
+
+Strategies are found in three places, in this order of precedence:
+
+* the built-in ``strategies`` module,
+* ``*.py`` files in plugin directories (``strategy_plugins/`` next to this
+  module, plus ``Settings.strategy_dirs``),
+* the ``forex_scalper.strategies`` entry point group of installed packages,
+  each entry naming a ``module:Class``.
+
+Discovery parses source files with ``ast`` and reads entry point metadata
+without importing anything; a module is imported the first time one of its
+strategies is used. ``instance`` keeps one long-lived strategy object per
+symbol and strategy, so incremental state survives between decisions.
+``refresh`` re-imports modules whose files changed and swaps their
+instances for fresh ones, telling ``listeners`` so the owner can re-attach
+them to the feed; the trader and its FIX sessions are never touched. It
+only stats files and plugin directories: installed packages are scanned
+for entry points once, and again on ``discover(entry_points=True)``.
+"""
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import ast
+import importlib
+import importlib.util
+import os
+import sys
+
+from journal import Journal
+
+ENTRY_POINT_GROUP = 'forex_scalper.strategies'
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'strategy_plugins')
+BUILTIN_MODULE = 'strategies'
+# Plugin files are imported under this prefix so they cannot shadow real modules.
+_PLUGIN_PREFIX = '_strategy_plugin_'
+
+# A reload listener receives (symbol, name, old_instance, new_instance).
+ReloadCallback = Callable[[str, str, object, object], None]
+
+
+class _Source(NamedTuple):
+    module: str
+    attr: str
+    path: Optional[str]  # None for entry points not backed by a plugin file
+
+
+def _base_names(node: ast.ClassDef) -> List[str]:
+    names = []
+    for base in node.bases:
+        if isinstance(base, ast.Name):
+            names.append(base.id)
+        elif isinstance(base, ast.Attribute):
+            names.append(base.attr)
+    return names
+
+
+def _is_abstract(node: ast.ClassDef) -> bool:
+    for item in node.body:
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in item.decorator_list:
+                name = decorator.attr if isinstance(decorator, ast.Attribute) else getattr(decorator, 'id', '')
+                if name == 'abstractmethod':
+                    return True
+    return False
+
+
+def scan_strategy_classes(path: str, known: Iterable[str] = ('Strategy',)) -> List[str]:
+    """Names of the concrete strategy classes defined in ``path``, without importing it.
+
+    A class counts if one of its bases is in ``known`` or is an earlier
+    strategy class of the same file.
+    """
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    strategy_bases = set(known)
+    found = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and strategy_bases.intersection(_base_names(node)):
+            strategy_bases.add(node.name)
+            if not node.name.startswith('_') and not _is_abstract(node):
+                found.append(node.name)
+    return found
+
+
+def _entry_points(group: str) -> list:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # Python < 3.8
+        return []
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        return list(eps.select(group=group))
+    return list(eps.get(group, []))
+
+
+def _mtime(path: Optional[str]) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def warm_up(strategy, prices: Iterable[float]) -> None:
+    """Replay ``prices`` through ``strategy.update`` to rebuild its state."""
+    for price in prices:
+        strategy.update(price)
+
+
+class StrategyRegistry:
+    """Discovered strategy classes and their live per-symbol instances.
+
+    Use from one thread: the engine's event loop, or the Tk thread in the
+    GUI. Names are class names (``'SafeStrategy'``); ``'module:Class'``
+    specs are accepted too and resolved on demand.
+    """
+
+    def __init__(self, plugin_dirs: Iterable[str] = (), entry_point_group: Optional[str] = ENTRY_POINT_GROUP,
+                 journal: Optional[Journal] = None):
+        self._journal = journal
+        self.plugin_dirs = [PLUGIN_DIR] + [d for d in plugin_dirs if d]
+        self.entry_point_group = entry_point_group
+        self.listeners: List[ReloadCallback] = []
+        self._sources: Dict[str, _Source] = {}
+        self._classes: Dict[str, type] = {}
+        # Imported module name -> (file, mtime when imported)
+        self._loaded: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+        self._instances: Dict[Tuple[str, str], object] = {}
+        self._params: Dict[Tuple[str, str], dict] = {}
+        # path -> (mtime, class names), so rediscovery only parses changed files
+        self._scanned: Dict[str, Tuple[Optional[int], List[str]]] = {}
+        # directory -> (mtime, plugin file names), so rediscovery only lists changed directories
+        self._listed: Dict[str, Tuple[Optional[int], List[str]]] = {}
+        # (name, source) per entry point; reading package metadata takes milliseconds
+        self._entry_point_sources: Optional[List[Tuple[str, _Source]]] = None
+        self.discover()
+
+    @classmethod
+    def from_settings(cls, settings, journal: Optional[Journal] = None) -> 'StrategyRegistry':
+        return cls(getattr(settings, 'strategy_dirs', None) or (), journal=journal)
+
+    @property
+    def journal(self) -> Journal:
+        """Where load and reload problems are reported; usually the trader's journal."""
+        if self._journal is None:
+            self._journal = Journal(name='Strategies')
+        return self._journal
+
+    @journal.setter
+    def journal(self, journal: Journal) -> None:
+        self._journal = journal
+
+    # --- discovery ---------------------------------------------------------
+
+    def _scan(self, path: str, known: Iterable[str]) -> List[str]:
+        mtime = _mtime(path)
+        cached = self._scanned.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            names = scan_strategy_classes(path, known)
+        except (OSError, SyntaxError, ValueError) as e:
+            self.journal.warning('strategy_scan_failed', "Could not scan {path}: {error}", path=path, error=str(e))
+            # Keep what the file provided before, so a half-saved edit does not drop its strategies.
+            names = cached[1] if cached is not None else []
+        self._scanned[path] = (mtime, names)
+        return names
+
+    def _plugin_files(self, directory: str) -> List[str]:
+        mtime = _mtime(directory)
+        cached = self._listed.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            files = sorted(f for f in os.listdir(directory) if f.endswith('.py') and not f.startswith('_'))
+        except OSError:
+            files = []
+        self._listed[directory] = (mtime, files)
+        return files
+
+    def _scan_entry_points(self) -> List[Tuple[str, _Source]]:
+        sources = []
+        if self.entry_point_group:
+            for ep in _entry_points(self.entry_point_group):
+                module, _, attr = ep.value.partition(':')
+                sources.append((ep.name, _Source(module.strip(), attr.strip() or ep.name, None)))
+        return sources
+
+    def discover(self, entry_points: bool = False) -> List[str]:
+        """Rebuild the name table from all sources; returns the names.
+
+        Entry points are read on the first call and when ``entry_points``
+        is set (e.g. after installing a package); otherwise the last scan
+        is reused.
+        """
+        sources: Dict[str, _Source] = {}
+
+        def add(name: str, source: _Source) -> None:
+            if name in sources:
+                if sources[name] != source:
+                    self.journal.warning('strategy_shadowed', "Ignoring {module}:{attr}; '{name}' is already "
+                                         "provided by {provider}.", module=source.module, attr=source.attr,
+                                         name=name, provider=sources[name].module)
+                return
+            sources[name] = source
+
+        spec = importlib.util.find_spec(BUILTIN_MODULE)
+        if spec is not None and spec.origin:
+            for name in self._scan(spec.origin, ('Strategy',)):
+                add(name, _Source(BUILTIN_MODULE, name, spec.origin))
+        known = ['Strategy'] + list(sources)
+
+        for directory in self.plugin_dirs:
+            for filename in self._plugin_files(directory):
+                path = os.path.join(directory, filename)
+                module = _PLUGIN_PREFIX + filename[:-3]
+                for name in self._scan(path, known):
+                    add(name, _Source(module, name, path))
+
+        if entry_points or self._entry_point_sources is None:
+            self._entry_point_sources = self._scan_entry_points()
+        for name, source in self._entry_point_sources:
+            add(name, source)
+
+        # 'module:Class' specs resolved earlier stay resolvable.
+        for name, source in self._sources.items():
+            if ':' in name:
+                sources[name] = source
+        self._sources = sources
+        return self.names()
+
+    def names(self) -> List[str]:
+        return sorted(name for name in self._sources if ':' not in name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sources
+
+    # --- loading -----------------------------------------------------------
+
+    def _import(self, source: _Source):
+        module = sys.modules.get(source.module)
+        if module is None:
+            if source.module.startswith(_PLUGIN_PREFIX):
+                module = self._exec_plugin(source.module, source.path)
+            else:
+                module = importlib.import_module(source.module)
+        if source.module not in self._loaded:
+            path = source.path or getattr(module, '__file__', None)
+            self._loaded[source.module] = (path, _mtime(path))
+        return module
+
+    @staticmethod
+    def _exec_plugin(module_name: str, path: str):
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        previous = sys.modules.get(module_name)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            if previous is None:
+                del sys.modules[module_name]
+            else:
+                sys.modules[module_name] = previous
+            raise
+        return module
+
+    def _class_from(self, module, name: str, source: _Source) -> type:
+        cls = getattr(module, source.attr, None)
+        # Duck-typed: after a reload of ``strategies`` the Strategy base is a new class.
+        if not isinstance(cls, type) or not callable(getattr(cls, 'decide', None)):
+            raise ValueError(f"'{name}' ({source.module}:{source.attr}) is not a strategy class.")
+        return cls
+
+    def resolve(self, name: str) -> type:
+        """The class for ``name``, importing its module on first use."""
+        cls = self._classes.get(name)
+        if cls is not None:
+            return cls
+        source = self._sources.get(name)
+        if source is None:
+            module_name, _, attr = name.rpartition(':')
+            if not module_name:
+                raise ValueError(f"Unknown strategy '{name}'; available: {', '.join(self.names())}.")
+            source = _Source(module_name, attr, None)
+        module = self._import(source)
+        cls = self._class_from(module, name, source)
+        self._sources[name] = source
+        self._classes[name] = cls
+        return cls
+
+    def instance(self, symbol: str, name: str, **params):
+        """The long-lived ``name`` strategy for ``symbol``, created on first use.
+
+        ``params`` are passed to the constructor then and on every hot reload.
+        """
+        key = (symbol, name)
+        strategy = self._instances.get(key)
+        if strategy is None:
+            strategy = self.resolve(name)(**params)
+            self._instances[key] = strategy
+            self._params[key] = params
+        return strategy
+
+    def instances(self) -> Dict[Tuple[str, str], object]:
+        return dict(self._instances)
+
+    def discard(self, symbol: str, name: Optional[str] = None) -> None:
+        """Forget the instances of ``symbol`` (only ``name`` if given)."""
+        for key in [k for k in self._instances if k[0] == symbol and (name is None or k[1] == name)]:
+            del self._instances[key]
+            self._params.pop(key, None)
+
+    # --- hot reload --------------------------------------------------------
+
+    def changed_modules(self) -> List[str]:
+        """Imported strategy modules whose file changed since they were loaded."""
+        return [module for module, (path, mtime) in self._loaded.items()
+                if path is not None and _mtime(path) != mtime]
+
+    def refresh(self) -> List[Tuple[str, str]]:
+        """Pick up new plugin files and reload changed modules; returns replaced instances."""
+        replaced = self.reload(self.changed_modules())
+        self.discover()
+        return replaced
+
+    def reload(self, modules: Iterable[str]) -> List[Tuple[str, str]]:
+        """Re-import ``modules`` and replace the instances of their strategies.
+
+        A module that fails to import keeps its previous classes and
+        instances, so a half-saved plugin file cannot stop the engine.
+        """
+        replaced = []
+        for module_name in modules:
+            path, _ = self._loaded.get(module_name, (None, None))
+            try:
+                if module_name.startswith(_PLUGIN_PREFIX):
+                    module = self._exec_plugin(module_name, path)
+                else:
+                    module = importlib.reload(sys.modules[module_name])
+            except Exception as e:
+                self.journal.error('strategy_reload_failed', "Reloading {module} failed; keeping the loaded "
+                                   "version: {error}", module=module_name, error=str(e))
+                continue
+            finally:
+                # Mark as seen either way so a broken file is retried only once it changes again.
+                self._loaded[module_name] = (path, _mtime(path))
+            self.journal.info('strategy_module_reloaded', "Reloaded {module}.", module=module_name)
+            for name in [n for n, s in self._sources.items() if s.module == module_name and n in self._classes]:
+                try:
+                    self._classes[name] = self._class_from(module, name, self._sources[name])
+                except ValueError as e:
+                    self.journal.warning('strategy_reload_invalid', "{error} Keeping the previous version.",
+                                         error=str(e))
+                    continue
+                replaced.extend(self._replace_instances(name))
+        return replaced
+
+    def _replace_instances(self, name: str) -> List[Tuple[str, str]]:
+        cls = self._classes[name]
+        replaced = []
+        for key in [k for k in self._instances if k[1] == name]:
+            old = self._instances[key]
+            try:
+                new = cls(**self._params.get(key, {}))
+            except Exception as e:
+                self.journal.error('strategy_recreate_failed', "Could not recreate {name} for {symbol}: {error}",
+                                   name=name, symbol=key[0], error=str(e))
+                continue
+            self._instances[key] = new
+            replaced.append(key)
+            for listener in self.listeners:
+                listener(key[0], name, old, new)
+        return replaced
@@ -0,0 +1,378 @@
+"""Run many accounts across worker processes behind one market-data feed.
+
+The supervisor logs on one FIX QUOTE session (with the first account's
+credentials) and publishes every quote into a ``SharedQuoteRing``. Accounts
+from ``Settings.accounts`` are sharded round-robin over ``--processes``
+worker processes; each worker polls the ring into its own
+``MarketDataFeed`` and runs one headless ``Engine`` per account with its
+own TRADE session, so strategy evaluation and order handling for different
+accounts run on different cores instead of sharing one GIL. Workers send
+each account's connection state, exposure and PnL back over a queue, and
+the supervisor aggregates them::
+
+    python supervisor.py --processes 4 --symbols EURUSD GBPUSD:AggressiveStrategy
+
+A worker that dies is restarted; its accounts log on again.
+"""
+from functools import partial
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import multiprocessing
+import queue
+import signal
+import sys
+
+from engine import DEFAULT_RELOAD_INTERVAL, DEFAULT_STRATEGY, Engine, parse_symbols
+from fix_session import FixSession, FixSessionError
+from journal import Journal
+from market_data import FixQuoteSource, MarketDataFeed
+from scheduler import Scheduler, Timer
+from settings import Settings
+from shared_quotes import DEFAULT_RING_CAPACITY, SharedQuoteReader, SharedQuoteRing
+from trading import Trader
+
+# Seconds between worker polls of the quote ring.
+DEFAULT_POLL_INTERVAL = 0.002
+# Seconds between account reports from workers.
+REPORT_INTERVAL = 1.0
+# Seconds a worker gets to log out before it is terminated.
+STOP_TIMEOUT = 15.0
+
+
+def account_name(account: dict, index: int) -> str:
+    return account.get('name') or account.get('fix_sender_comp_id') or f"account{index + 1}"
+
+
+def shard(accounts: List[dict], processes: int) -> List[List[dict]]:
+    """Split ``accounts`` round-robin into at most ``processes`` non-empty groups."""
+    groups: List[List[dict]] = [[] for _ in range(max(1, min(processes, len(accounts))))]
+    for i, account in enumerate(accounts):
+        groups[i % len(groups)].append(account)
+    return groups
+
+
+def _account_report(name: str, engine: Engine) -> dict:
+    trader = engine.trader
+    if trader is None:
+        return {'account': name, 'connected': False, 'message': "Starting"}
+    pnl = trader.pnl
+    return {
+        'account': name,
+        'connected': trader.is_connected,
+        'message': trader.connection_message,
+        'balance': trader.risk.balance,
+        'unrealized': pnl.unrealized,
+        'equity': pnl.equity(),
+        'open_positions': trader.risk.open_positions,
+        'net_exposure': dict(trader.risk.net),
+        'pnl_by_symbol': pnl.by_symbol(),
+        'trades_opened': engine.trades_opened,
+    }
+
+
+async def _run_worker(worker_id: int, settings: Settings, accounts: List[dict], ring_name: str,
+                      reports, stop_event, options: dict) -> None:
+    loop = asyncio.get_running_loop()
+    ring = SharedQuoteRing.attach(ring_name)
+    reader = SharedQuoteReader(ring)
+    feed = MarketDataFeed()
+    engines: Dict[str, Engine] = {}
+    for account in accounts:
+        engines[account['name']] = Engine(
+            settings.for_account(account),
+            parse_symbols(account.get('symbols') or options['symbols'], options['strategy']),
+            volume=account.get('volume', options['volume']),
+            status_interval=None,
+            reload_interval=options['reload_interval'],
+            trader_factory=partial(Trader, quote_session=False),
+            feed=feed,
+        )
+
+    def report() -> None:
+        for name, engine in engines.items():
+            reports.put(('account', worker_id, _account_report(name, engine)))
+        reports.put(('worker', worker_id, {'dropped_quotes': reader.dropped, 'lag': reader.lag()}))
+
+    def check_stop() -> None:
+        if stop_event.is_set():
+            for engine in engines.values():
+                engine.stop()
+
+    scheduler = Scheduler(loop)
+    scheduler.call_every(options['poll_interval'], reader.poll, feed)
+    scheduler.call_every(options['report_interval'], report)
+    scheduler.call_every(0.1, check_stop)
+    try:
+        await asyncio.gather(*(engine.run() for engine in engines.values()))
+        # Accounts whose logon failed stay down (and reported) until the supervisor stops.
+        while not stop_event.is_set():
+            await asyncio.sleep(0.1)
+    finally:
+        scheduler.close()
+        ring.close()
+
+
+def worker_main(worker_id: int, settings: Settings, accounts: List[dict], ring_name: str,
+                reports, stop_event, options: dict) -> None:
+    """Entry point of a worker process."""
+    # Ctrl+C reaches the whole process group; the supervisor decides when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_run_worker(worker_id, settings, accounts, ring_name, reports, stop_event, options))
+
+
+class Supervisor:
+    """Owns the quote session, the shared ring and the worker processes."""
+
+    def __init__(self, settings: Settings, accounts: Optional[List[dict]] = None, processes: Optional[int] = None,
+                 symbols: Optional[List[str]] = None, strategy: str = DEFAULT_STRATEGY, volume: float = 0.01,
+                 ring_capacity: int = DEFAULT_RING_CAPACITY, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 status_interval: Optional[float] = 60.0,
+                 reload_interval: Optional[float] = DEFAULT_RELOAD_INTERVAL, journal: Optional[Journal] = None):
+        self.settings = settings
+        self.journal = journal or Journal.from_settings(settings, name='supervisor')
+        accounts = list(settings.accounts if accounts is None else accounts)
+        if not accounts:
+            raise ValueError("No accounts configured; add them to 'accounts' in config.json.")
+        self.accounts = [dict(account, name=account_name(account, i)) for i, account in enumerate(accounts)]
+        names = [account['name'] for account in self.accounts]
+        if len(set(names)) != len(names):
+            raise ValueError("Account names must be unique.")
+        self.symbols = list(symbols or [])
+        for account in self.accounts:
+            if not (account.get('symbols') or self.symbols):
+                raise ValueError(f"Account '{account['name']}' has no symbols and no default symbols were given.")
+        self.shards = shard(self.accounts, processes or multiprocessing.cpu_count())
+        self.ring_capacity = ring_capacity
+        self.status_interval = status_interval
+        self.options = {
+            'symbols': self.symbols,
+            'strategy': strategy,
+            'volume': volume,
+            'poll_interval': poll_interval,
+            'report_interval': REPORT_INTERVAL,
+            'reload_interval': reload_interval,
+        }
+        self._context = multiprocessing.get_context('spawn')
+        self.reports = self._context.Queue()
+        self._stop_workers = self._context.Event()
+        self.workers: List[Optional[multiprocessing.Process]] = [None] * len(self.shards)
+        self.restarts = 0
+        # Latest report per account and per worker
+        self.account_reports: Dict[str, dict] = {}
+        self.worker_reports: Dict[int, dict] = {}
+        self.ring: Optional[SharedQuoteRing] = None
+        self.feed = MarketDataFeed()
+        self.quote_source: Optional[FixQuoteSource] = None
+        self.scheduler: Optional[Scheduler] = None
+        self._timers: List[Timer] = []
+        self._quote_backoff = 1.0
+        self._stop: Optional[asyncio.Event] = None
+
+    def all_symbols(self) -> List[str]:
+        symbols = {symbol for symbol, _ in parse_symbols(self.symbols)}
+        for account in self.accounts:
+            symbols.update(symbol for symbol, _ in parse_symbols(account.get('symbols') or ()))
+        return sorted(symbols)
+
+    # --- workers -----------------------------------------------------------
+
+    def _start_worker(self, worker_id: int) -> None:
+        process = self._context.Process(
+            target=worker_main, name=f"scalper-worker-{worker_id}",
+            args=(worker_id, self.settings, self.shards[worker_id], self.ring.name, self.reports,
+                  self._stop_workers, self.options),
+        )
+        process.start()
+        self.workers[worker_id] = process
+        self.journal.info('worker_started', "Worker {worker} (pid {pid}): {accounts}", worker=worker_id,
+                          pid=process.pid, accounts=", ".join(account['name'] for account in self.shards[worker_id]))
+
+    def _check_workers(self) -> None:
+        for worker_id, process in enumerate(self.workers):
+            if process is not None and not process.is_alive() and not self._stop_workers.is_set():
+                self.journal.warning('worker_restarted', "Worker {worker} exited with code {exitcode}; restarting it.",
+                                     worker=worker_id, exitcode=process.exitcode)
+                self.restarts += 1
+                self._start_worker(worker_id)
+
+    def _drain_reports(self) -> None:
+        while True:
+            try:
+                kind, worker_id, report = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            if kind == 'account':
+                self.account_reports[report['account']] = report
+            else:
+                self.worker_reports[worker_id] = report
+
+    # --- quote session -----------------------------------------------------
+
+    async def _connect_quotes(self) -> bool:
+        settings = self.settings.for_account(self.accounts[0])
+        session = FixSession(
+            settings.fix_host, settings.fix_quote_port, settings.fix_sender_comp_id, settings.fix_target_comp_id,
+            sender_sub_id='QUOTE', password=settings.fix_password, scheduler=self.scheduler,
+        )
+        source = FixQuoteSource(self.feed, session)
+        try:
+            await source.start()
+        except (OSError, asyncio.TimeoutError, FixSessionError) as e:
+            self.journal.warning('quote_session_failed', "Quote session failed: {reason}",
+                                 reason=str(e) or type(e).__name__)
+            source.detach()
+            return False
+        session.on_disconnect.append(self._on_quotes_closed)
+        self.quote_source = source
+        self._quote_backoff = 1.0
+        self.journal.info('quotes_streaming', "Streaming {symbols} symbols to {workers} workers.",
+                          symbols=len(self.ring.symbols), workers=len(self.workers))
+        return True
+
+    def _on_quotes_closed(self, reason: str) -> None:
+        self.journal.warning('quote_session_closed', "Quote session closed: {reason}", reason=reason)
+        if self.quote_source is not None:
+            self.quote_source.detach()
+            self.quote_source = None
+        self._schedule_quote_reconnect()
+
+    def _schedule_quote_reconnect(self) -> None:
+        if self._stop is not None and not self._stop.is_set():
+            self._timers.append(self.scheduler.call_later(self._quote_backoff, self._reconnect_quotes))
+
+    def _reconnect_quotes(self) -> None:
+        async def reconnect() -> None:
+            if not await self._connect_quotes():
+                self._quote_backoff = min(self._quote_backoff * 2, 30.0)
+                self._schedule_quote_reconnect()
+        asyncio.ensure_future(reconnect())
+
+    # --- aggregation -------------------------------------------------------
+
+    def aggregate(self) -> dict:
+        """Totals over the latest report of every account."""
+        totals = {'accounts': len(self.accounts), 'connected': 0, 'balance': 0.0, 'unrealized': 0.0,
+                  'equity': 0.0, 'open_positions': 0, 'trades_opened': 0}
+        net: Dict[str, float] = {}
+        pnl: Dict[str, float] = {}
+        for report in self.account_reports.values():
+            totals['connected'] += bool(report.get('connected'))
+            for key in ('balance', 'unrealized', 'equity', 'open_positions', 'trades_opened'):
+                totals[key] += report.get(key, 0)
+            for symbol, lots in report.get('net_exposure', {}).items():
+                net[symbol] = net.get(symbol, 0.0) + lots
+            for symbol, value in report.get('pnl_by_symbol', {}).items():
+                pnl[symbol] = pnl.get(symbol, 0.0) + value
+        totals['net_exposure'] = net
+        totals['pnl_by_symbol'] = pnl
+        totals['quotes_published'] = self.ring.published() if self.ring is not None else 0
+        totals['quotes_dropped'] = sum(r.get('dropped_quotes', 0) for r in self.worker_reports.values())
+        return totals
+
+    def _report_status(self) -> None:
+        t = self.aggregate()
+        self.journal.info('status', "{connected}/{accounts} accounts connected; equity {equity:.2f} "
+                          "(unrealized {unrealized:+.2f}), {open_positions} open positions, "
+                          "{quotes_published} quotes ({quotes_dropped} dropped by workers)", **t)
+
+    def _poll(self) -> None:
+        self._drain_reports()
+        self._check_workers()
+
+    # --- lifecycle ---------------------------------------------------------
+
+    async def run(self) -> bool:
+        """Start everything and run until ``stop``. Returns False if quotes never connected."""
+        self._stop = asyncio.Event()
+        self.scheduler = Scheduler(asyncio.get_running_loop())
+        self.ring = SharedQuoteRing.create(self.all_symbols(), self.ring_capacity)
+        try:
+            for symbol in self.ring.symbols:
+                self.feed.subscribe(symbol, self.ring.write)
+            if not await self._connect_quotes():
+                return False
+            for worker_id in range(len(self.shards)):
+                self._start_worker(worker_id)
+            self._timers.append(self.scheduler.call_every(0.2, self._poll))
+            if self.status_interval:
+                self._timers.append(self.scheduler.call_every(self.status_interval, self._report_status))
+            await self._stop.wait()
+        finally:
+            await self.shutdown()
+        return True
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+
+    async def shutdown(self) -> None:
+        for timer in self._timers:
+            timer.cancel()
+        self._timers = []
+        self._stop_workers.set()
+        loop = asyncio.get_running_loop()
+        for process in self.workers:
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, STOP_TIMEOUT)
+            if process.is_alive():
+                self.journal.warning('worker_terminated', "Worker pid {pid} did not stop; terminating it.",
+                                     pid=process.pid)
+                process.terminate()
+                process.join()
+        self.workers = [None] * len(self.shards)
+        self._drain_reports()
+        if self.account_reports:
+            self._report_status()
+        if self.quote_source is not None:
+            self.quote_source.session.on_disconnect.clear()
+            await self.quote_source.stop()
+            self.quote_source = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+        if self.scheduler is not None:
+            self.scheduler.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run every configured account across worker processes.")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--symbols', nargs='*', default=[],
+                        help="SYMBOL or SYMBOL:Strategy for accounts that list no symbols")
+    parser.add_argument('--strategy', default=DEFAULT_STRATEGY, help="strategy for symbols that name none")
+    parser.add_argument('--volume', type=float, default=0.01, help="lots per trade for accounts that set none")
+    parser.add_argument('--status-interval', type=float, default=60.0, help="seconds between status lines (0 = off)")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="seconds between worker polls of the shared quote ring")
+    args = parser.parse_args(argv)
+
+    try:
+        supervisor = Supervisor(Settings.load(), processes=args.processes, symbols=args.symbols,
+                                strategy=args.strategy, volume=args.volume, poll_interval=args.poll_interval,
+                                status_interval=args.status_interval)
+    except ValueError as e:
+        parser.error(str(e))
+
+    async def _run() -> bool:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, supervisor.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        return await supervisor.run()
+
+    try:
+        ok = asyncio.run(_run())
+    except KeyboardInterrupt:
+        ok = True
+    finally:
+        supervisor.journal.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
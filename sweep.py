@@ -0,0 +1,108 @@
+"""Parallel parameter sweeps of the SMA crossover strategy.
+
+Each symbol's price series is copied once into a ``multiprocessing``
+shared-memory block; worker processes attach to it by name, so tasks only
+carry a few integers instead of a pickled copy of the prices. Requires NumPy.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+import os
+
+import numpy as np
+
+from backtest import run_backtest
+
+# Shared-memory blocks a worker process has already attached to, by name.
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def window_grid(short_windows: Iterable[int], long_windows: Iterable[int]) -> List[tuple]:
+    """All (short, long) pairs with short < long."""
+    return [(s, l) for s, l in product(short_windows, long_windows) if s < l]
+
+
+def _attach(name: str, length: int) -> np.ndarray:
+    shm = _attached.get(name)
+    if shm is None:
+        # Workers share the parent's resource tracker, which unlinks the
+        # block once when the parent is done with it.
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+    return np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+
+
+def _run_task(task: tuple) -> dict:
+    symbol, shm_name, length, short_window, long_window, options = task
+    prices = _attach(shm_name, length)
+    result = run_backtest(prices, (short_window, long_window), **options)
+    row = {'symbol': symbol, 'short_window': short_window, 'long_window': long_window}
+    row.update(result.summary())
+    return row
+
+
+def run_sweep(
+    series: Mapping[str, Sequence[float]],
+    grid: Sequence[tuple],
+    rank_by: str = 'net_pnl',
+    max_workers: Optional[int] = None,
+    **backtest_options,
+) -> List[dict]:
+    """Backtest every (symbol, window pair) combination across CPU cores.
+
+    ``series`` maps symbols to price arrays and ``grid`` holds (short, long)
+    window pairs, e.g. from ``window_grid``. Extra keyword arguments are
+    passed to ``backtest.run_backtest``. Returns one summary row per
+    combination, best first by ``rank_by``.
+    """
+    if not grid:
+        raise ValueError("Window grid must not be empty.")
+    blocks = []
+    try:
+        tasks = []
+        for symbol, prices in series.items():
+            prices = np.ascontiguousarray(prices, dtype=np.float64)
+            shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+            blocks.append(shm)
+            np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+            for short_window, long_window in grid:
+                tasks.append((symbol, shm.name, prices.shape[0], short_window, long_window, backtest_options))
+
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(_run_task, tasks, chunksize=chunksize))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    rows.sort(key=lambda row: row[rank_by], reverse=True)
+    return rows
+
+
+def format_table(rows: Sequence[dict], limit: Optional[int] = 20) -> str:
+    """Render sweep results as a fixed-width text table."""
+    header = f"{'rank':>4}  {'symbol':<8} {'short':>5} {'long':>5} {'trades':>7} {'net_pnl':>12} {'win%':>6} {'max_dd':>10}"
+    lines = [header, '-' * len(header)]
+    for rank, row in enumerate(rows[:limit] if limit else rows, start=1):
+        lines.append(
+            f"{rank:>4}  {row['symbol']:<8} {row['short_window']:>5} {row['long_window']:>5} "
+            f"{row['trades']:>7} {row['net_pnl']:>12.2f} {row['win_rate'] * 100:>6.1f} {row['max_drawdown']:>10.2f}"
+        )
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    from backtest import random_walk
+
+    data = {symbol: random_walk(1_000_000, seed=seed) for seed, symbol in enumerate(('EURUSD', 'GBPUSD', 'USDJPY'))}
+    results = run_sweep(
+        data,
+        window_grid(range(5, 30, 5), range(15, 120, 15)),
+        stop_loss=0.0010,
+        take_profit=0.0015,
+        spread=0.00002,
+    )
+    print(format_table(results))
@@ -0,0 +1,114 @@
+"""Framing and templated encoding of the FIX codec."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fix_codec import Encoder, FixCodecError, FrameReader, MessageTemplate, encode_message
+
+HEADER = [(49, 'test.1'), (56, 'cServer'), (50, 'TRADE'), (57, 'TRADE')]
+TIME = b'20240101-12:00:00.000'
+ORIG_TIME = b'20240101-11:59:59.500'
+
+
+def frame(seq, text='x'):
+    return encode_message('0', HEADER + [(34, seq), (52, TIME)], [(112, text)])
+
+
+class FrameReaderTest(unittest.TestCase):
+
+    def read(self, reader):
+        return [(message.get_int(34), message.get(112)) for message in reader]
+
+    def test_frame_split_across_feeds(self):
+        data = frame(1, 'split')
+        reader = FrameReader()
+        # Cut inside the prefix, inside BodyLength, in the body and in the trailer.
+        cuts = [0, 5, 13, 40, len(data) - 3, len(data)]
+        for start, end in zip(cuts, cuts[1:-1]):
+            reader.feed(data[start:end])
+            self.assertEqual(self.read(reader), [])
+        reader.feed(data[cuts[-2]:])
+        self.assertEqual(self.read(reader), [(1, 'split')])
+
+    def test_several_frames_in_one_chunk(self):
+        reader = FrameReader()
+        data = frame(1) + frame(2, 'two') + frame(3)
+        reader.feed(data + frame(4)[:20])
+        self.assertEqual(self.read(reader), [(1, 'x'), (2, 'two'), (3, 'x')])
+        reader.feed(frame(4)[20:])
+        (message,) = list(reader)
+        self.assertEqual(message.raw(), frame(4))
+
+    def test_buffer_grows_and_compacts(self):
+        reader = FrameReader(capacity=64)
+        sent = []
+        for seq in range(1, 20):
+            chunk = frame(seq, 'y' * seq)
+            sent.append((seq, 'y' * seq))
+            view = reader.get_buffer(len(chunk))
+            view[:len(chunk)] = chunk
+            reader.buffer_updated(len(chunk))
+        self.assertEqual(self.read(reader), sent)
+
+    def test_bad_checksum(self):
+        data = bytearray(frame(1))
+        data[-2] = ord('0') + (data[-2] - ord('0') + 1) % 10
+        reader = FrameReader()
+        reader.feed(bytes(data))
+        with self.assertRaisesRegex(FixCodecError, 'CheckSum'):
+            reader.next_frame()
+        lenient = FrameReader(validate_checksum=False)
+        lenient.feed(bytes(data))
+        self.assertEqual(self.read(lenient), [(1, 'x')])
+
+    def test_bad_body_length(self):
+        data = frame(1)
+        length = data.split(b'\x01')[1]
+        for wrong in (b'9=%d' % (int(length[2:]) - 1), b'9=1x'):
+            reader = FrameReader()
+            reader.feed(data.replace(length, wrong, 1))
+            with self.assertRaises(FixCodecError):
+                reader.next_frame()
+
+    def test_garbled_start(self):
+        reader = FrameReader()
+        reader.feed(b'junk' + frame(1))
+        with self.assertRaisesRegex(FixCodecError, 'Garbled'):
+            reader.next_frame()
+
+
+class EncoderTest(unittest.TestCase):
+
+    def test_template_matches_generic_encoder(self):
+        template = MessageTemplate('D', HEADER, (11, 55, 54))
+        body = [(11, 'CL1'), (55, '1'), (54, '2')]
+        extra = [(38, '1000'), (40, '1')]
+        self.assertEqual(template.encode(7, TIME, [value for _, value in body], extra),
+                         encode_message('D', HEADER + [(34, 7), (52, TIME)], body + extra))
+
+    def test_poss_dup_carries_orig_sending_time(self):
+        template = MessageTemplate('4', HEADER, ())
+        body = [(123, 'Y'), (36, '9')]
+        self.assertEqual(template.encode(3, TIME, (), body, poss_dup=True, orig_sending_time=ORIG_TIME),
+                         encode_message('4', HEADER + [(34, 3), (52, TIME), (43, 'Y'), (122, ORIG_TIME)], body))
+        self.assertEqual(template.encode(3, TIME, (), body, poss_dup=True),
+                         encode_message('4', HEADER + [(34, 3), (52, TIME), (43, 'Y'), (122, TIME)], body))
+
+    def test_encoder_paths(self):
+        encoder = Encoder(HEADER)
+        encoder.timestamp = lambda now=None: TIME
+        self.assertEqual(encoder.new_order_single(5, 'CL5', '1', '1', '1000', price='1.1', position_id='P1'),
+                         encode_message('D', HEADER + [(34, 5), (52, TIME)], [
+                             (11, 'CL5'), (55, '1'), (54, '1'), (60, TIME), (38, '1000'), (40, '2'),
+                             (44, '1.1'), (721, 'P1')]))
+        self.assertEqual(encoder.encode('1', 6, [(112, 'PING')], poss_dup=True),
+                         encode_message('1', HEADER + [(34, 6), (52, TIME), (43, 'Y'), (122, TIME)],
+                                        [(112, 'PING')]))
+        self.assertIs(encoder.template('D', Encoder.NEW_ORDER_SINGLE_TAGS),
+                      encoder.template('D', Encoder.NEW_ORDER_SINGLE_TAGS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+"""FixSession and Trader against the loopback acceptor."""
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fix_acceptor import LoopbackAcceptor, _Connection
+from fix_session import (
+    HEARTBEAT, NEW_ORDER_SINGLE, REJECT, RESEND_REQUEST, SEQUENCE_RESET, TEST_REQUEST, FixSession,
+    FixSessionError,
+)
+from journal import OFF, Journal
+from latency import DECISION_TO_SEND
+from market_data import MarketDataFeed
+from settings import Settings
+from trading import Trader
+
+
+class _SessionRejecting(_Connection):
+    """Rejects XAUUSD orders with a session-level Reject instead of a report."""
+
+    def execute(self, fields):
+        if fields.get(55) == 'XAUUSD':
+            self.send(REJECT, [(45, fields[34]), (371, '55'), (372, NEW_ORDER_SINGLE), (373, '5'),
+                               (58, 'Value is incorrect for this tag')])
+        else:
+            super().execute(fields)
+
+
+class FixSessionTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.acceptor = LoopbackAcceptor(prices={'EURUSD': 1.1}, reject_symbols={'XAUUSD'})
+        self.port = await self.acceptor.start()
+        self.session = FixSession('127.0.0.1', self.port, 'test.1', 'cServer', heartbeat_interval=1)
+        await self.session.logon(timeout=2)
+
+    async def asyncTearDown(self):
+        if self.session.logged_on:
+            await self.session.logout()
+        await self.acceptor.stop()
+
+    def sent(self, msg_type):
+        return [fields for fields in self.acceptor.received if fields.get(35) == msg_type]
+
+    async def test_logon_and_heartbeat(self):
+        self.assertTrue(self.session.logged_on)
+        await asyncio.sleep(1.2)
+        self.assertTrue(self.sent(HEARTBEAT))
+
+    async def test_test_request_is_answered(self):
+        self.acceptor.broadcast(lambda c: c.send(TEST_REQUEST, [(112, 'PING')]))
+        await asyncio.sleep(0.05)
+        self.assertEqual([fields.get(112) for fields in self.sent(HEARTBEAT)], ['PING'])
+
+    async def test_fill(self):
+        report = await asyncio.wait_for(self.session.submit_order('EURUSD', 'buy', 1000), 2)
+        self.assertEqual(report.exec_type, '0')
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.sent(NEW_ORDER_SINGLE)[0].get(54), '1')
+
+    async def test_reject(self):
+        reports = []
+        self.session.on_execution_report.append(reports.append)
+        report = await asyncio.wait_for(self.session.submit_order('XAUUSD', 'sell', 1000), 2)
+        self.assertTrue(report.rejected)
+        self.assertEqual(report.text, 'Symbol not tradable')
+        self.assertEqual(len(reports), 1)
+
+    async def test_session_level_reject(self):
+        self.acceptor.connection_class = _SessionRejecting
+        session = FixSession('127.0.0.1', self.port, 'test.2', 'cServer')
+        await session.logon(timeout=2)
+        try:
+            filled, rejected = session.submit_orders([('EURUSD', 'buy', 1000, None, None, None),
+                                                      ('XAUUSD', 'buy', 1000, None, None, None)])
+            with self.assertRaisesRegex(FixSessionError, 'Value is incorrect'):
+                await asyncio.wait_for(rejected, 2)
+            self.assertEqual((await asyncio.wait_for(filled, 2)).symbol, 'EURUSD')
+            self.assertTrue(session.logged_on)
+        finally:
+            await session.logout()
+
+    async def test_resend_request_is_gap_filled(self):
+        self.acceptor.broadcast(lambda c: c.send(RESEND_REQUEST, [(7, '1'), (16, '0')]))
+        await asyncio.sleep(0.05)
+        (reset,) = self.sent(SEQUENCE_RESET)
+        self.assertEqual(reset.get(34), '1')
+        self.assertEqual(reset.get(123), 'Y')
+        self.assertEqual(reset.get(43), 'Y')
+        self.assertEqual(reset.get(122), reset.get(52))
+        self.assertEqual(reset.get(36), str(self.session.next_out_seq))
+
+    async def test_callback_error_keeps_session(self):
+        errors = []
+
+        def broken(report):
+            raise ValueError("broken subscriber")
+
+        self.session.on_execution_report.append(broken)
+        self.session.on_callback_error = lambda exc, callback: errors.append(exc)
+        await asyncio.wait_for(self.session.submit_order('EURUSD', 'buy', 1000), 2)
+        await asyncio.sleep(0.05)
+        self.assertTrue(self.session.logged_on)
+        self.assertTrue(errors)
+        await asyncio.wait_for(self.session.submit_order('EURUSD', 'sell', 1000), 2)
+
+
+class TraderTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.acceptor = LoopbackAcceptor(prices={'EURUSD': 1.1})
+        port = await self.acceptor.start()
+        settings = Settings(fix_host='127.0.0.1', fix_port=port, fix_quote_port=port,
+                            fix_sender_comp_id='test.1', fix_password='secret')
+        self.feed = MarketDataFeed()
+        self.trader = Trader(settings, loop=asyncio.get_running_loop(), market_data=self.feed, quote_session=False,
+                             journal=Journal(echo_level=OFF))
+        self.assertTrue(await self.trader.connect_async())
+
+    async def asyncTearDown(self):
+        await self.trader.disconnect_async()
+        self.trader.journal.close()
+        await self.acceptor.stop()
+
+    async def wait_for_status(self, trade, status):
+        for _ in range(100):
+            if trade.status == status:
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"{trade.id} never became {status}")
+
+    def orders(self):
+        return [fields for fields in self.acceptor.received if fields.get(35) == NEW_ORDER_SINGLE]
+
+    async def test_pending_trade_is_not_closed(self):
+        trade_id = self.trader.open_trade('EURUSD', 0.01, 'buy')
+        trade = self.trader.get_trade(trade_id)
+        self.assertFalse(self.trader.close_trade(trade_id))
+        await self.wait_for_status(trade, 'open')
+        self.assertEqual(trade.entry_price, 1.1)
+        orders = self.orders()
+        self.assertEqual([fields.get(54) for fields in orders], ['1'])
+
+        self.assertTrue(self.trader.close_trade(trade_id))
+        await self.wait_for_status(trade, 'closed')
+        orders = self.orders()
+        self.assertEqual(orders[-1].get(54), '2')
+        self.assertEqual(orders[-1].get(721), trade.position_id)
+
+    async def test_decision_stamp_goes_to_opening_order(self):
+        trade = self.trader.get_trade(self.trader.open_trade('EURUSD', 0.01, 'buy'))
+        await self.wait_for_status(trade, 'open')
+        latency = self.trader.latency
+        latency.quote('EURUSD')
+        latency.decision('EURUSD', 'Flip')
+        # What Engine._on_decision does on a reversal; both orders are sent
+        # before this coroutine yields to the execution reports.
+        self.trader.close_all('EURUSD')
+        reversed_trade = self.trader.get_trade(self.trader.open_trade('EURUSD', 0.01, 'sell'))
+        stamps = {cl_ord_id: (strategy, decided) for cl_ord_id, (_, strategy, _, decided, _, _)
+                  in latency._pending.items()}
+        self.assertEqual(stamps.pop(reversed_trade.cl_ord_id)[0], 'Flip')
+        self.assertEqual(list(stamps.values()), [(None, 0)])
+        await self.wait_for_status(reversed_trade, 'open')
+        self.assertEqual(latency.histogram(DECISION_TO_SEND, 'strategy', 'Flip').count, 1)
+
+    async def test_stop_loss_closes_long(self):
+        trade_id = self.trader.open_trade('EURUSD', 0.01, 'buy', stop_loss=1.09, take_profit=1.12)
+        trade = self.trader.get_trade(trade_id)
+        await self.wait_for_status(trade, 'open')
+        self.feed.on_quote('EURUSD', 1.0, 1.0901, 1.0903)
+        self.assertEqual(trade.status, 'open')
+        self.feed.on_quote('EURUSD', 2.0, 1.0899, 1.0901)
+        self.assertEqual(trade.status, 'closing')
+        await self.wait_for_status(trade, 'closed')
+        close = self.orders()[-1]
+        self.assertEqual((close.get(54), close.get(721)), ('2', trade.position_id))
+        self.feed.on_quote('EURUSD', 3.0, 1.08, 1.0802)
+        self.assertEqual(len(self.orders()), 2)
+
+    async def test_take_profit_closes_short(self):
+        trade = self.trader.get_trade(self.trader.open_trade('EURUSD', 0.01, 'sell', take_profit=1.05))
+        await self.wait_for_status(trade, 'open')
+        self.feed.on_quote('EURUSD', 1.0, 1.0498, 1.0501)
+        self.assertEqual(trade.status, 'open')
+        self.feed.on_quote('EURUSD', 2.0, 1.0497, 1.05)
+        await self.wait_for_status(trade, 'closed')
+        self.assertEqual(self.orders()[-1].get(54), '1')
+
+    async def test_start_heartbeat_accepts_deprecated_interval(self):
+        max_backoff = self.trader.max_backoff
+        self.trader.start_heartbeat(30.0)
+        self.trader.start_heartbeat(interval=30.0)
+        self.trader.stop_heartbeat()
+        self.assertEqual(self.trader.max_backoff, max_backoff)
+        self.assertTrue(self.trader.session.logged_on)
+
+    async def test_levels_need_a_feed(self):
+        trader = Trader(self.trader.settings, loop=asyncio.get_running_loop(), quote_session=False,
+                        journal=Journal(echo_level=OFF))
+        with self.assertRaises(ValueError):
+            trader.open_trade('EURUSD', 0.01, 'buy', stop_loss=1.09)
+        trader.journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Rebuilding open trades from the audit journal."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import OFF, Journal, read_journal, replay_trades
+
+
+class ReplayTradesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'journal.jsonl')
+        self.journal = Journal(self.path, level='INFO', echo_level=OFF)
+
+    def submit(self, trade_id, symbol='EURUSD', direction='buy'):
+        self.journal.audit('order_submitted', trade_id=trade_id, cl_ord_id=f"C{trade_id}", symbol=symbol,
+                           volume=0.1, direction=direction, stop_loss=None, take_profit=1.2)
+
+    def write(self, torn=''):
+        self.journal.close()
+        if torn:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(torn)
+
+    def test_event_fold(self):
+        audit = self.journal.audit
+        for trade_id in ('T000001', 'T000002', 'T000003', 'T000004', 'T000005', 'T000007'):
+            self.submit(trade_id)
+        for trade_id in ('T000001', 'T000002', 'T000003', 'T000004'):
+            audit('order_filled', trade_id=trade_id, price=1.1, position_id=f"P{trade_id}")
+        audit('order_closing', trade_id='T000002', cl_ord_id='X2')   # still closing
+        audit('order_closing', trade_id='T000003', cl_ord_id='X3')
+        audit('close_failed', trade_id='T000003', cl_ord_id='X3')    # back to open
+        audit('order_closing', trade_id='T000004', cl_ord_id='X4')
+        audit('position_closed', trade_id='T000004', price=1.2, pnl=1000.0)
+        audit('order_rejected', trade_id='T000005', cl_ord_id='CT000005', reason='no')
+        audit('order_filled', trade_id='T000099', price=1.0)          # never submitted: ignored
+        self.journal.info('order_filled', trade_id='T000007', price=1.0)  # not an audit record
+        self.write(torn='{"ts": 1.0, "level": "AUDIT", "event": "position_closed", "trade_id": "T0000')
+
+        trades, last = replay_trades(self.path)
+        by_id = {trade['id']: trade for trade in trades}
+        self.assertEqual(sorted(by_id), ['T000001', 'T000002', 'T000003', 'T000007'])
+        self.assertEqual(last, 7)
+        self.assertEqual({trade_id: (t['status'], t['cl_ord_id']) for trade_id, t in by_id.items()}, {
+            'T000001': ('open', None),
+            'T000002': ('closing', 'X2'),
+            'T000003': ('open', None),
+            'T000007': ('pending', 'CT000007'),
+        })
+        self.assertEqual((by_id['T000001']['entry_price'], by_id['T000001']['position_id'],
+                          by_id['T000001']['take_profit']), (1.1, 'PT000001', 1.2))
+
+    def test_since_applies_later_events_to_open_trades(self):
+        self.submit('T000001')
+        self.journal.audit('order_filled', trade_id='T000001', price=1.1, position_id='P1')
+        self.assertTrue(self.journal.flush())
+        since = max(record['ts'] for record in read_journal(self.path))
+        snapshot = [{'id': 'T000001', 'symbol': 'EURUSD', 'volume': 0.1, 'direction': 'buy', 'stop_loss': None,
+                     'take_profit': None, 'status': 'open', 'position_id': 'P1', 'entry_price': 1.1,
+                     'cl_ord_id': None}]
+        self.journal.audit('order_closing', trade_id='T000001', cl_ord_id='X1')
+        self.submit('T000002', direction='sell')
+        self.write()
+
+        trades, last = replay_trades(self.path, since, snapshot)
+        self.assertEqual(last, 2)
+        self.assertEqual([(t['id'], t['status']) for t in trades], [('T000001', 'closing'), ('T000002', 'pending')])
+
+    def test_missing_journal(self):
+        self.write()
+        self.assertEqual(replay_trades(os.path.join(self.directory.name, 'none.jsonl')), ([], 0))
+        self.assertEqual(replay_trades(None, 0.0, [{'id': 'T000010'}]), ([{'id': 'T000010'}], 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
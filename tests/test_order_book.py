@@ -0,0 +1,129 @@
+"""Order book levels and the FIX market data that maintains them."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fix_codec import FixMessage, encode_message
+from order_book import ASK, BID, OrderBook, apply_incremental, apply_snapshot
+
+HEADER = [(49, 'cServer'), (56, 'test.1'), (34, 2), (52, '20240101-12:00:00.000')]
+
+
+def message(msg_type, body):
+    return FixMessage(encode_message(msg_type, HEADER, body))
+
+
+class Books(dict):
+    """``BookSource`` that creates books on first use."""
+
+    def __call__(self, symbol):
+        book = self.get(symbol)
+        if book is None:
+            book = self[symbol] = OrderBook(symbol)
+        return book
+
+
+class OrderBookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.book = OrderBook('EURUSD')
+        for entry_id, side, price, size in [('b1', BID, 1.0999, 1e6), ('b2', BID, 1.0999, 2e6),
+                                            ('b3', BID, 1.0998, 5e6), ('a1', ASK, 1.1001, 1e6),
+                                            ('a2', ASK, 1.1002, 3e6)]:
+            self.book.add(entry_id, side, price, size)
+
+    def test_entries_aggregate_into_levels(self):
+        book = self.book
+        self.assertEqual(book.bids(), [(1.0999, 3e6), (1.0998, 5e6)])
+        self.assertEqual(book.asks(), [(1.1001, 1e6), (1.1002, 3e6)])
+        self.assertEqual((book.best_bid, book.bid_size, book.best_ask, book.ask_size), (1.0999, 3e6, 1.1001, 1e6))
+
+    def test_removing_one_entry_keeps_the_level(self):
+        book = self.book
+        version = book.version
+        self.assertTrue(book.remove('b1'))
+        self.assertEqual(book.bids(1), [(1.0999, 2e6)])
+        self.assertTrue(book.remove('b2'))
+        self.assertEqual(book.bids(), [(1.0998, 5e6)])
+        self.assertFalse(book.remove('b2'))
+        self.assertEqual(book.version, version + 2)
+
+    def test_replacing_an_entry_moves_its_size(self):
+        self.book.add('a1', ASK, 1.1002, 1e6)
+        self.assertEqual(self.book.asks(), [(1.1002, 4e6)])
+
+    def test_add_size_and_set_level(self):
+        book = self.book
+        book.add_size(ASK, 1.1003, 2e6)
+        book.add_size(ASK, 1.1003, 1e6)
+        self.assertEqual(book.asks(), [(1.1001, 1e6), (1.1002, 3e6), (1.1003, 3e6)])
+        book.add_size(ASK, 1.1003, -3e6)
+        book.set_level(BID, 1.0998, 0.0)
+        self.assertEqual((book.levels(BID), book.levels(ASK)), (1, 2))
+
+    def test_fill_price(self):
+        book = self.book
+        self.assertAlmostEqual(book.fill_price(ASK, 3e6), (1e6 * 1.1001 + 2e6 * 1.1002) / 3e6)
+        self.assertAlmostEqual(book.fill_price(BID, 4e6), (3e6 * 1.0999 + 1e6 * 1.0998) / 4e6)
+        self.assertAlmostEqual(book.fill_price(ASK, 1e6), 1.1001)
+        self.assertIsNone(book.fill_price(ASK, 5e6))
+
+    def test_weighted_mid(self):
+        # The touch sizes are 3M bid and 1M ask, so the price leans to the ask.
+        self.assertAlmostEqual(self.book.weighted_mid(), (1.0999 * 1e6 + 1.1001 * 3e6) / 4e6)
+        self.assertAlmostEqual(self.book.mid(), 1.1)
+        self.assertIsNone(OrderBook().weighted_mid())
+
+
+class MarketDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.books = Books()
+
+    def test_snapshot_replaces_the_book(self):
+        self.books('EURUSD').add('stale', BID, 1.05, 1e6)
+        book = apply_snapshot(self.books, message('W', [
+            (55, 'EURUSD'), (268, 4),
+            (269, '0'), (270, '1.0999'), (271, '1000000'),
+            (269, '0'), (270, '1.0999'), (271, '500000'),
+            (269, '1'), (270, '1.1001'), (271, '2000000'), (278, 'a1'),
+            (269, '1'), (270, '1.1002'), (271, '1000000'),
+        ]))
+        self.assertIs(book, self.books['EURUSD'])
+        self.assertEqual(book.bids(), [(1.0999, 1.5e6)])
+        self.assertEqual(book.asks(), [(1.1001, 2e6), (1.1002, 1e6)])
+
+    def test_incremental_delete_by_entry_id_and_by_price(self):
+        book = self.books('EURUSD')
+        book.add(b'a1', ASK, 1.1001, 1e6)
+        book.add(b'a2', ASK, 1.1001, 2e6)
+        book.set_level(BID, 1.0999, 4e6)
+        book.set_level(BID, 1.0998, 1e6)
+        touched = apply_incremental(self.books, message('X', [
+            (268, 2),
+            (279, '2'), (269, '1'), (278, 'a1'), (55, 'EURUSD'),
+            (279, '2'), (269, '0'), (270, '1.0999'), (55, 'EURUSD'),
+        ]))
+        self.assertEqual(touched, [book])
+        self.assertEqual(book.asks(), [(1.1001, 2e6)])
+        self.assertEqual(book.bids(), [(1.0998, 1e6)])
+
+    def test_incremental_switches_books_by_symbol(self):
+        eurusd, gbpusd = self.books('EURUSD'), self.books('GBPUSD')
+        eurusd.add(b'e1', BID, 1.0999, 1e6)
+        touched = apply_incremental(self.books, message('X', [
+            (268, 4),
+            (279, '0'), (269, '1'), (278, 'e2'), (55, 'EURUSD'), (270, '1.1001'), (271, '1000000'),
+            (279, '0'), (269, '0'), (278, 'g1'), (55, 'GBPUSD'), (270, '1.2999'), (271, '2000000'),
+            (279, '1'), (269, '1'), (55, 'GBPUSD'), (270, '1.3001'), (271, '3000000'),
+            (279, '2'), (269, '0'), (278, 'e1'), (55, 'EURUSD'),
+        ]))
+        self.assertEqual(touched, [eurusd, gbpusd])
+        self.assertEqual((eurusd.bids(), eurusd.asks()), ([], [(1.1001, 1e6)]))
+        self.assertEqual((gbpusd.bids(), gbpusd.asks()), ([(1.2999, 2e6)], [(1.3001, 3e6)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
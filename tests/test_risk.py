@@ -0,0 +1,124 @@
+"""Pre-trade limits and running totals of the risk engine."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from risk import LOT_SIZE, RiskEngine, RiskLimits, RiskRejected, quote_rate
+
+NO_LIMITS = dict(max_order_volume=None, max_symbol_exposure=None, max_gross_exposure=None,
+                 max_open_positions=None, max_margin_usage=None, max_daily_loss=None)
+
+
+def engine(prices=None, balance=10_000.0, account_currency='USD', **limits):
+    return RiskEngine(RiskLimits(**dict(NO_LIMITS, **limits)), balance=balance,
+                      price_source=(prices or {'EURUSD': 1.1}).get, account_currency=account_currency)
+
+
+class LimitTest(unittest.TestCase):
+
+    def assertRejected(self, risk, *order):
+        with self.assertRaises(RiskRejected):
+            risk.admit('T2', *order)
+        self.assertEqual(risk.rejections, 1)
+        self.assertNotIn('T2', risk._reserved)
+
+    def test_order_volume(self):
+        self.assertRejected(engine(max_order_volume=1.0), 'EURUSD', 1.5, 'buy')
+
+    def test_open_positions(self):
+        risk = engine(max_open_positions=1)
+        risk.admit('T1', 'EURUSD', 0.1, 'buy')
+        self.assertRejected(risk, 'EURUSD', 0.1, 'buy')
+
+    def test_symbol_exposure_is_net(self):
+        risk = engine(max_symbol_exposure=1.0)
+        risk.admit('T1', 'EURUSD', 1.0, 'buy')
+        risk.admit('T3', 'EURUSD', 1.0, 'sell')  # reduces the net position
+        risk.admit('T4', 'EURUSD', 1.0, 'buy')
+        self.assertRejected(risk, 'EURUSD', 0.5, 'buy')
+
+    def test_gross_exposure(self):
+        risk = engine(max_gross_exposure=1.0)
+        risk.admit('T1', 'EURUSD', 0.6, 'buy')
+        self.assertRejected(risk, 'EURUSD', 0.6, 'sell')
+
+    def test_margin_usage(self):
+        # 1 lot of EURUSD at 1.1 and 30:1 is 3666.67 USD of margin.
+        risk = engine(max_margin_usage=0.5)
+        risk.admit('T1', 'EURUSD', 1.0, 'buy')
+        self.assertAlmostEqual(risk.margin_used, LOT_SIZE * 1.1 / 30)
+        self.assertRejected(risk, 'EURUSD', 0.5, 'buy')
+
+    def test_daily_loss(self):
+        risk = engine(max_daily_loss=100.0)
+        risk.admit('T1', 'EURUSD', 1.0, 'buy')
+        risk.on_close('T1', -100.0)
+        self.assertRejected(risk, 'EURUSD', 0.1, 'buy')
+
+
+class CounterTest(unittest.TestCase):
+
+    def assertFlat(self, risk):
+        self.assertEqual((risk.net, risk.gross, risk.margin_used, risk.open_positions), ({}, 0.0, 0.0, 0))
+
+    def test_release_on_reject(self):
+        risk = engine()
+        risk.admit('T1', 'EURUSD', 0.3, 'sell')
+        self.assertEqual((risk.net, risk.open_positions), ({'EURUSD': -0.3}, 1))
+        risk.release('T1')
+        self.assertFlat(risk)
+        risk.release('T1')  # a second report for the same order is harmless
+        self.assertFlat(risk)
+
+    def test_open_close_returns_to_zero(self):
+        risk = engine({'EURUSD': 1.1, 'GBPUSD': 1.3})
+        for i, (symbol, volume, direction) in enumerate([('EURUSD', 0.1, 'buy'), ('EURUSD', 0.2, 'sell'),
+                                                         ('GBPUSD', 0.7, 'buy')]):
+            risk.admit(f"T{i}", symbol, volume, direction)
+            risk.on_fill(f"T{i}", 1.2)
+        self.assertAlmostEqual(risk.gross, 1.0)
+        pnl = RiskEngine.realized_pnl('buy', 0.1, 1.1, 1.1010)
+        self.assertAlmostEqual(pnl, 10.0)
+        for i in range(3):
+            risk.on_close(f"T{i}", pnl)
+        self.assertFlat(risk)
+        self.assertAlmostEqual(risk.balance, 10_030.0)
+        self.assertAlmostEqual(risk.daily_realized, 30.0)
+
+
+class ConversionTest(unittest.TestCase):
+
+    def test_quote_rate(self):
+        prices = {'USDJPY': 150.0, 'GBPUSD': 1.25}.get
+        self.assertEqual(quote_rate('EURUSD', 'USD', prices), 1.0)
+        self.assertAlmostEqual(quote_rate('EURJPY', 'USD', prices), 1 / 150.0)
+        self.assertAlmostEqual(quote_rate('EURGBP', 'USD', prices), 1.25)
+        self.assertIsNone(quote_rate('EURCHF', 'USD', prices))
+        self.assertEqual(quote_rate('XAU', 'USD', prices), 1.0)
+
+    def test_cross_margin_and_pnl_in_account_currency(self):
+        # EURJPY in a USD account: JPY amounts are converted at 1/USDJPY.
+        risk = engine({'EURJPY': 160.0, 'USDJPY': 150.0})
+        risk.admit('T1', 'EURJPY', 1.0, 'buy')
+        self.assertAlmostEqual(risk.margin_used, LOT_SIZE * 160.0 / 150.0 / 30)
+        realized = RiskEngine.realized_pnl('buy', 1.0, 160.0, 161.5)
+        self.assertAlmostEqual(realized, 150_000.0)
+        self.assertAlmostEqual(risk.to_account('EURJPY', realized), 1000.0)
+
+    def test_account_currency_as_base(self):
+        # GBPUSD in a EUR account needs EURUSD: 1 USD is 1/1.1 EUR.
+        risk = engine({'GBPUSD': 1.25, 'EURUSD': 1.1}, account_currency='EUR')
+        self.assertAlmostEqual(risk.to_account('GBPUSD', 110.0), 100.0)
+        risk.admit('T1', 'GBPUSD', 1.0, 'buy')
+        self.assertAlmostEqual(risk.margin_used, LOT_SIZE * 1.25 / 1.1 / 30)
+
+    def test_margin_check_skipped_without_rate(self):
+        risk = engine({'EURCHF': 0.95}, max_margin_usage=0.01)
+        risk.admit('T1', 'EURCHF', 1.0, 'buy')
+        self.assertEqual(risk.margin_used, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
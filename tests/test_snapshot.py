@@ -0,0 +1,169 @@
+"""Snapshot codec and the Trader warm restart."""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fix_acceptor import LoopbackAcceptor, _Connection
+from journal import OFF, Journal
+from settings import Settings
+from snapshot import (
+    _CRC, SEQ_NUM_HEADROOM, SnapshotError, decode, encode, read_snapshot, write_snapshot,
+)
+from trading import Trader
+
+STATE = {
+    'none': None,
+    'flags': [True, False],
+    'ints': (0, -1, 2 ** 63 - 1, -2 ** 63),
+    'big': [2 ** 64, -2 ** 80],
+    'float': -1.25e-300,
+    'text': 'EUR€',
+    'bytes': b'\x00\xff' * 3,
+    'nested': {'list': [], 'tuple': (), 'dict': {'a': [(1, 'b', None)]}},
+}
+
+
+def _rewrite_header(data: bytes, offset: int, value: int) -> bytes:
+    """``data`` with one header byte replaced and a matching checksum."""
+    body = bytearray(data[:-_CRC.size])
+    body[offset] = value
+    return bytes(body) + _CRC.pack(zlib.crc32(body))
+
+
+class CodecTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        data = encode(STATE, timestamp=1234.5)
+        self.assertEqual(decode(data), (1234.5, STATE))
+        self.assertIsInstance(decode(data)[1]['ints'], tuple)
+
+    def test_bytearray_and_memoryview_decode_as_bytes(self):
+        _, state = decode(encode({'a': bytearray(b'xy'), 'b': memoryview(b'z')}))
+        self.assertEqual(state, {'a': b'xy', 'b': b'z'})
+
+    def test_unsupported_values(self):
+        with self.assertRaises(TypeError):
+            encode({'set': {1}})
+        with self.assertRaises(TypeError):
+            encode({1: 'key is not a string'})
+
+    def test_corruption(self):
+        data = bytearray(encode(STATE))
+        data[len(data) // 2] ^= 0x01
+        with self.assertRaisesRegex(SnapshotError, 'checksum'):
+            decode(bytes(data))
+
+    def test_truncation(self):
+        data = encode(STATE)
+        for size in (0, 10, len(data) - 1):
+            with self.assertRaises(SnapshotError):
+                decode(data[:size])
+
+    def test_malformed_body_with_valid_checksum(self):
+        body = encode(STATE)[:-_CRC.size]
+        for cut in (len(body) - 1, 20):
+            truncated = body[:cut]
+            with self.assertRaises(SnapshotError):
+                decode(truncated + _CRC.pack(zlib.crc32(truncated)))
+
+    def test_version_and_magic(self):
+        data = encode(STATE)
+        with self.assertRaisesRegex(SnapshotError, 'version'):
+            decode(_rewrite_header(data, 6, 99))
+        with self.assertRaisesRegex(SnapshotError, 'Not a snapshot'):
+            decode(_rewrite_header(data, 0, ord('X')))
+
+    def test_file_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sub', 'state.snap')
+            self.assertIsNone(read_snapshot(path))
+            write_snapshot(path, {'n': 1}, timestamp=1.0)
+            write_snapshot(path, STATE, timestamp=2.0)
+            self.assertEqual(read_snapshot(path), (2.0, STATE))
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['state.snap'])
+
+
+class _Silent(_Connection):
+    """Never answers GBPUSD orders, so they stay pending."""
+
+    def execute(self, fields):
+        if fields.get(55) != 'GBPUSD':
+            super().execute(fields)
+
+
+class WarmRestartTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.directory.name, 'journal.jsonl')
+        self.acceptor = LoopbackAcceptor(prices={'EURUSD': 1.1, 'GBPUSD': 1.3})
+        self.acceptor.connection_class = _Silent
+        port = await self.acceptor.start()
+        self.settings = Settings(fix_host='127.0.0.1', fix_port=port, fix_quote_port=port,
+                                 fix_sender_comp_id='test.1', fix_password='secret')
+        self.trader = Trader(self.settings, loop=asyncio.get_running_loop(), quote_session=False,
+                             journal=Journal(self.journal_path, level='AUDIT', echo_level=OFF))
+        self.assertTrue(await self.trader.connect_async())
+
+    async def asyncTearDown(self):
+        await self.trader.disconnect_async()
+        self.trader.journal.close()
+        await self.acceptor.stop()
+        self.directory.cleanup()
+
+    async def wait_for_status(self, trade, status):
+        for _ in range(100):
+            if trade.status == status:
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"{trade.id} never became {status}")
+
+    async def test_snapshot_then_journal_replay(self):
+        trader = self.trader
+        kept = trader.get_trade(trader.open_trade('EURUSD', 0.01, 'buy'))
+        closed = trader.get_trade(trader.open_trade('EURUSD', 0.02, 'sell'))
+        await self.wait_for_status(closed, 'open')
+        pending = trader.get_trade(trader.open_trade('GBPUSD', 0.01, 'buy'))
+        await asyncio.sleep(0.05)
+
+        timestamp = time.time()
+        state = decode(encode(trader.snapshot_state(), timestamp))[1]
+        next_out, next_in = trader.session.next_out_seq, trader.session.next_in_seq
+
+        # After the snapshot: one position closes at a profit, another opens.
+        self.acceptor.prices['EURUSD'] = 1.099
+        self.assertTrue(trader.close_trade(closed.id))
+        await self.wait_for_status(closed, 'closed')
+        later = trader.get_trade(trader.open_trade('EURUSD', 0.03, 'buy'))
+        await self.wait_for_status(later, 'open')
+        self.assertTrue(trader.journal.flush())
+
+        restarted = Trader(self.settings, quote_session=False, journal=Journal(echo_level=OFF))
+        self.addCleanup(restarted.journal.close)
+        self.assertEqual(restarted.restore_snapshot(timestamp, state, path=self.journal_path), 3)
+
+        self.assertEqual(sorted(t['id'] for t in restarted.get_open_trades()), [kept.id, pending.id, later.id])
+        self.assertIsNone(restarted.get_trade(closed.id))
+        restored = restarted.get_trade(kept.id)
+        self.assertEqual((restored.status, restored.entry_price, restored.position_id),
+                         ('open', 1.1, kept.position_id))
+        self.assertEqual(restarted.get_trade(later.id).entry_price, 1.099)
+        # The unanswered order still awaits its execution report.
+        waiting = restarted.get_trade(pending.id)
+        self.assertEqual(waiting.status, 'pending')
+        self.assertIs(restarted._orders[pending.cl_ord_id], waiting)
+
+        self.assertEqual(restarted._resume_seq_nums, {'TRADE': (next_out + SEQ_NUM_HEADROOM, next_in)})
+        self.assertEqual(restarted._trade_counter, trader._trade_counter)
+        self.assertAlmostEqual(restarted.risk.balance, 10_000.0 + 2.0)
+        self.assertEqual(restarted.risk.open_positions, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,401 @@
+"""On-disk tick store: one fixed-width binary file per symbol per UTC day.
+
+Layout under the store root::
+
+    EURUSD/2024-03-01.ticks   32-byte header, then (time, bid, ask) records
+    EURUSD/2024-03-01.idx     1440 uint32: first record of each minute
+
+Records are three little-endian float64s (time in epoch seconds), so a file
+maps straight onto a NumPy structured array and each column is a view with
+no parsing. ``TickWriter`` appends from a ``MarketDataFeed`` through
+per-symbol buffers; readers ``mmap`` the files. The writer needs only the
+standard library; the readers require NumPy.
+"""
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b'FXTK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHi16s4x')  # magic, version, record size, day number, symbol
+HEADER_SIZE = HEADER.size
+RECORD_SIZE = 24
+MINUTES_PER_DAY = 1440
+SECONDS_PER_DAY = 86400
+DEFAULT_FLUSH_EVERY = 4096
+
+_EPOCH = date(1970, 1, 1)
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+DayLike = Union[date, str]
+
+
+def _day_number(day: DayLike) -> int:
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return (day - _EPOCH).days
+
+
+def _day_name(day_number: int) -> str:
+    return (_EPOCH + timedelta(days=day_number)).isoformat()
+
+
+def tick_path(root: str, symbol: str, day: DayLike) -> str:
+    return os.path.join(root, symbol, f"{_day_name(_day_number(day))}.ticks")
+
+
+def _index_path(path: str) -> str:
+    return path[:-len('.ticks')] + '.idx'
+
+
+class _DayFile:
+    """Append state for one symbol's file for one day."""
+
+    __slots__ = ('path', 'file', 'day', 'day_start', 'count', 'pending', 'index', 'last_minute', 'minute_end')
+
+    def __init__(self, root: str, symbol: str, day: int):
+        self.path = tick_path(root, symbol, _EPOCH + timedelta(days=day))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'ab')
+        size = self.file.tell()
+        if size < HEADER_SIZE:
+            self.file.truncate(0)
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, day, symbol.encode()[:16]))
+            size = HEADER_SIZE
+        # Drop a torn record left by a crash so appends stay aligned.
+        whole = (size - HEADER_SIZE) // RECORD_SIZE
+        if HEADER_SIZE + whole * RECORD_SIZE != size:
+            self.file.truncate(HEADER_SIZE + whole * RECORD_SIZE)
+            self.file.seek(0, os.SEEK_END)
+        self.day = day
+        self.day_start = day * SECONDS_PER_DAY
+        self.count = whole
+        self.pending = array('d')
+        self.index = array('I', [whole]) * MINUTES_PER_DAY
+        self.last_minute = -1
+        if whole:
+            self._load_index()
+        self.minute_end = self.day_start + 60 * (self.last_minute + 1)
+
+    def _load_index(self) -> None:
+        index = array('I')
+        try:
+            with open(_index_path(self.path), 'rb') as f:
+                index.frombytes(f.read())
+        except OSError:
+            pass
+        if len(index) != MINUTES_PER_DAY:
+            self._rebuild_index()
+            return
+        if _BIG_ENDIAN:
+            index.byteswap()
+        # Minutes already present keep their offsets; the rest start at the
+        # current end of file.
+        self.last_minute = max((m for m in range(MINUTES_PER_DAY) if index[m] < self.count), default=-1)
+        self.index = index
+
+    def _rebuild_index(self) -> None:
+        records = array('d')
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER_SIZE)
+            records.frombytes(f.read(self.count * RECORD_SIZE))
+        if _BIG_ENDIAN:
+            records.byteswap()
+        self.count = 0
+        self.last_minute = -1
+        for i in range(0, len(records), 3):
+            self.start_minute(records[i])
+            self.pending.extend(records[i:i + 3])
+        self.count = len(self.pending) // 3
+        del self.pending[:]
+
+    def start_minute(self, timestamp: float) -> None:
+        """Index the next record as the first of ``timestamp``'s minute."""
+        minute = min(int((timestamp - self.day_start) // 60), MINUTES_PER_DAY - 1)
+        if minute > self.last_minute:
+            position = self.count + len(self.pending) // 3
+            index = self.index
+            for m in range(self.last_minute + 1, minute + 1):
+                index[m] = position
+            self.last_minute = minute
+            self.minute_end = self.day_start + 60 * (minute + 1)
+
+    def write_pending(self) -> None:
+        pending = self.pending
+        if pending:
+            if _BIG_ENDIAN:
+                pending.byteswap()
+            self.file.write(pending.tobytes())
+            self.count += len(pending) // 3
+            del pending[:]
+
+    def flush(self) -> None:
+        self.write_pending()
+        self.file.flush()
+        # Minutes after the last tick point at the end of the file.
+        index = self.index
+        for m in range(self.last_minute + 1, MINUTES_PER_DAY):
+            index[m] = self.count
+        data = array('I', index)
+        if _BIG_ENDIAN:
+            data.byteswap()
+        tmp = _index_path(self.path) + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data.tobytes())
+        os.replace(tmp, _index_path(self.path))
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+class TickWriter:
+    """Buffered appender of quotes to the store.
+
+    ``on_quote`` matches the feed's subscriber signature; ``attach`` records
+    every symbol a ``MarketDataFeed`` tracks, including ones added later.
+    Each symbol's ticks are buffered and written once ``flush_every`` are
+    pending; ``flush``/``close`` (and a UTC day rollover) also rewrite the
+    time index, so call ``flush`` periodically while recording.
+    """
+
+    def __init__(self, root: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        self.root = root
+        self.flush_every = flush_every
+        self._files: Dict[str, _DayFile] = {}
+        self.written = 0
+
+    def attach(self, feed) -> None:
+        for symbol in feed.symbols:
+            feed.subscribe(symbol, self.on_quote)
+        feed.on_new_symbol.append(lambda symbol: feed.subscribe(symbol, self.on_quote))
+
+    def on_quote(self, symbol: str, timestamp: float, bid: float, ask: float) -> None:
+        day_file = self._files.get(symbol)
+        if day_file is None or timestamp >= day_file.minute_end:
+            day_file = self._roll(symbol, day_file, timestamp)
+            if day_file is None:
+                return
+        pending = day_file.pending
+        pending.extend((timestamp, bid, ask))
+        self.written += 1
+        if len(pending) >= 3 * self.flush_every:
+            day_file.write_pending()
+
+    def _roll(self, symbol: str, day_file: Optional[_DayFile], timestamp: float) -> Optional[_DayFile]:
+        """Move to ``timestamp``'s minute, opening a new day file if needed."""
+        day = int(timestamp // SECONDS_PER_DAY)
+        if day_file is None or day_file.day != day:
+            if day_file is not None:
+                if day < day_file.day:
+                    return None  # late tick for a closed day; files stay time-ordered
+                day_file.close()
+            day_file = self._files[symbol] = _DayFile(self.root, symbol, day)
+        day_file.start_minute(timestamp)
+        return day_file
+
+    def flush(self) -> None:
+        for day_file in self._files.values():
+            day_file.flush()
+
+    def close(self) -> None:
+        for day_file in self._files.values():
+            day_file.close()
+        self._files.clear()
+
+    def __enter__(self) -> 'TickWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# -- reading -----------------------------------------------------------------
+
+def _dtype():
+    import numpy as np
+    return np.dtype([('time', '<f8'), ('bid', '<f8'), ('ask', '<f8')])
+
+
+class TickFile:
+    """Memory-mapped, read-only view of one day's ticks.
+
+    ``ticks`` is a structured array over the mapping (fields ``time``,
+    ``bid``, ``ask``); nothing is copied until a column is converted.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise ValueError(f"{path} is not a tick file (short header).")
+            magic, version, record_size, self.day, symbol = HEADER.unpack(header)
+            if magic != MAGIC or record_size != RECORD_SIZE:
+                raise ValueError(f"{path} is not a version {VERSION} tick file.")
+            self.symbol = symbol.rstrip(b'\0').decode()
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        count = (len(self._mmap) - HEADER_SIZE) // RECORD_SIZE
+        self.ticks = np.frombuffer(self._mmap, dtype=_dtype(), count=count, offset=HEADER_SIZE)
+        self.index: Optional[np.ndarray] = None
+        try:
+            index = np.fromfile(_index_path(path), dtype='<u4')
+            if index.shape[0] == MINUTES_PER_DAY:
+                self.index = np.minimum(index, count)
+        except OSError:
+            pass
+
+    def __len__(self) -> int:
+        return self.ticks.shape[0]
+
+    @property
+    def times(self):
+        return self.ticks['time']
+
+    @property
+    def bids(self):
+        return self.ticks['bid']
+
+    @property
+    def asks(self):
+        return self.ticks['ask']
+
+    def _position(self, timestamp: float) -> int:
+        """Index of the first tick at or after ``timestamp``."""
+        import numpy as np
+
+        times = self.ticks['time']
+        lo, hi = 0, times.shape[0]
+        if self.index is not None:
+            minute = int((timestamp - self.day * SECONDS_PER_DAY) // 60)
+            if minute < 0:
+                return 0
+            if minute >= MINUTES_PER_DAY:
+                return hi
+            index = self.index
+            lo = int(index[minute])
+            # Entries past the last indexed tick all equal index[-1]; ticks
+            # appended since the index was written lie beyond it.
+            if minute + 1 < MINUTES_PER_DAY and index[minute + 1] < index[-1]:
+                hi = int(index[minute + 1])
+        return lo + int(np.searchsorted(times[lo:hi], timestamp, side='left'))
+
+    def between(self, start: Optional[float] = None, end: Optional[float] = None):
+        """Ticks with ``start <= time < end`` (a view)."""
+        lo = 0 if start is None else self._position(start)
+        hi = len(self) if end is None else self._position(end)
+        return self.ticks[lo:max(lo, hi)]
+
+    def close(self) -> None:
+        self.ticks = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # arrays from between() still use the mapping; it closes with them
+
+    def __enter__(self) -> 'TickFile':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def available_days(root: str, symbol: str) -> List[str]:
+    directory = os.path.join(root, symbol)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-len('.ticks')] for name in os.listdir(directory) if name.endswith('.ticks'))
+
+
+def _to_epoch(value: Union[float, datetime, date, str, None]) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def open_days(root: str, symbol: str, start=None, end=None) -> Iterator[TickFile]:
+    """Map each day file of ``symbol`` overlapping ``[start, end)`` in order."""
+    start, end = _to_epoch(start), _to_epoch(end)
+    for name in available_days(root, symbol):
+        day_start = _day_number(name) * SECONDS_PER_DAY
+        if (end is not None and day_start >= end) or (start is not None and day_start + SECONDS_PER_DAY <= start):
+            continue
+        yield TickFile(os.path.join(root, symbol, f"{name}.ticks"))
+
+
+def load_ticks(root: str, symbol: str, start=None, end=None):
+    """All ticks of ``symbol`` in ``[start, end)`` as one structured array.
+
+    A single day is returned as a view of its mapping; ranges spanning days
+    are concatenated into one copy. ``start``/``end`` take epoch seconds,
+    ``datetime``/``date`` objects or ISO strings (UTC when naive).
+    """
+    import numpy as np
+
+    start, end = _to_epoch(start), _to_epoch(end)
+    parts = [day.between(start, end) for day in open_days(root, symbol, start, end)]
+    if not parts:
+        return np.empty(0, dtype=_dtype())
+    if len(parts) == 1:
+        return parts[0]
+    return np.concatenate(parts)
+
+
+def load_mids(root: str, symbol: str, start=None, end=None):
+    """Mid prices of ``symbol`` in ``[start, end)``, ready for ``run_backtest``."""
+    ticks = load_ticks(root, symbol, start, end)
+    return (ticks['bid'] + ticks['ask']) * 0.5
+
+
+def iter_ticks(root: str, symbol: str, start=None, end=None) -> Iterator[Tuple[str, float, float, float]]:
+    """(symbol, time, bid, ask) tuples for ``market_data.replay``."""
+    for day in open_days(root, symbol, start, end):
+        ticks = day.between(_to_epoch(start), _to_epoch(end))
+        for timestamp, bid, ask in zip(ticks['time'].tolist(), ticks['bid'].tolist(), ticks['ask'].tolist()):
+            yield symbol, timestamp, bid, ask
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    import numpy as np
+
+    from backtest import random_walk, run_backtest
+    from strategies import SafeStrategy
+
+    # One month of EURUSD at ~2 ticks/second.
+    days, per_day = 30, 172_800
+    n = days * per_day
+    mids = random_walk(n, seed=7)
+    times = (_day_number('2024-03-01') * SECONDS_PER_DAY
+             + np.repeat(np.arange(days) * SECONDS_PER_DAY, per_day)
+             + np.tile(np.sort(np.random.default_rng(7).uniform(0, SECONDS_PER_DAY, per_day)), days))
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        with TickWriter(root) as writer:
+            on_quote = writer.on_quote
+            for t, m in zip(times.tolist(), mids.tolist()):
+                on_quote('EURUSD', t, m - 0.00001, m + 0.00001)
+        written = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(root, 'EURUSD', f)) for f in os.listdir(os.path.join(root, 'EURUSD')))
+
+        started = time.perf_counter()
+        prices = load_mids(root, 'EURUSD', '2024-03-01', '2024-04-01')
+        loaded = time.perf_counter() - started
+        result = run_backtest(prices, SafeStrategy, stop_loss=0.0010, take_profit=0.0015, spread=0.00002)
+
+        print(f"wrote {n:,} ticks ({size / 1e6:.0f} MB) in {written:.2f}s ({n / written / 1e6:.2f}M ticks/sec)")
+        print(f"loaded one month in {loaded:.3f}s; backtest {result.elapsed:.2f}s, {result.trade_count} trades")
@@ -1,23 +1,56 @@
 """Trading interface for IC Markets (cTrader)."""
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import os
 import threading
 import time
 import uuid
 
-# Placeholder for actual cTrader API integration
+from fix_session import ExecutionReport, FixSession, FixSessionError
+from journal import Journal, read_journal, replay_trades
+from latency import LatencyTracker
+from market_data import FixQuoteSource, MarketDataFeed
+from pnl import PnLTracker
+from position_book import Position, PositionBook
+from risk import RiskEngine, RiskLimits, RiskRejected
+from scheduler import Scheduler, Timer
+from snapshot import SEQ_NUM_HEADROOM
+
+# Units per standard lot; FIX OrderQty is expressed in units.
+LOT_SIZE = 100_000
+# cTrader's FIX API does not report balances; margin and realized PnL are
+# tracked locally from this starting figure.
+PLACEHOLDER_BALANCE = 10000.00
+# Order of a trade's fields in snapshots; records are tuples to stay compact.
+SNAPSHOT_TRADE_FIELDS = ('id', 'symbol', 'volume', 'direction', 'stop_loss', 'take_profit', 'status',
+                         'position_id', 'entry_price', 'cl_ord_id')
+
+
 class Trader:
-    def __init__(self, settings_obj: 'Settings'): # Type hint with quotes for forward reference
+    """Order entry over a cTrader FIX 4.4 trade session.
+
+    The FIX session lives on an asyncio event loop: the one passed in, or a
+    private loop running on a daemon thread. The blocking methods used by the
+    GUI hand work to that loop and never wait on the network for orders.
+    """
+
+    def __init__(self, settings_obj: 'Settings', # Type hint with quotes for forward reference
+                 loop: Optional[asyncio.AbstractEventLoop] = None, market_data: Optional[MarketDataFeed] = None,
+                 quote_session: bool = True, journal: Optional[Journal] = None):
         self.settings = settings_obj
 
         # Store FIX connection parameters from settings
         self.fix_host = self.settings.fix_host
         self.fix_port = self.settings.fix_port
+        self.fix_quote_port = self.settings.fix_quote_port
         self.fix_sender_comp_id = self.settings.fix_sender_comp_id
         self.fix_target_comp_id = self.settings.fix_target_comp_id
         self.fix_sender_sub_id = self.settings.fix_sender_sub_id
         self.fix_password = self.settings.fix_password # Be mindful of using/logging this
 
         self.mode = "FIX Live" # Indicate current configuration type
+        # Structured events and the order audit trail; see journal.py
+        self.journal = journal or Journal.from_settings(settings_obj, name=self.mode)
 
         # Connection state and account summary
         self.is_connected: bool = False
@@ -29,56 +62,272 @@ class Trader:
             'margin': 0.0,
         }
 
-        # Track open trades
-        self.open_trades: List[dict] = []
+        # Track open trades; mutated from both the caller's and the session's thread
+        self.positions = PositionBook()
         self._trade_counter: int = 1
+        # Orders awaiting execution reports, by ClOrdID (guarded by positions.lock)
+        self._orders: Dict[str, Position] = {}
+        # Pre-trade limits and running exposure/margin/PnL (guarded by positions.lock)
+        self.risk = RiskEngine(RiskLimits.from_dict(getattr(settings_obj, 'risk_limits', None)),
+                               price_source=self._reference_price,
+                               account_currency=getattr(settings_obj, 'account_currency', 'USD'))
+        # Mark-to-market of filled positions; consumers append to pnl.listeners
+        # for throttled {'balance', 'unrealized', 'equity', 'by_symbol'} updates.
+        self.pnl = PnLTracker(balance=lambda: self.risk.balance, account_currency=self.risk.account_currency,
+                              conversion=self.risk.quote_rate)
+        self._marked_symbols: set = set()
+        # Open trades with a stop-loss or take-profit, by symbol. Orders carry
+        # neither level; _check_levels closes a trade once a quote crosses one.
+        self._protected: Dict[str, Dict[str, Position]] = {}
+        self._pnl_timer: Optional[Timer] = None
+
+        # FIX session and the event loop it runs on
+        self.session: Optional[FixSession] = None
+        self.connect_timeout: float = 10.0
+        # (next out, next in) MsgSeqNum per SenderSubID to log on with after
+        # a restore, instead of starting both sessions over at 1
+        self._resume_seq_nums: Dict[str, Tuple[int, int]] = {}
+        self._loop = loop
+        self._loop_thread: Optional[threading.Thread] = None
+        # Timers for both FIX sessions and reconnects, created on the loop
+        self.scheduler: Optional[Scheduler] = None
+
+        # Quotes for market_data arrive on a second (QUOTE) session, unless
+        # quote_session is False because the caller feeds market_data itself
+        # (e.g. from a supervisor's shared quote ring).
+        self.market_data = market_data
+        self.quote_session = quote_session
+        self.quote_source: Optional[FixQuoteSource] = None
 
-        # Heartbeat thread management
+        # Listeners get a plain-dict copy of a trade whenever its status changes,
+        # and (is_connected, message) when the connection state changes. They
+        # are called on whichever thread made the change and must not block.
+        self.on_trade_update: List[Callable[[dict], None]] = []
+        self.on_connection_change: List[Callable[[bool, str], None]] = []
+
+        # Quote-to-order-to-execution timings, shared with the feed
+        self.latency = LatencyTracker()
+        if market_data is not None and market_data.latency is None:
+            market_data.latency = self.latency
+
+        # Automatic reconnection (see start_heartbeat)
         self._running: bool = False
-        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._reconnect_timer: Optional[Timer] = None
+        self._reconnect_delay: float = 0.0
+        self._reconnecting: bool = False
+        self.initial_backoff: float = 1.0
+        self.max_backoff: float = 30.0
+        # The QUOTE session reconnects on its own backoff while trading is up.
+        self._quote_timer: Optional[Timer] = None
+        self._quote_delay: float = self.initial_backoff
+
+        self.journal.info('trader_initialized',
+                          "Trader initialized: host {host}:{port}, SenderCompID {sender}, TargetCompID {target}",
+                          host=self.fix_host, port=self.fix_port, sender=self.fix_sender_comp_id,
+                          target=self.fix_target_comp_id)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the session's event loop, starting a private one if needed."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._loop_thread = threading.Thread(target=self._loop.run_forever, name="fix-session", daemon=True)
+            self._loop_thread.start()
+        return self._loop
+
+    def _ensure_scheduler(self) -> Scheduler:
+        """The loop's scheduler; call from the loop thread."""
+        if self.scheduler is None:
+            self.scheduler = Scheduler(self._ensure_loop())
+        return self.scheduler
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
 
-        print(f"Trader initialized for {self.mode} connection.")
-        print(f"  Host: {self.fix_host}:{self.fix_port}")
-        print(f"  SenderCompID: {self.fix_sender_comp_id}")
-        print(f"  TargetCompID: {self.fix_target_comp_id}")
-        # Actual FIX client (e.g., QuickFIX) would be initialized and configured here.
-        # For now, this is just a placeholder update.
+    def _call_in_loop(self, callback, *args) -> None:
+        """Run ``callback`` on the session loop without waiting for it."""
+        if self._in_loop_thread():
+            callback(*args)
+        else:
+            self._ensure_loop().call_soon_threadsafe(callback, *args)
 
     def connect(self) -> bool:
-        """
-        Placeholder for establishing a FIX connection.
-        Simulates connection success/failure.
-        """
-        print(f"[{self.mode}] Attempting to connect...")
-        # Simulate connection logic: success if SenderCompID is set
+        """Establish the FIX session, blocking until logon completes or fails."""
+        if self._in_loop_thread():
+            raise RuntimeError("connect() would block the event loop; await connect_async() instead.")
+        future = asyncio.run_coroutine_threadsafe(self.connect_async(), self._ensure_loop())
+        return future.result()
+
+    async def connect_async(self) -> bool:
+        """Log on to the FIX server. Returns True on success."""
+        self.journal.info('connecting', "Attempting to connect...")
         if not self.fix_sender_comp_id:
             self.is_connected = False
             self.connection_message = "Connection Failed: SenderCompID is not set."
-            print(self.connection_message)
+            self.journal.error('connect_failed', "{reason}", reason=self.connection_message)
+            self._notify_connection()
             return False
 
-        if not self.fix_password: # Basic check, real FIX logon is more complex
+        if not self.fix_password:
             self.is_connected = False
             self.connection_message = "Connection Failed: Password is not set."
-            print(self.connection_message)
+            self.journal.error('connect_failed', "{reason}", reason=self.connection_message)
+            self._notify_connection()
+            return False
+
+        resumed = self._resume_seq_nums.get(self.fix_sender_sub_id)
+        next_out_seq, next_in_seq = resumed or (1, 1)
+        session = FixSession(
+            self.fix_host,
+            self.fix_port,
+            self.fix_sender_comp_id,
+            self.fix_target_comp_id,
+            sender_sub_id=self.fix_sender_sub_id,
+            password=self.fix_password,
+            next_out_seq=next_out_seq,
+            next_in_seq=next_in_seq,
+            scheduler=self._ensure_scheduler(),
+        )
+        session.on_execution_report.append(self._on_execution_report)
+        session.on_disconnect.append(self._on_session_closed)
+        session.on_callback_error = self._on_callback_error
+        try:
+            await session.logon(timeout=self.connect_timeout)
+        except (OSError, asyncio.TimeoutError, FixSessionError) as e:
+            if resumed is not None:
+                # The counterparty may have reset its sequence numbers since
+                # the snapshot; log on afresh rather than retrying them.
+                self._resume_seq_nums.clear()
+                self.journal.warning('sequence_resume_failed', "Logon with restored sequence numbers failed "
+                                     "({reason}); logging on afresh.", reason=str(e) or type(e).__name__)
+                return await self.connect_async()
+            self.is_connected = False
+            self.connection_message = f"Connection Failed: {e or type(e).__name__}"
+            self.journal.error('connect_failed', "{reason}", reason=self.connection_message)
+            self._notify_connection()
             return False
 
-        # Simulate successful connection
+        self._resume_seq_nums.pop(self.fix_sender_sub_id, None)
+        self.session = session
         self.is_connected = True
         self.connection_message = "Connected"
-        self.account_summary = {
-            'balance': 10000.00,
-            'equity': 10500.50,
-            'margin': 150.25,
-        }  # Mock data
-        print(f"[{self.mode}] Successfully connected. Account Summary: {self.account_summary}")
+        if self.market_data is not None and self.quote_session and not await self._start_quotes():
+            self._schedule_quote_reconnect()
+        if not self.risk.balance:
+            self.risk.balance = PLACEHOLDER_BALANCE
+        if self._pnl_timer is None:
+            self._pnl_timer = self._ensure_scheduler().call_every(self.pnl.publish_interval, self.pnl.flush)
+        self.get_account_summary()
+        self.journal.info('connected', "Successfully connected. Account Summary: {account}",
+                          account=self.account_summary)
+        self._notify_connection()
+        return True
+
+    async def _start_quotes(self) -> bool:
+        """(Re)start the QUOTE session; False if it could not log on."""
+        self._cancel_quote_reconnect()
+        if self.quote_source is not None:
+            # Reconnecting: replace the previous quote session.
+            self.quote_source.session.on_disconnect.clear()
+            await self.quote_source.stop()
+            self.quote_source = None
+        next_out_seq, next_in_seq = self._resume_seq_nums.pop('QUOTE', (1, 1))
+        quote_session = FixSession(
+            self.fix_host,
+            self.fix_quote_port,
+            self.fix_sender_comp_id,
+            self.fix_target_comp_id,
+            sender_sub_id='QUOTE',
+            password=self.fix_password,
+            next_out_seq=next_out_seq,
+            next_in_seq=next_in_seq,
+            scheduler=self._ensure_scheduler(),
+        )
+        quote_session.on_callback_error = self._on_callback_error
+        source = FixQuoteSource(self.market_data, quote_session,
+                                depth=getattr(self.settings, 'market_depth', False))
+        try:
+            await source.start(timeout=self.connect_timeout)
+        except (OSError, asyncio.TimeoutError, FixSessionError) as e:
+            # Trading still works without prices; strategies just hold.
+            self.journal.warning('quote_session_failed', "Quote session failed: {reason}",
+                                 reason=str(e) or type(e).__name__)
+            source.detach()
+            return False
+        quote_session.on_disconnect.append(self._on_quotes_closed)
+        self.quote_source = source
+        self._quote_delay = self.initial_backoff
         return True
 
+    def _on_quotes_closed(self, reason: str) -> None:
+        self.journal.warning('quote_session_closed', "Quote session closed: {reason}", reason=reason)
+        if self.quote_source is not None:
+            self.quote_source.detach()
+            self.quote_source = None
+        self._schedule_quote_reconnect()
+
+    def _cancel_quote_reconnect(self) -> None:
+        if self._quote_timer is not None:
+            self._quote_timer.cancel()
+            self._quote_timer = None
+
+    def _schedule_quote_reconnect(self) -> None:
+        # While the trade session is down, its reconnect restarts quotes too.
+        if (not self._running or not self.is_connected or self._quote_timer is not None
+                or self.market_data is None or not self.quote_session or self.quote_source is not None):
+            return
+        self.journal.info('quote_reconnect_scheduled', "Reconnecting the quote session in {delay:.1f}s.",
+                          delay=self._quote_delay)
+        self._quote_timer = self._ensure_scheduler().call_later(self._quote_delay, self._start_quote_reconnect)
+        self._quote_delay = min(self._quote_delay * 2, self.max_backoff)
+
+    def _start_quote_reconnect(self) -> None:
+        self._quote_timer = None
+        if self._running and self.is_connected and self.quote_source is None:
+            self._loop.create_task(self._reconnect_quotes())
+
+    async def _reconnect_quotes(self) -> None:
+        if not await self._start_quotes():
+            self._schedule_quote_reconnect()
+
     def disconnect(self) -> None:
-        """
-        Placeholder for closing a FIX connection.
-        """
-        print(f"[{self.mode}] Attempting to disconnect...")
+        """Log out of the FIX session."""
+        self.journal.info('disconnecting', "Attempting to disconnect...")
+        sessions = [s for s in (self.session, self.quote_source and self.quote_source.session) if s is not None]
+        if sessions and self._loop is not None:
+            for session in sessions:
+                # A deliberate logout is not a dropped connection.
+                session.on_disconnect.clear()
+                if self._in_loop_thread():
+                    self._loop.create_task(session.logout())
+                    continue
+                future = asyncio.run_coroutine_threadsafe(session.logout(), self._loop)
+                try:
+                    future.result(timeout=self.connect_timeout)
+                except Exception as e:
+                    self.journal.warning('logout_failed', "Logout did not complete cleanly: {reason}", reason=str(e))
+        self._disconnected()
+
+    async def disconnect_async(self) -> None:
+        """Log out of the FIX sessions from the session loop, waiting for each."""
+        self.journal.info('disconnecting', "Attempting to disconnect...")
+        for session in (self.session, self.quote_source and self.quote_source.session):
+            if session is None:
+                continue
+            session.on_disconnect.clear()
+            try:
+                await asyncio.wait_for(session.logout(), self.connect_timeout)
+            except Exception as e:
+                self.journal.warning('logout_failed', "Logout did not complete cleanly: {reason}", reason=str(e))
+        self._disconnected()
+
+    def _disconnected(self) -> None:
+        if self.quote_source is not None:
+            self.quote_source.detach()
+            self.quote_source = None
+        self.session = None
         self.is_connected = False
         self.connection_message = "Disconnected"
         self.account_summary = {
@@ -86,7 +335,31 @@ class Trader:
             'equity': 0.0,
             'margin': 0.0,
         }  # Clear data
-        print(f"[{self.mode}] Successfully disconnected.")
+        self.journal.info('disconnected', "Successfully disconnected.")
+        self._notify_connection()
+
+    def _on_session_closed(self, reason: str) -> None:
+        self.is_connected = False
+        self.connection_message = f"Disconnected: {reason}"
+        self.journal.warning('session_closed', "Session closed: {reason}", reason=reason)
+        self._notify_connection()
+        if self._running:
+            self._reconnect_delay = self.initial_backoff
+            self._schedule_reconnect()
+
+    def _on_callback_error(self, exc: Exception, callback) -> None:
+        self.journal.error('callback_failed', "{callback} failed: {error}",
+                           callback=getattr(callback, '__qualname__', repr(callback)), error=repr(exc))
+
+    def _notify_connection(self) -> None:
+        for listener in self.on_connection_change:
+            listener(self.is_connected, self.connection_message)
+
+    def _notify_trade(self, trade: Position) -> None:
+        if self.on_trade_update:
+            snapshot = trade.to_dict()
+            for listener in self.on_trade_update:
+                listener(snapshot)
 
     def get_connection_status(self) -> tuple[bool, str]:
         """Returns the current connection status and message."""
@@ -94,11 +367,87 @@ class Trader:
 
     def get_account_summary(self) -> dict:
         """Returns the current account summary data."""
+        if self.is_connected:
+            risk = self.risk
+            equity = risk.balance + self.pnl.unrealized
+            self.account_summary = {
+                'balance': risk.balance,
+                'equity': equity,
+                'unrealized_pnl': self.pnl.unrealized,
+                'margin': risk.margin_used,
+                'free_margin': equity - risk.margin_used,
+                'daily_pnl': risk.daily_realized,
+            }
         return self.account_summary.copy() # Return a copy to prevent external modification
 
-    def open_trade(self, symbol: str, volume: float, direction: str, stop_loss: Optional[float] = None, take_profit: Optional[float] = None):
-        """Open a trade. Direction should be 'buy' or 'sell'."""
-        # Input validation (remains the same for now)
+    def _last_quote(self, symbol: str) -> Optional[tuple]:
+        if self.market_data is None:
+            return None
+        buf = self.market_data.buffers.get(symbol)
+        return buf.last() if buf is not None else None
+
+    def _reference_price(self, symbol: str) -> Optional[float]:
+        """Latest mid for margin estimates, if the feed has one."""
+        last = self._last_quote(symbol)
+        return (last[1] + last[2]) * 0.5 if last else None
+
+    def _start_marking(self, trade: Position) -> None:
+        """Mark a newly filled position to market from the quote feed."""
+        last = self._last_quote(trade.symbol)
+        self.pnl.add(trade.id, trade.symbol, trade.direction, trade.volume, trade.entry_price,
+                     *(last[1:] if last else ()))
+        if self.market_data is not None and trade.symbol not in self._marked_symbols:
+            self._marked_symbols.add(trade.symbol)
+            self.market_data.subscribe(trade.symbol, self.pnl.on_quote)
+        if trade.stop_loss is not None or trade.take_profit is not None:
+            self._protect(trade)
+
+    def _protect(self, trade: Position) -> None:
+        """Close ``trade`` once a quote reaches its stop-loss or take-profit."""
+        if self.market_data is None:
+            self.journal.warning('unprotected_trade', "Trade {trade_id} has a stop-loss or take-profit but no "
+                                 "market data feed to enforce it.", trade_id=trade.id)
+            return
+        trades = self._protected.get(trade.symbol)
+        if trades is None:
+            trades = self._protected[trade.symbol] = {}
+            self.market_data.subscribe(trade.symbol, self._check_levels)
+        trades[trade.id] = trade
+
+    def _unprotect(self, trade: Position) -> None:
+        trades = self._protected.get(trade.symbol)
+        if trades:
+            trades.pop(trade.id, None)
+
+    def _check_levels(self, symbol: str, timestamp: float, bid: float, ask: float) -> None:
+        """Quote callback: close protected trades whose level the quote crossed.
+
+        Longs are checked against the bid and shorts against the ask, the
+        price a market close would get.
+        """
+        trades = self._protected.get(symbol)
+        if not trades or not self.is_connected:
+            return
+        for trade in list(trades.values()):
+            if trade.status != 'open':
+                continue  # closing already, or not filled yet
+            long = trade.direction == 'buy'
+            price = bid if long else ask
+            stop_loss, take_profit = trade.stop_loss, trade.take_profit
+            if stop_loss is not None and (price <= stop_loss if long else price >= stop_loss):
+                level = 'stop-loss'
+            elif take_profit is not None and (price >= take_profit if long else price <= take_profit):
+                level = 'take-profit'
+            else:
+                continue
+            self.journal.audit('level_reached', "Trade {trade_id} reached its {level} at {price}; closing.",
+                               trade_id=trade.id, level=level, price=price)
+            try:
+                self.close_trade(trade.id)
+            except ConnectionError:
+                return  # retried on the next quote once reconnected
+
+    def _validate_order(self, symbol, volume, direction, stop_loss, take_profit) -> None:
         if not isinstance(symbol, str) or not symbol.strip():
             raise ValueError("Symbol must be a non-empty string.")
         if direction not in ('buy', 'sell'):
@@ -109,66 +458,433 @@ class Trader:
             raise ValueError("Stop-Loss must be a number or None.")
         if take_profit is not None and not isinstance(take_profit, (int, float)):
             raise ValueError("Take-Profit must be a number or None.")
+        if (stop_loss is not None or take_profit is not None) and self.market_data is None:
+            # The levels are enforced locally from quotes, never sent with the order.
+            raise ValueError("Stop-Loss and Take-Profit need a market data feed to be enforced.")
 
-        trade_details = f"[{self.mode}] Attempting to open {direction} trade on {symbol} with volume {volume}"
-        if stop_loss is not None:
-            trade_details += f", SL: {stop_loss}"
-        if take_profit is not None:
-            trade_details += f", TP: {take_profit}"
-
-        print(trade_details)
-        print(f"  (Using SenderCompID: {self.fix_sender_comp_id})")
-
-        trade_id = f"T{self._trade_counter:06d}"
-        self._trade_counter += 1
-        trade = {
-            'id': trade_id,
-            'symbol': symbol,
-            'volume': volume,
-            'direction': direction,
-            'stop_loss': stop_loss,
-            'take_profit': take_profit,
-        }
-        self.open_trades.append(trade)
-        print(f"[{self.mode}] Trade {trade_id} opened.")
+    def open_trade(self, symbol: str, volume: float, direction: str, stop_loss: Optional[float] = None, take_profit: Optional[float] = None):
+        """Open a trade. Direction should be 'buy' or 'sell'.
+
+        ``stop_loss`` and ``take_profit`` are prices watched locally on the
+        quote feed once the trade is filled; crossing either closes the trade
+        at market. They need ``market_data``; without it they raise ValueError.
+        """
+        self._validate_order(symbol, volume, direction, stop_loss, take_profit)
+
+        session = self.session
+        if not self.is_connected or session is None:
+            raise ConnectionError("Not connected to the FIX server.")
+
+        with self.positions.lock:
+            trade_id = f"T{self._trade_counter:06d}"
+            self.risk.admit(trade_id, symbol, volume, direction)
+            self._trade_counter += 1
+            trade = Position(trade_id, symbol, volume, direction, stop_loss, take_profit,
+                             cl_ord_id=session.next_cl_ord_id())
+            self.positions.add(trade)
+            self._orders[trade.cl_ord_id] = trade
+            self._audit_submitted(trade)
+        self._notify_trade(trade)
+        self._call_in_loop(self._submit, session, trade.cl_ord_id, symbol, direction, volume, None)
         return trade_id
 
+    def _audit_submitted(self, trade: Position) -> None:
+        self.journal.audit('order_submitted', "Trade {trade_id} submitted: {direction} {volume} {symbol}",
+                           trade_id=trade.id, cl_ord_id=trade.cl_ord_id, symbol=trade.symbol,
+                           volume=trade.volume, direction=trade.direction, stop_loss=trade.stop_loss,
+                           take_profit=trade.take_profit)
+
+    def _audit_closing(self, trade: Position, cl_ord_id: str) -> None:
+        self.journal.audit('order_closing', "Closing trade {trade_id}.", trade_id=trade.id, cl_ord_id=cl_ord_id)
+
     def close_trade(self, trade_id: str):
-        print(f"[{self.mode}] Attempting to close trade {trade_id} (SenderCompID: {self.fix_sender_comp_id})")
-        for trade in list(self.open_trades):
-            if trade['id'] == trade_id:
-                self.open_trades.remove(trade)
-                print(f"[{self.mode}] Trade {trade_id} closed.")
-                return True
-        print(f"[{self.mode}] Trade {trade_id} not found.")
-        return False
+        """Send a closing order for an open trade; False if it is unknown or not yet open."""
+        session = self.session
+        with self.positions.lock:
+            trade = self.positions.get(trade_id)
+            if trade is None:
+                self.journal.warning('trade_not_found', "Trade {trade_id} not found.", trade_id=trade_id)
+                return False
+            if not self.is_connected or session is None:
+                raise ConnectionError("Not connected to the FIX server.")
+            if trade.status != 'open':
+                # A pending trade has no broker position to close yet; an
+                # opposite order now would open a second one.
+                self.journal.warning('close_refused', "Trade {trade_id} is {status}; it can be closed once open.",
+                                     trade_id=trade_id, status=trade.status)
+                return False
+            self.positions.remove(trade_id)
+            trade.status = 'closing'
+            cl_ord_id = session.next_cl_ord_id()
+            self._orders[cl_ord_id] = trade
+            self._audit_closing(trade, cl_ord_id)
+        self._notify_trade(trade)
+        opposite = 'sell' if trade.direction == 'buy' else 'buy'
+        self._call_in_loop(self._submit, session, cl_ord_id, trade.symbol, opposite,
+                           trade.volume, trade.position_id)
+        return True
+
+    def open_trades_batch(self, orders: Iterable[dict], timeout: Optional[float] = None) -> List[dict]:
+        """Open several trades with one pipelined write to the FIX session.
+
+        Each order is a dict with the keyword arguments of ``open_trade``.
+        Invalid orders are reported rather than raised, so one bad entry does
+        not stop the rest. Returns one result per order, in order: ``{'index',
+        'trade_id', 'status'}`` or ``{'index', 'error'}``. With ``timeout``,
+        blocks until every submitted order has its first execution report
+        (or the timeout passes) so ``status`` reflects the outcome.
+        """
+        results: List[dict] = []
+        valid = []
+        for index, order in enumerate(orders):
+            try:
+                self._validate_order(order.get('symbol'), order.get('volume'), order.get('direction'),
+                                     order.get('stop_loss'), order.get('take_profit'))
+            except ValueError as e:
+                results.append({'index': index, 'error': str(e)})
+                continue
+            valid.append((index, order))
+        if not valid:
+            return results
+
+        session = self.session
+        if not self.is_connected or session is None:
+            raise ConnectionError("Not connected to the FIX server.")
+
+        batch = []
+        with self.positions.lock:
+            for index, order in valid:
+                trade_id = f"T{self._trade_counter:06d}"
+                try:
+                    self.risk.admit(trade_id, order['symbol'], order['volume'], order['direction'])
+                except RiskRejected as e:
+                    results.append({'index': index, 'error': str(e)})
+                    continue
+                self._trade_counter += 1
+                trade = Position(trade_id, order['symbol'], order['volume'], order['direction'],
+                                 order.get('stop_loss'), order.get('take_profit'),
+                                 cl_ord_id=session.next_cl_ord_id())
+                self.positions.add(trade)
+                self._orders[trade.cl_ord_id] = trade
+                self._audit_submitted(trade)
+                batch.append((trade.cl_ord_id, trade.symbol, trade.direction, trade.volume, None))
+                results.append({'index': index, 'trade_id': trade_id, 'status': trade.status})
+                self._notify_trade(trade)
+        if batch:
+            self.journal.info('batch_submitted', "Submitting {count} orders in one batch.", count=len(batch))
+            self._dispatch_batch(session, batch, timeout)
+
+        results.sort(key=lambda result: result['index'])
+        if timeout is not None:
+            for result in results:
+                if 'trade_id' in result:
+                    trade = self.positions.get(result['trade_id'])
+                    result['status'] = trade.status if trade is not None else 'rejected'
+        return results
+
+    def close_all(self, symbol: Optional[str] = None, timeout: Optional[float] = None) -> List[dict]:
+        """Flatten every open trade (or those in ``symbol``) in one batch.
+
+        Returns ``{'trade_id', 'status'}`` per trade sent for closing; with
+        ``timeout``, waits for the closing orders' execution reports first.
+        """
+        session = self.session
+        if not self.is_connected or session is None:
+            raise ConnectionError("Not connected to the FIX server.")
+        batch = []
+        closing = []
+        with self.positions.lock:
+            trades = self.positions.by_symbol(symbol) if symbol is not None else list(self.positions)
+            for trade in trades:
+                if trade.status != 'open':
+                    continue  # pending fills are closed once they are open
+                self.positions.remove(trade.id)
+                trade.status = 'closing'
+                cl_ord_id = session.next_cl_ord_id()
+                self._orders[cl_ord_id] = trade
+                self._audit_closing(trade, cl_ord_id)
+                opposite = 'sell' if trade.direction == 'buy' else 'buy'
+                batch.append((cl_ord_id, trade.symbol, opposite, trade.volume, trade.position_id))
+                closing.append(trade)
+                self._notify_trade(trade)
+        if not batch:
+            return []
+        self.journal.info('batch_closing', "Closing {count} trades in one batch.", count=len(batch))
+        self._dispatch_batch(session, batch, timeout)
+        return [{'trade_id': trade.id, 'status': trade.status} for trade in closing]
+
+    def _dispatch_batch(self, session: FixSession, batch: list, timeout: Optional[float]) -> None:
+        if timeout is None or self._in_loop_thread():
+            self._call_in_loop(self._submit_batch, session, batch)
+            return
+        future = asyncio.run_coroutine_threadsafe(self._submit_batch_and_wait(session, batch, timeout),
+                                                  self._ensure_loop())
+        future.result()
+
+    async def _submit_batch_and_wait(self, session: FixSession, batch: list, timeout: float) -> None:
+        futures = self._submit_batch(session, batch)
+        if futures:
+            await asyncio.wait(futures, timeout=timeout)
+
+    def _submit(self, session: FixSession, cl_ord_id: str, symbol: str, direction: str, volume: float,
+                position_id: Optional[str]) -> None:
+        """Hand an order to the session (runs on the session loop)."""
+        self._submit_batch(session, [(cl_ord_id, symbol, direction, volume, position_id)])
+
+    def _submit_batch(self, session: FixSession, batch: list) -> list:
+        """Pipeline (cl_ord_id, symbol, direction, volume, position_id) orders (runs on the session loop)."""
+        latency = self.latency
+        for cl_ord_id, symbol, _, _, position_id in batch:
+            latency.order_sending(cl_ord_id, symbol, opening=position_id is None)
+        try:
+            futures = session.submit_orders([(symbol, direction, volume * LOT_SIZE, cl_ord_id, None, position_id)
+                                             for cl_ord_id, symbol, direction, volume, position_id in batch])
+        except FixSessionError as e:
+            for cl_ord_id, *_ in batch:
+                self._on_order_failed(cl_ord_id, str(e))
+            return []
+        latency.order_sent([cl_ord_id for cl_ord_id, *_ in batch])
+        for (cl_ord_id, *_), future in zip(batch, futures):
+            future.add_done_callback(lambda f, cl_ord_id=cl_ord_id: self._on_order_done(cl_ord_id, f))
+        return futures
+
+    def _on_order_done(self, cl_ord_id: str, future: asyncio.Future) -> None:
+        # Resolved by the first execution report; only errors need handling here.
+        if not future.cancelled() and future.exception() is not None:
+            self._on_order_failed(cl_ord_id, str(future.exception()))
+
+    def _on_execution_report(self, report: ExecutionReport) -> None:
+        self.latency.execution_report(report.cl_ord_id)
+        with self.positions.lock:
+            trade = self._orders.get(report.cl_ord_id)
+            if trade is None:
+                return
+            if report.rejected:
+                self._on_order_failed(report.cl_ord_id, report.text or "Rejected")
+                return
+            if report.position_id:
+                trade.position_id = report.position_id
+            if report.filled:
+                del self._orders[report.cl_ord_id]
+                if trade.status == 'pending':
+                    trade.status = 'open'
+                    trade.entry_price = report.avg_px
+                    self.risk.on_fill(trade.id, report.avg_px)
+                    self._start_marking(trade)
+                    self.journal.audit('order_filled', "Trade {trade_id} filled at {price}.", trade_id=trade.id,
+                                       price=report.avg_px, position_id=trade.position_id)
+                else:
+                    trade.status = 'closed'
+                    trade.exit_price = report.avg_px
+                    realized = self.risk.to_account(trade.symbol, RiskEngine.realized_pnl(
+                        trade.direction, trade.volume, trade.entry_price, trade.exit_price), trade.exit_price)
+                    self.risk.on_close(trade.id, realized)
+                    self.pnl.remove(trade.id)
+                    self._unprotect(trade)
+                    self.journal.audit('position_closed', "Trade {trade_id} closed at {price} (P/L {pnl:+.2f}).",
+                                       trade_id=trade.id, price=report.avg_px, pnl=realized)
+                self._notify_trade(trade)
+
+    def _on_order_failed(self, cl_ord_id: str, reason: str) -> None:
+        with self.positions.lock:
+            trade = self._orders.pop(cl_ord_id, None)
+            if trade is None:
+                return
+            if trade.status == 'pending':
+                trade.status = 'rejected'
+                self.positions.remove(trade.id)
+                self.risk.release(trade.id)
+                event = 'order_rejected'
+            elif trade.status == 'closing':
+                # The position is still open at the broker.
+                trade.status = 'open'
+                self.positions.add(trade)
+                event = 'close_failed'
+            else:
+                event = 'order_failed'
+            self.journal.audit(event, "Order {cl_ord_id} for trade {trade_id} failed: {reason}",
+                               trade_id=trade.id, cl_ord_id=cl_ord_id, reason=reason)
+            self._notify_trade(trade)
 
     def get_open_trades(self) -> List[dict]:
-        print(f"[{self.mode}] Fetching open trades (SenderCompID: {self.fix_sender_comp_id})")
-        return list(self.open_trades)
+        return self.positions.snapshot()
+
+    def restore_positions(self, path: Optional[str] = None) -> int:
+        """Put positions left open in an audit journal back into the book.
+
+        Call before trading after a restart; ``path`` defaults to this
+        trader's journal file. Orders whose fill was never journaled are
+        reported, not restored, since only the broker knows their outcome.
+        Returns the number of positions restored.
+        """
+        path = path or self.journal.path
+        if not path:
+            return 0
+        restored = self._restore_trades(*replay_trades(path))
+        self.journal.info('positions_restored', "Restored {count} open positions from {path}.",
+                          count=restored, path=path)
+        return restored
+
+    def snapshot_state(self) -> dict:
+        """Positions, orders in flight, account totals and FIX sequence
+        numbers as plain values for ``snapshot.SnapshotWriter``.
+
+        Take the snapshot's time before calling, so that restoring replays
+        every journal event the state might miss.
+        """
+        with self.positions.lock:
+            trades = {trade.id: trade for trade in self.positions}
+            awaiting = {}
+            for cl_ord_id, trade in self._orders.items():
+                trades.setdefault(trade.id, trade)  # closing trades have left the book
+                awaiting[trade.id] = cl_ord_id
+            records = [(trade.id, trade.symbol, trade.volume, trade.direction, trade.stop_loss, trade.take_profit,
+                        trade.status, trade.position_id, trade.entry_price, awaiting.get(trade.id))
+                       for trade in trades.values()]
+            state = {
+                'trades': records,
+                'trade_counter': self._trade_counter,
+                'risk': self.risk.get_state(),
+                'account': self.get_account_summary(),
+            }
+        seq_nums = dict(self._resume_seq_nums)
+        for session in (self.session, self.quote_source and self.quote_source.session):
+            if session is not None and session.logged_on:
+                seq_nums[session.sender_sub_id] = (session.next_out_seq, session.next_in_seq)
+        state['seq_nums'] = seq_nums
+        return state
+
+    def restore_snapshot(self, timestamp: float, state: dict, path: Optional[str] = None) -> int:
+        """Resume from ``snapshot_state``'s result instead of the whole journal.
+
+        Audit events journaled after ``timestamp`` (in ``path``, by default
+        this trader's journal) are applied on top. Orders still awaiting a
+        report are kept waiting for it: the next logon resumes the FIX
+        sequence numbers, so the broker resends what was missed. Call before
+        connecting; returns the number of trades restored.
+        """
+        path = path or self.journal.path
+        records = [dict(zip(SNAPSHOT_TRADE_FIELDS, record)) for record in state['trades']]
+        trades, last = replay_trades(path, timestamp, records)
+        with self.positions.lock:
+            self.risk.set_state(state['risk'])
+            if path and os.path.exists(path):
+                # Book the PnL of positions closed after the snapshot.
+                for record in read_journal(path, timestamp):
+                    if record.get('event') == 'position_closed' and record.get('level') == 'AUDIT':
+                        self.risk.on_close(record.get('trade_id'), record.get('pnl') or 0.0)
+            self._trade_counter = max(self._trade_counter, state['trade_counter'])
+            restored = self._restore_trades(trades, last, resume_orders=True)
+        self.account_summary = dict(state['account'])
+        self._resume_seq_nums = {sub_id: (next_out + SEQ_NUM_HEADROOM, next_in)
+                                 for sub_id, (next_out, next_in) in state['seq_nums'].items()}
+        self.journal.info('snapshot_restored', "Restored {count} trades from a snapshot taken {age:.1f}s ago.",
+                          count=restored, age=time.time() - timestamp)
+        return restored
+
+    def _restore_trades(self, trades: List[dict], last: int, resume_orders: bool = False) -> int:
+        restored = 0
+        with self.positions.lock:
+            self._trade_counter = max(self._trade_counter, last + 1)
+            for record in trades:
+                if self.positions.get(record['id']) is not None:
+                    continue
+                cl_ord_id = record.get('cl_ord_id') if resume_orders else None
+                pending = record['status'] == 'pending' or record['entry_price'] is None
+                if pending and cl_ord_id is None:
+                    self.journal.warning('unconfirmed_order', "Order for trade {trade_id} ({symbol}) was never "
+                                         "confirmed; check it with the broker.", trade_id=record['id'],
+                                         symbol=record['symbol'])
+                    continue
+                trade = Position(record['id'], record['symbol'], record['volume'], record['direction'],
+                                 record['stop_loss'], record['take_profit'], status='open',
+                                 position_id=record['position_id'], entry_price=record['entry_price'])
+                self.risk.restore(trade.id, trade.symbol, trade.volume, trade.direction, trade.entry_price)
+                if pending:
+                    trade.status = 'pending'
+                    trade.cl_ord_id = cl_ord_id
+                    self.journal.info('awaiting_order', "Order for trade {trade_id} ({symbol}) was not confirmed "
+                                      "before the restart; awaiting its report.", trade_id=trade.id,
+                                      symbol=trade.symbol)
+                else:
+                    self._start_marking(trade)
+                if cl_ord_id is not None:
+                    self._orders[cl_ord_id] = trade
+                if record['status'] == 'closing' and cl_ord_id is not None:
+                    trade.status = 'closing'  # out of the book until its close is reported
+                else:
+                    self.positions.add(trade)
+                restored += 1
+        return restored
+
+    def get_trade(self, trade_id: str) -> Optional[Position]:
+        """Look up an open trade by id."""
+        return self.positions.get(trade_id)
+
+    def net_exposure(self, symbol: str) -> float:
+        """Net open volume in lots for ``symbol`` (long positive)."""
+        return self.positions.net_exposure(symbol)
 
     def get_account_info(self) -> dict:
-        print(f"[{self.mode}] Fetching account info (SenderCompID: {self.fix_sender_comp_id})")
         return self.get_account_summary()
 
-    def start_heartbeat(self, interval: float = 30.0) -> None:
-        """Start a background thread that maintains the connection."""
+    def start_heartbeat(self, interval: Optional[float] = None, max_backoff: Optional[float] = None) -> None:
+        """Keep the trade and quote sessions connected without a polling thread.
+
+        Connects now if needed, then reconnects whenever a session drops,
+        waiting ``initial_backoff`` seconds and doubling up to ``max_backoff``
+        between failed attempts (the quote session on its own backoff).
+        Session heartbeats and test requests run on the same scheduler, so a
+        dead connection is noticed within about two heartbeat intervals rather
+        than on the next poll.
+
+        ``interval`` is deprecated and ignored: it was the period of the old
+        polling thread, which no longer exists.
+        """
+        if interval is not None:
+            self.journal.warning('deprecated_argument', "start_heartbeat(interval=...) is deprecated and ignored; "
+                                 "reconnects are event-driven (see max_backoff).", interval=interval)
+        if max_backoff is not None:
+            self.max_backoff = max_backoff
         if self._running:
             return
-
         self._running = True
-
-        def _heartbeat_loop() -> None:
-            while self._running:
-                if not self.is_connected:
-                    self.connect()
-                time.sleep(interval)
-
-        self._heartbeat_thread = threading.Thread(target=_heartbeat_loop, daemon=True)
-        self._heartbeat_thread.start()
+        self._reconnect_delay = self.initial_backoff
+        self._call_in_loop(self._schedule_reconnect, 0.0)
+        self._call_in_loop(self._schedule_quote_reconnect)
 
     def stop_heartbeat(self) -> None:
-        """Stop the background heartbeat thread."""
+        """Stop reconnecting automatically."""
         self._running = False
-        if self._heartbeat_thread and self._heartbeat_thread.is_alive():
-            self._heartbeat_thread.join(timeout=1)
+        self._call_in_loop(self._cancel_reconnect)
+        self._call_in_loop(self._cancel_quote_reconnect)
+
+    def _cancel_reconnect(self) -> None:
+        if self._reconnect_timer is not None:
+            self._reconnect_timer.cancel()
+            self._reconnect_timer = None
+
+    def _schedule_reconnect(self, delay: Optional[float] = None) -> None:
+        if not self._running or self.is_connected or self._reconnecting:
+            return
+        self._cancel_reconnect()
+        delay = self._reconnect_delay if delay is None else delay
+        self._reconnect_timer = self._ensure_scheduler().call_later(delay, self._start_reconnect)
+
+    def _start_reconnect(self) -> None:
+        self._reconnect_timer = None
+        if self._running and not self.is_connected and not self._reconnecting:
+            self._reconnecting = True
+            self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        try:
+            connected = await self.connect_async()
+        finally:
+            self._reconnecting = False
+        if connected:
+            self._reconnect_delay = self.initial_backoff
+            return
+        self.journal.info('reconnect_scheduled', "Reconnecting in {delay:.1f}s.", delay=self._reconnect_delay)
+        self._schedule_reconnect()
+        self._reconnect_delay = min(self._reconnect_delay * 2, self.max_backoff)